@@ -5,10 +5,16 @@ from backend.routes.demande_audit import (router as demande_audit_router)
 from backend.routes.affectation import (router as affectation_router)
 from backend.routes.audit import (router as audit_router)
 from backend.routes.plan import (router as plan_router)
+from backend.services.plan import get_cover_template
+from backend.services.export_jobs import shutdown_pool as shutdown_export_pool
+from backend.services.pdf_jobs import shutdown_pool as shutdown_pdf_pool
+from backend.services.cpu_pool import shutdown_pool as shutdown_cpu_pool
 from fastapi.middleware.cors import CORSMiddleware
-from database import Base, engine
+from database import sync_schema, dispose_async_engine
+from backend.services.demande_search import setup_search_index
 
-Base.metadata.create_all(bind=engine)
+sync_schema()
+setup_search_index()
 
 app = FastAPI()
 
@@ -31,6 +37,21 @@ app.mount("/fichiers_attaches_audit", StaticFiles(directory="fichiers_attaches_a
 app.mount("/fiches_demandes_audit", StaticFiles(directory="fiches_demandes_audit"), name="fiches_demandes_audit")
 app.mount("/fichiers_affectations", StaticFiles(directory="fichiers_affectations"), name="fichiers_affectations")
 
+@app.on_event("startup")
+def compile_export_templates():
+    # Compile la page de garde des exports une seule fois au démarrage
+    get_cover_template()
+
+@app.on_event("shutdown")
+def stop_background_jobs():
+    shutdown_export_pool()
+    shutdown_pdf_pool()
+    shutdown_cpu_pool()
+
+@app.on_event("shutdown")
+async def close_async_engine():
+    await dispose_async_engine()
+
 @app.get("/")
 def root():
     return {"message": "Bienvenue sur l'APP de gestion des audits"}
\ No newline at end of file
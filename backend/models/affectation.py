@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Date
+from sqlalchemy import Column, Integer, String, ForeignKey, Date, Text
 from sqlalchemy.orm import relationship
 from database import Base
 from backend.models.associations import affect_auditeur, affect_ip
@@ -9,10 +9,14 @@ class Affectation(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     demande_audit_id = Column(Integer, ForeignKey("demandes_audits.id"), nullable=False)
-    date_affectation = Column(Date, default=date.today, nullable=False)
+    date_affectation = Column(Date, default=date.today, nullable=False, index=True)
     type_audit = Column(String(150), nullable=False)
     affectationpath = Column(String(255), nullable=True)
-    prestataire_id = Column(Integer, ForeignKey("prestataires.id"))
+    # Suivi de la génération asynchrone de la fiche PDF
+    document_statut = Column(String(20), nullable=True)
+    document_erreur = Column(Text, nullable=True)
+    document_tentatives = Column(Integer, nullable=True)
+    prestataire_id = Column(Integer, ForeignKey("prestataires.id"), index=True)
 
     demande_audit = relationship("Demande_Audit", back_populates="affectations")
     audit = relationship("Audit", back_populates="affectation")
@@ -22,7 +22,7 @@ affect_ip = Table(
     "affect_ip",
     Base.metadata,
     Column("affectation_id", Integer, ForeignKey("affectations.id"), primary_key=True),
-    Column("ip_id", Integer, ForeignKey("ips.id"), primary_key=True)
+    Column("ip_id", Integer, ForeignKey("ips.id"), primary_key=True, index=True)
 )
 
 """def audits_plans(db: Session):
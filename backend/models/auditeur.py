@@ -10,7 +10,7 @@ class Auditeur(Base):
     id = Column(Integer, primary_key=True, index=True)
     nom = Column(String(100), nullable=False)
     prenom = Column(String(100), nullable=False)
-    email = Column(String(255), nullable=False)
+    email = Column(String(255), nullable=False, index=True)
     phone = Column(String(20), nullable=False)
     prestataire_id = Column(Integer, ForeignKey("prestataires.id"), nullable=False)
 
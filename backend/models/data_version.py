@@ -0,0 +1,9 @@
+from sqlalchemy import Column, Integer, String
+from database import Base
+
+
+class DataVersion(Base):
+    __tablename__ = "data_versions"
+
+    nom = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)  # Incrémentée à chaque écriture sur le domaine
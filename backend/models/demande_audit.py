@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, Boolean, func, Text, JSON
+from sqlalchemy import Column, Integer, String, Date, Boolean, func, Text, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy_utils import EmailType
 
@@ -7,6 +7,11 @@ from datetime import date
 
 class Demande_Audit(Base):
     __tablename__ = "demandes_audits"
+    __table_args__ = (
+        # Index plein texte de /audits/search sous MySQL (SQLite : table FTS5, voir services/demande_search.py)
+        Index("ix_demandes_audits_fulltext", "nom_app", "description", "liste_fonctionalites", "url_app",
+              mysql_prefix="FULLTEXT").ddl_if(dialect="mysql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     type_audit = Column(String(100), nullable=False)
@@ -58,6 +63,10 @@ class Demande_Audit(Base):
 
     fichiers_attaches = Column(JSON, nullable=True)
     fiche_demande_path = Column(String(255), nullable=True)
+    # Suivi de la génération asynchrone de la fiche PDF
+    document_statut = Column(String(20), nullable=True)
+    document_erreur = Column(Text, nullable=True)
+    document_tentatives = Column(Integer, nullable=True)
 
     affectations = relationship("Affectation", back_populates="demande_audit")
     audit = relationship("Audit", back_populates="demande_audit")
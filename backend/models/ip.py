@@ -1,14 +1,20 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, SmallInteger, String, ForeignKey, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from database import Base
 from backend.models.associations import affect_ip
 
 class IP(Base):
     __tablename__ = "ips"
+    __table_args__ = (
+        # Recherche par plage : les adresses d'une même version ont la même longueur
+        Index("ix_ips_version_ip_adresse_bin", "version_ip", "adresse_bin"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     affectation_id = Column(Integer, ForeignKey("affectations.id"), nullable=False)
-    adresse_ip = Column(String(50), nullable=False)
+    adresse_ip = Column(String(50), nullable=False, index=True)
+    version_ip = Column(SmallInteger, nullable=True)
+    adresse_bin = Column(LargeBinary(16), nullable=True)  # 4 octets en IPv4, 16 en IPv6
 
     affectation = relationship("Affectation", secondary=affect_ip, back_populates="ips")
-    ports = relationship("Port", back_populates="ip", cascade="all, delete-orphan")
\ No newline at end of file
+    ports = relationship("Port", back_populates="ip", cascade="all, delete-orphan")
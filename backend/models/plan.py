@@ -10,15 +10,18 @@ class Plan(Base):
     ref = Column(String(100), unique=True, index=True)
     application = Column(String(255), nullable=True)
     type_application = Column(String(100), nullable=True)
-    type_audit = Column(String(100), nullable=True)
-    date_realisation = Column(Date, nullable=True)
-    date_cloture = Column(Date, nullable=True)
-    date_rapport = Column(Date, nullable=True)
-    niveau_securite = Column(String(50), nullable=True)
+    type_audit = Column(String(100), nullable=True, index=True)
+    date_realisation = Column(Date, nullable=True, index=True)
+    date_cloture = Column(Date, nullable=True, index=True)
+    date_rapport = Column(Date, nullable=True, index=True)
+    niveau_securite = Column(String(50), nullable=True, index=True)
     nb_vulnerabilites = Column(JSON, nullable=True)
     taux_remediation = Column(Float, nullable=True)
     commentaire_dcsg = Column(String(255), nullable=True)
     commentaire_cp = Column(String(255), nullable=True)
+    # Versions texte des commentaires HTML, calculées à l'écriture pour les exports
+    commentaire_dcsg_texte = Column(String(255), nullable=True)
+    commentaire_cp_texte = Column(String(255), nullable=True)
 
     vulnerabilites = relationship("Vulnerability", back_populates="plan", cascade="all, delete")
 
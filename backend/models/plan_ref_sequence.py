@@ -0,0 +1,9 @@
+from sqlalchemy import Column, Integer
+from database import Base
+
+
+class PlanRefSequence(Base):
+    __tablename__ = "plan_ref_sequences"
+
+    annee = Column(Integer, primary_key=True, autoincrement=False)
+    prochain_index = Column(Integer, nullable=False, default=0)  # Nombre de refs déjà attribuées pour l'année
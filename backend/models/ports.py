@@ -1,13 +1,16 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from database import Base
 
 class Port(Base):
     __tablename__ = "ports"
+    __table_args__ = (
+        Index("ix_ports_port_status", "port", "status"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     port = Column(Integer, nullable=False)
     status = Column(String(20), nullable=False)
 
-    ip_id = Column(Integer, ForeignKey("ips.id"))
+    ip_id = Column(Integer, ForeignKey("ips.id"), index=True)
     ip = relationship("IP", back_populates="ports")
@@ -1,16 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from database import get_db
-from typing import List
+from typing import List, Optional
 
 from backend.models.prestataire import Prestataire
 from backend.models.ip import IP
 from backend.schemas.affectation import AffectSchema, AffectResponse
 from backend.schemas.auditeur import AuditeurSchema, AuditeurResponse
 from backend.schemas.prestataire import PrestataireSchema, PrestataireResponse
-from backend.schemas.ip import IPResponse
+from backend.schemas.ip import IPResponse, IPNetworkResponse, PortExposureResponse
+from backend.schemas.demande_audit import DocumentStatus
+from backend.services.pdf_jobs import wait_for_document
+from backend.services.ip import get_ips_in_network, IPS_PAGE_MAX
+from backend.services.ports import get_port_exposure, PORTS_PAGE_MAX
+from backend.services.serialization import json_list_response
 from backend.services.affectation import create_affect, get_affect, list_affects, create_auditeur, list_auditeurs, \
-    create_prestataire, delete_auditeur, update_auditeur
+    create_prestataire, delete_auditeur, update_auditeur, AFFECTS_PAGE_MAX
 
 from log_config import setup_logger
 
@@ -33,10 +40,25 @@ def read_affect(affectation_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Affectation non trouvée")
     return affect
 
-@router.get("/affects/", response_model=List[AffectResponse], summary="Lister les affectations", description="Récupère la liste de toutes les affectations avec les informations associées (auditeurs, prestataires, audit...)")
-def read_affects(db: Session = Depends(get_db)):
-    logger.info("Lecture de toutes les affectations")
-    return list_affects(db)
+@router.get("/affects/{affectation_id}/document", response_model=DocumentStatus, summary="Statut de la fiche PDF", description="Retourne le statut de génération de la fiche d'affectation ; wait permet d'attendre jusqu'à 30 secondes la fin du rendu")
+async def read_affect_document(affectation_id: int, wait: float = Query(0, ge=0), db: Session = Depends(get_db)):
+    logger.info(f"Lecture du statut de la fiche de l'affectation ID {affectation_id}")
+    return await wait_for_document(db, "affectation", affectation_id, wait)
+
+@router.get("/affects/", response_model=List[AffectResponse], summary="Lister les affectations", description="Récupère les affectations avec leurs auditeurs et IPs, filtrables par prestataire, type d'audit et période (curseur suivant dans l'en-tête X-Next-Cursor)")
+def read_affects(
+    prestataire_id: Optional[int] = None,
+    type_audit: Optional[str] = None,
+    date_debut: Optional[date] = None,
+    date_fin: Optional[date] = None,
+    limit: int = Query(AFFECTS_PAGE_MAX, ge=1, le=AFFECTS_PAGE_MAX),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    logger.info("Lecture des affectations")
+    affects, next_cursor = list_affects(db, limit, cursor, prestataire_id, type_audit, date_debut, date_fin)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return json_list_response(AffectResponse, affects, headers)
 
 # Endpoints pour la gestion des auditeurs
 @router.post("/auditeurs/", response_model=AuditeurResponse, summary="Creer les auditeurs", description="Permet de creer les auditeurs")
@@ -66,6 +88,37 @@ def read_ips(db: Session = Depends(get_db)):
     logger.info("Lecture de la liste des IPs")
     return db.query(IP).all()
 
+@router.get("/ips/reseau", response_model=List[IPNetworkResponse], summary="Rechercher les IPs d'un réseau", description="Récupère les IPs comprises dans un réseau CIDR (ex. 10.20.0.0/16), avec leurs ports et leurs affectations (curseur suivant dans l'en-tête X-Next-Cursor)")
+def read_ips_in_network(
+    reseau: str = Query(..., description="Réseau au format CIDR"),
+    limit: int = Query(100, ge=1, le=IPS_PAGE_MAX),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    logger.info(f"Recherche des IPs du réseau {reseau}")
+    ips, next_cursor = get_ips_in_network(db, reseau, limit, cursor)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return json_list_response(IPNetworkResponse, ips, headers)
+
+@router.get("/ports/exposition", response_model=List[PortExposureResponse], summary="Rechercher les hôtes exposant un port", description="Récupère les IPs exposant un port ou une plage de ports, avec leurs affectations et prestataires (curseur suivant dans l'en-tête X-Next-Cursor)")
+def read_port_exposure(
+    port: Optional[int] = Query(None, ge=0, le=65535),
+    port_min: Optional[int] = Query(None, ge=0, le=65535),
+    port_max: Optional[int] = Query(None, ge=0, le=65535),
+    status: Optional[str] = "open",
+    limit: int = Query(100, ge=1, le=PORTS_PAGE_MAX),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    if port is not None:
+        port_min = port_max = port
+    if port_min is None or port_max is None:
+        raise HTTPException(status_code=400, detail="Indiquez port ou port_min et port_max.")
+    logger.info(f"Recherche des expositions des ports {port_min}-{port_max} (status={status})")
+    expositions, next_cursor = get_port_exposure(db, port_min, port_max, status or None, limit, cursor)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return json_list_response(PortExposureResponse, expositions, headers)
+
 @router.delete("/auditeurs/{auditeur_id}", response_model=AuditeurResponse, summary="Supprimer un auditeur par ID", description="Permet de supprimer un auditeur par son ID de la liste de auditeurs")
 def remove_auditeur(auditeur_id: int, db: Session = Depends(get_db)):
     logger.info(f"Suppression de l’auditeur ID {auditeur_id}")
@@ -1,13 +1,14 @@
-from datetime import datetime
+from datetime import date
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
-from backend.models.audit import Audit
-from backend.schemas.audit import AuditResponse, AuditBase, EtatUpdate
-from backend.services.audit import create_audit, get_audit, list_audits, change_audit_etat
+from backend.schemas.audit import AuditResponse, AuditBase, EtatUpdate, AuditDuration, SlaReport
+from backend.services.audit import create_audit, get_audit, list_audits, change_audit_etat, AUDITS_PAGE_MAX, \
+    get_audit_durations, get_sla_report
+from backend.services.serialization import json_list_response
 from database import get_db
-from typing import List
+from typing import List, Optional
 from log_config import setup_logger
 
 logger = setup_logger()
@@ -18,6 +19,27 @@ router = APIRouter()
 def create_audit_route(audit_data: AuditBase, db: Session = Depends(get_db)):
     return create_audit(db, audit_data)
 
+@router.get("/audits/durations", response_model=List[AuditDuration])
+def read_audit_durations(
+    prestataire_id: Optional[int] = None,
+    etat: Optional[str] = None,
+    limit: int = Query(AUDITS_PAGE_MAX, ge=1, le=AUDITS_PAGE_MAX),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    durations, next_cursor = get_audit_durations(db, limit, cursor, prestataire_id, etat)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return json_list_response(AuditDuration, durations, headers)
+
+@router.get("/audits/sla", response_model=SlaReport)
+def read_sla_report(
+    seuil_jours: float = Query(30, gt=0),
+    prestataire_id: Optional[int] = None,
+    etat: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    return get_sla_report(db, seuil_jours, prestataire_id, etat)
+
 @router.get("/audits/{audit_id}", response_model=AuditResponse)
 def read_audit(audit_id: int, db: Session = Depends(get_db)):
     audit = get_audit(db, audit_id)
@@ -26,8 +48,19 @@ def read_audit(audit_id: int, db: Session = Depends(get_db)):
     return audit
 
 @router.get("/audits/", response_model=List[AuditResponse])
-def read_affects(db: Session = Depends(get_db)):
-    return list_audits(db)
+def read_affects(
+    prestataire_id: Optional[int] = None,
+    etat: Optional[str] = None,
+    type_audit: Optional[str] = None,
+    date_debut: Optional[date] = None,
+    date_fin: Optional[date] = None,
+    limit: int = Query(AUDITS_PAGE_MAX, ge=1, le=AUDITS_PAGE_MAX),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    audits, next_cursor = list_audits(db, limit, cursor, prestataire_id, etat, type_audit, date_debut, date_fin)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return json_list_response(AuditResponse, audits, headers)
 
 @router.patch("/audits/{audit_id}/etat", response_model=AuditResponse)
 def update_etat_audit(audit_id: int, etat_update: EtatUpdate, db: Session = Depends(get_db)):
@@ -35,13 +68,8 @@ def update_etat_audit(audit_id: int, etat_update: EtatUpdate, db: Session = Depe
 
 @router.get("/audit/audits/{id}/duration")
 def get_audit_duration(id: int, db: Session = Depends(get_db)):
-    audit = db.query(Audit).filter(Audit.id == id).first()
-    if not audit:
+    durations, _ = get_audit_durations(db, audit_ids=[id])
+    if not durations:
         raise HTTPException(status_code=404, detail="Audit non trouvé")
 
-    duration = audit.total_duration
-    if audit.etat == "En cours" and audit.start_time:
-        elapsed_seconds = (datetime.utcnow() - audit.start_time).total_seconds()
-        duration += elapsed_seconds / 86400
-
-    return {"duration": round(duration, 2)}
+    return {"duration": round(durations[0]["duration"], 2)}
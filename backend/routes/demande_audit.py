@@ -1,10 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Body
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Body, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from database import get_db
-from backend.schemas.demande_audit import DemandeAuditResponse, DemandeAuditBase
+from datetime import date
+from database import get_db, get_async_db
+from backend.schemas.demande_audit import DemandeAuditResponse, DemandeAuditBase, DocumentStatus, DemandeAuditSearchResult, \
+    DemandeAuditListItem
 from backend.models.demande_audit import Demande_Audit
-from backend.services.demande_audit import create_demande_audit, get_audit_by_id, get_all_audits
+from backend.services.demande_audit import create_demande_audit, get_audit_by_id, list_demandes_audit, \
+    DEMANDES_PAGE_MAX
+from backend.services.serialization import json_list_response
+from backend.services.pdf_jobs import wait_for_document
+from backend.services.uploads import store_uploads
+from backend.services.demande_search import search_demandes, SEARCH_PAGE_MAX
 
 from log_config import setup_logger
 
@@ -49,25 +57,60 @@ async def create_audit_request(
     compte_test_profile: str = Form(...),
     urgence: str = Form(...),
     files: List[UploadFile] = File(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    # Appeler la fonction de création de la demande d'audit
-    created_demande = create_demande_audit(type_audit, demandeur_nom_1, demandeur_prenom_1, demandeur_email_1, demandeur_phone_1, demandeur_entite_1,
-                                           demandeur_nom_2, demandeur_prenom_2, demandeur_email_2, demandeur_phone_2, demandeur_entite_2,
-                                           nom_app, description, liste_fonctionalites, type_app, type_app_2, architecture_projet, commentaires_archi,
-                                           protection_waf, commentaires_waf, ports, liste_ports, cert_ssl_domain_name,commentaires_cert_ssl_domain_name,
-                                           sys_exploitation, logiciels_installes, env_tests, donnees_prod, liste_si_actifs, compte_admin,
-                                           nom_domaine, url_app, compte_test_profile, urgence, files, db)
+    # Fichiers écrits par blocs hors de la boucle d'événements, puis création en base
+    # par le service synchrone exécuté sur la connexion asynchrone
+    fichiers = await store_uploads(files)
+    created_demande = await db.run_sync(
+        lambda session: create_demande_audit(
+            type_audit, demandeur_nom_1, demandeur_prenom_1, demandeur_email_1, demandeur_phone_1, demandeur_entite_1,
+            demandeur_nom_2, demandeur_prenom_2, demandeur_email_2, demandeur_phone_2, demandeur_entite_2,
+            nom_app, description, liste_fonctionalites, type_app, type_app_2, architecture_projet, commentaires_archi,
+            protection_waf, commentaires_waf, ports, liste_ports, cert_ssl_domain_name, commentaires_cert_ssl_domain_name,
+            sys_exploitation, logiciels_installes, env_tests, donnees_prod, liste_si_actifs, compte_admin,
+            nom_domaine, url_app, compte_test_profile, urgence, fichiers, session
+        )
+    )
 
     return created_demande
 
-@router.get("/", response_model=List[DemandeAuditResponse])
-def get_audits(db: Session = Depends(get_db)):
+@router.get("/", response_model=List[DemandeAuditListItem])
+def get_audits(
+    etat: Optional[str] = None,
+    type_audit: Optional[str] = None,
+    urgence: Optional[str] = None,
+    date_debut: Optional[date] = None,
+    date_fin: Optional[date] = None,
+    fields: Optional[str] = Query(None, description="colonnes supplémentaires, séparées par des virgules"),
+    limit: int = Query(DEMANDES_PAGE_MAX, ge=1, le=DEMANDES_PAGE_MAX),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
     logger.info("Récupération de la liste des audits")
-    demande_audits = get_all_audits(db)
+    field_list = [name.strip() for name in fields.split(",") if name.strip()] if fields else None
+    demande_audits, next_cursor = list_demandes_audit(
+        db, limit, cursor, etat, type_audit, urgence, date_debut, date_fin, field_list
+    )
     logger.info("Nombre d'audits récupérés: %d", len(demande_audits))
-    return demande_audits
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return json_list_response(DemandeAuditListItem, demande_audits, headers)
+
+
+@router.get("/search", response_model=List[DemandeAuditSearchResult])
+def search_audits(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=SEARCH_PAGE_MAX),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db)
+):
+    logger.info("Recherche des demandes d'audit : %s", q)
+    return json_list_response(DemandeAuditSearchResult, search_demandes(db, q, limit, offset))
 
+@router.get("/{audit_id}/document", response_model=DocumentStatus)
+async def get_audit_document(audit_id: int, wait: float = Query(0, ge=0), db: Session = Depends(get_db)):
+    logger.info("Lecture du statut de la fiche de la demande ID %d", audit_id)
+    return await wait_for_document(db, "demande_audit", audit_id, wait)
 
 @router.get("/{audit_id}", response_model=DemandeAuditResponse)
 def get_audit(audit_id: int, db: Session = Depends(get_db)):
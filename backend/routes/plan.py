@@ -1,17 +1,25 @@
 import os
-from typing import Optional, List, Annotated
+from datetime import datetime
+from typing import Optional, List, Annotated, Literal
 
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from starlette.responses import FileResponse
 
 from backend.models.vulnerability import Vulnerability
-from database import get_db
+from database import get_db, get_async_db
 from backend.models.audit import Audit
 from backend.models.plan import Plan
-from backend.schemas.plan import PlanResponse, PlanCreate, PlanUpdate
+from backend.schemas.plan import PlanResponse, PlanCreate, PlanUpdate, PlanStats
+from backend.schemas.vulnerability import VulnerabiliteResponse
+from backend.services.export_cache import get_cache_stats
+from backend.services.plan_filters import YEAR_MIN, YEAR_MAX
+from backend.services.serialization import json_list_response
+from backend.services.export_jobs import submit_export_job, read_job, STATUT_TERMINE, STATUT_VIDE
 from backend.services.plan import export_plans_to_excel, get_filtered_plans, process_uploaded_plan, update_plan, \
-    compute_vulnerability_summary, serialize_plan, compute_taux_remediation
+    compute_vulnerability_summary, compute_taux_remediation, count_filtered_plans, \
+    get_plan_vulnerabilites, get_plan_stats, plan_comment_texts, PLANS_PAGE_MAX
 
 from log_config import setup_logger
 
@@ -20,7 +28,7 @@ logger = setup_logger()
 router = APIRouter()
 
 @router.post("/upload")
-async def upload_plan(file: UploadFile = File(...), db: Session = Depends(get_db)):
+async def upload_plan(file: UploadFile = File(...), db: AsyncSession = Depends(get_async_db)):
     return await process_uploaded_plan(file, db)
 
 @router.get("/plans/download/")
@@ -36,19 +44,77 @@ def export_plans(db: Session = Depends(get_db),
         date_rapport: Optional[str] = None,
 
         # Filtres par année/mois pour chaque type de date
-        realisation_year: Optional[int] = None,
-        realisation_month: Optional[int] = None,
-        cloture_year: Optional[int] = None,
-        cloture_month: Optional[int] = None,
-        rapport_year: Optional[int] = None,
-        rapport_month: Optional[int] = None):
+        realisation_year: Optional[int] = Query(None, ge=YEAR_MIN, le=YEAR_MAX),
+        realisation_month: Optional[int] = Query(None, ge=1, le=12),
+        cloture_year: Optional[int] = Query(None, ge=YEAR_MIN, le=YEAR_MAX),
+        cloture_month: Optional[int] = Query(None, ge=1, le=12),
+        rapport_year: Optional[int] = Query(None, ge=YEAR_MIN, le=YEAR_MAX),
+        rapport_month: Optional[int] = Query(None, ge=1, le=12)):
     file_path = export_plans_to_excel(db, ref, application, type_audit, niveau_securite, date_realisation, date_cloture, date_rapport, realisation_year,
                                       realisation_month, cloture_year, cloture_month, rapport_year, rapport_month)
 
     if file_path is None:
         raise HTTPException(status_code=404, detail="Aucun plan trouvé à exporter.")
 
-    return FileResponse(file_path, media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", filename=file_path.split("/")[-1])
+    filename = f"plans_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    return FileResponse(file_path, media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", filename=filename)
+
+@router.get("/plans/download/cache")
+def export_cache_stats():
+    return get_cache_stats()
+
+def plan_export_filters(
+        ref: Optional[str] = None,
+        application: Optional[str] = None,
+        type_audit: Optional[str] = None,
+        niveau_securite: Optional[str] = None,
+
+        # Filtres exacts sur les dates
+        date_realisation: Optional[str] = None,
+        date_cloture: Optional[str] = None,
+        date_rapport: Optional[str] = None,
+
+        # Filtres par année/mois pour chaque type de date
+        realisation_year: Optional[int] = Query(None, ge=YEAR_MIN, le=YEAR_MAX),
+        realisation_month: Optional[int] = Query(None, ge=1, le=12),
+        cloture_year: Optional[int] = Query(None, ge=YEAR_MIN, le=YEAR_MAX),
+        cloture_month: Optional[int] = Query(None, ge=1, le=12),
+        rapport_year: Optional[int] = Query(None, ge=YEAR_MIN, le=YEAR_MAX),
+        rapport_month: Optional[int] = Query(None, ge=1, le=12)) -> dict:
+    return {
+        "ref": ref, "application": application, "type_audit": type_audit, "niveau_securite": niveau_securite,
+        "date_realisation": date_realisation, "date_cloture": date_cloture, "date_rapport": date_rapport,
+        "realisation_year": realisation_year, "realisation_month": realisation_month,
+        "cloture_year": cloture_year, "cloture_month": cloture_month,
+        "rapport_year": rapport_year, "rapport_month": rapport_month,
+    }
+
+@router.post("/plans/exports/", status_code=202)
+def submit_export(filters: dict = Depends(plan_export_filters)):
+    logger.info("Soumission d'un export de plans en arrière-plan")
+    return submit_export_job(filters)
+
+@router.get("/plans/exports/{job_id}")
+def get_export_status(job_id: str):
+    job = read_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Export non trouvé.")
+    return job
+
+@router.get("/plans/exports/{job_id}/download")
+def download_export(job_id: str):
+    job = read_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Export non trouvé.")
+    if job["statut"] == STATUT_VIDE:
+        raise HTTPException(status_code=404, detail="Aucun plan trouvé à exporter.")
+    if job["statut"] != STATUT_TERMINE:
+        raise HTTPException(status_code=409, detail=f"Export non disponible (statut : {job['statut']}).")
+    if not os.path.exists(job["fichier"]):
+        raise HTTPException(status_code=410, detail="Le fichier d'export a expiré.")
+
+    filename = f"plans_export_{datetime.fromtimestamp(job['updated_at']).strftime('%Y%m%d_%H%M%S')}.xlsx"
+    return FileResponse(job["fichier"], media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", filename=filename)
 
 @router.get("/plans/", response_model=List[PlanResponse])
 def get_plans(
@@ -64,15 +130,21 @@ def get_plans(
     date_rapport: Optional[str] = None,
 
     # Filtres par année/mois pour chaque type de date
-    realisation_year: Optional[int] = None,
-    realisation_month: Optional[int] = None,
-    cloture_year: Optional[int] = None,
-    cloture_month: Optional[int] = None,
-    rapport_year: Optional[int] = None,
-    rapport_month: Optional[int] = None
+    realisation_year: Optional[int] = Query(None, ge=YEAR_MIN, le=YEAR_MAX),
+    realisation_month: Optional[int] = Query(None, ge=1, le=12),
+    cloture_year: Optional[int] = Query(None, ge=YEAR_MIN, le=YEAR_MAX),
+    cloture_month: Optional[int] = Query(None, ge=1, le=12),
+    rapport_year: Optional[int] = Query(None, ge=YEAR_MIN, le=YEAR_MAX),
+    rapport_month: Optional[int] = Query(None, ge=1, le=12),
+
+    # Pagination par curseur (le curseur suivant est renvoyé dans l'en-tête X-Next-Cursor)
+    limit: int = Query(PLANS_PAGE_MAX, ge=1, le=PLANS_PAGE_MAX),
+    cursor: Optional[str] = None,
+    order_by: Literal["id", "date_realisation"] = "id",
+    with_total: bool = False,
+    include: str = "vulnerabilites"
 ):
-    plans = get_filtered_plans(
-        db=db,
+    filters = dict(
         ref=ref,
         application=application,
         type_audit=type_audit,
@@ -87,12 +159,38 @@ def get_plans(
         rapport_year=rapport_year,
         rapport_month=rapport_month
     )
+    include_vulnerabilites = "vulnerabilites" in include.split(",")
+
+    plans, next_cursor = get_filtered_plans(
+        db=db,
+        limit=limit,
+        cursor=cursor,
+        order_by=order_by,
+        include_vulnerabilites=include_vulnerabilites,
+        **filters
+    )
+
+    headers = {}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    if with_total:
+        headers["X-Total-Count"] = str(count_filtered_plans(db, **filters))
+
+    # Projection validée par PlanResponse ; la clé vulnerabilites n'est présente que si elle a été demandée
+    return json_list_response(PlanResponse, plans, headers, exclude_unset=True)
+
+@router.get("/plans/{plan_id}/vulnerabilites", response_model=List[VulnerabiliteResponse])
+def get_plan_vulnerabilites_endpoint(plan_id: int, db: Session = Depends(get_db)):
+    return get_plan_vulnerabilites(db, plan_id)
 
-    return [serialize_plan(p) for p in plans]
+@router.get("/stats", response_model=List[PlanStats])
+def get_stats(db: Session = Depends(get_db)):
+    logger.info("Lecture des statistiques des plans")
+    return get_plan_stats(db)
 
 @router.post("/plan/", response_model=PlanResponse)
 def create_plan(plan: PlanCreate, db: Session = Depends(get_db)):
-    db_plan = Plan(**plan.dict(exclude={"vulnerabilites"}))
+    db_plan = Plan(**plan.dict(exclude={"vulnerabilites"}), **plan_comment_texts(plan.commentaire_dcsg, plan.commentaire_cp))
     db.add(db_plan)
     db.flush()
     db.commit()
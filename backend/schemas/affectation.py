@@ -22,6 +22,7 @@ class AffectResponse(BaseModel):
     ips: List[IPResponse]
     date_affectation: date
     affectationpath: Optional[str] = None
+    document_statut: Optional[str] = None
 
     class Config:
         from_attributes = True
\ No newline at end of file
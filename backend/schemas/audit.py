@@ -18,6 +18,33 @@ class AuditResponse(BaseModel):
     prestataire: Optional[PrestataireResponse]
     auditeurs: List[AuditeurResponse] = []
 
+class AuditDuration(BaseModel):
+    id: int
+    etat: Optional[str] = None
+    prestataire_id: Optional[int] = None
+    duration: float
+
+class SlaPrestataire(BaseModel):
+    prestataire_id: Optional[int] = None
+    prestataire_nom: Optional[str] = None
+    nb_audits: int
+    duree_moyenne: float
+    duree_max: float
+    nb_depassements: int
+
+class SlaEtat(BaseModel):
+    etat: Optional[str] = None
+    nb_audits: int
+    duree_moyenne: float
+    duree_totale: float
+    nb_depassements: int
+
+class SlaReport(BaseModel):
+    seuil_jours: float
+    depassements: List[AuditDuration]
+    par_prestataire: List[SlaPrestataire]
+    par_etat: List[SlaEtat]
+
 class EtatUpdate(BaseModel):
     new_etat: str
 
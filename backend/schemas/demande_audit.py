@@ -1,10 +1,16 @@
 import os
 
 from pydantic import BaseModel, EmailStr, validator
-from typing import Optional, List
+from typing import Optional, List, Union
 from datetime import date, datetime
 
 
+class FichierAttache(BaseModel):
+    nom: str
+    sha256: str
+    taille: int
+    chemin: str
+
 class DemandeAuditBase(BaseModel):
     type_audit: str
 
@@ -53,7 +59,8 @@ class DemandeAuditBase(BaseModel):
     compte_test_profile: str
     urgence: str
 
-    fichiers_attaches: Optional[List[str]] = []
+    # Anciennes demandes : chemins seuls ; nouvelles : métadonnées du fichier
+    fichiers_attaches: Optional[List[Union[FichierAttache, str]]] = []
 class DemandeAuditCreate(DemandeAuditBase):
     pass
 
@@ -63,13 +70,44 @@ class DemandeAuditResponse(DemandeAuditBase):
     type_audit: str
     etat: str
     fiche_demande_path: Optional[str] = None
+    document_statut: Optional[str] = None
 
     @property
     def fichier_url(self):
         if self.fichiers_attaches:
-            return f"http://localhost:8000/{self.fichiers_attaches[0].replace(os.sep, '/')}"
+            fichier = self.fichiers_attaches[0]
+            chemin = fichier.chemin if isinstance(fichier, FichierAttache) else fichier
+            return f"http://localhost:8000/{chemin.replace(os.sep, '/')}"
         return None
 
+class DemandeAuditListItem(BaseModel):
+    id: int
+    nom_app: str
+    type_audit: str
+    etat: Optional[str] = None
+    urgence: str
+    date_creation: date
+
+    class Config:
+        # Colonnes demandées en plus avec fields=
+        extra = "allow"
+
+class DemandeAuditSearchResult(BaseModel):
+    id: int
+    nom_app: str
+    type_audit: str
+    etat: Optional[str] = None
+    urgence: str
+    date_creation: date
+    score: float
+
+class DocumentStatus(BaseModel):
+    id: int
+    statut: str
+    chemin: Optional[str] = None
+    erreur: Optional[str] = None
+    tentatives: Optional[int] = None
+
 class DemandeAuditOut(DemandeAuditBase):
     id: int
     date_creation: date
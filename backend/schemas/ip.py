@@ -1,3 +1,5 @@
+from datetime import date
+
 from pydantic import BaseModel
 from typing import Optional, List
 
@@ -15,3 +17,27 @@ class IPResponse(IPSchema):
 
     class Config:
         from_attributes = True
+
+
+class IPAffectationSummary(BaseModel):
+    id: int
+    demande_audit_id: int
+    prestataire_id: Optional[int] = None
+    prestataire_nom: Optional[str] = None
+    type_audit: str
+    date_affectation: date
+
+class IPNetworkResponse(BaseModel):
+    id: int
+    adresse_ip: str
+    version_ip: Optional[int] = None
+    ports: List[PortResponse]
+    affectations: List[IPAffectationSummary]
+
+class PortExposureResponse(BaseModel):
+    port_id: int
+    port: int
+    status: str
+    ip_id: int
+    adresse_ip: str
+    affectations: List[IPAffectationSummary]
@@ -3,7 +3,7 @@ from typing import Optional, Dict, Any, List
 from pydantic import BaseModel
 from datetime import date
 
-from backend.schemas.vulnerability import VulnerabiliteCreate, VulnerabiliteResponse
+from backend.schemas.vulnerability import VulnerabiliteCreate, VulnerabiliteResponse, VulnerabiliteUpdate
 
 
 class VulnerabilitySummary(BaseModel):
@@ -45,7 +45,7 @@ class PlanUpdate(BaseModel):
     taux_remediation: Optional[float]
     commentaire_dcsg: Optional[str]
     commentaire_cp: Optional[str]
-    vulnerabilites: Optional[List[VulnerabiliteCreate]] = []
+    vulnerabilites: Optional[List[VulnerabiliteUpdate]] = []
 
 class PlanResponse(PlanBase):
     id: int
@@ -53,4 +53,12 @@ class PlanResponse(PlanBase):
     vulnerabilites: List[VulnerabiliteResponse] = []
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class PlanStats(BaseModel):
+    annee: Optional[int] = None
+    type_audit: Optional[str] = None
+    niveau_securite: Optional[str] = None
+    nb_plans: int
+    vulnerabilites: VulnerabilitySummary
+    taux_remediation_moyen: Optional[float] = None
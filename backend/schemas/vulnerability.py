@@ -15,6 +15,7 @@ class VulnerabiliteResponse(VulnerabiliteBase):
     id: int
 
 class VulnerabiliteUpdate(VulnerabiliteBase):
-    pass
+    id: Optional[int] = None  # Absent pour une nouvelle vulnérabilité
+
     class Config:
         from_attributes = True
\ No newline at end of file
@@ -0,0 +1,29 @@
+"""Ajoute les colonnes de recherche des IPs et normalise les adresses existantes.
+
+Usage : python -m backend.scripts.backfill_ip_addresses [--batch-size 1000]
+"""
+import argparse
+
+from database import SessionLocal, sync_schema
+# Les relations sont déclarées par nom de classe : tous les modèles liés doivent être chargés
+from backend.models import affectation, audit, auditeur, demande_audit, ip, ports, prestataire  # noqa: F401
+from backend.services.ip import backfill_ip_columns
+from log_config import setup_logger
+
+logger = setup_logger()
+
+def main():
+    parser = argparse.ArgumentParser(description="Normalise les adresses IP et remplit leur représentation binaire.")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    sync_schema()
+    db = SessionLocal()
+    try:
+        stats = backfill_ip_columns(db, args.batch_size)
+    finally:
+        db.close()
+    logger.info(f"Backfill terminé : {stats['mises_a_jour']} IP(s) normalisée(s), {stats['invalides']} invalide(s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Ajoute les colonnes texte des commentaires de plans et les remplit.
+
+Usage : python -m backend.scripts.backfill_plan_comments [--batch-size 1000]
+"""
+import argparse
+
+from sqlalchemy import select, update, or_, and_
+
+from database import SessionLocal, sync_schema
+from backend.models.plan import Plan
+from backend.models.vulnerability import Vulnerability
+from backend.services.plan import plan_comment_texts
+from log_config import setup_logger
+
+logger = setup_logger()
+
+def backfill(batch_size: int) -> int:
+    db = SessionLocal()
+    last_id, total = 0, 0
+    try:
+        while True:
+            rows = db.execute(
+                select(Plan.id, Plan.commentaire_dcsg, Plan.commentaire_cp)
+                .where(Plan.id > last_id)
+                .where(or_(
+                    and_(Plan.commentaire_dcsg.isnot(None), Plan.commentaire_dcsg_texte.is_(None)),
+                    and_(Plan.commentaire_cp.isnot(None), Plan.commentaire_cp_texte.is_(None)),
+                ))
+                .order_by(Plan.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+
+            db.execute(update(Plan), [
+                {"id": row.id, **plan_comment_texts(row.commentaire_dcsg, row.commentaire_cp)} for row in rows
+            ])
+            db.commit()
+
+            last_id = rows[-1].id
+            total += len(rows)
+            logger.info(f"{total} plan(s) mis à jour")
+    finally:
+        db.close()
+    return total
+
+def main():
+    parser = argparse.ArgumentParser(description="Remplit les versions texte des commentaires des plans.")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    sync_schema()
+    total = backfill(args.batch_size)
+    logger.info(f"Backfill terminé : {total} plan(s) traité(s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Benchmark du chargement des affectations : lignes lues en base contre objets renvoyés.
+
+Usage : DATABASE_URL=sqlite:///./bench.db python -m backend.scripts.bench_affect_loading
+        [--affectations 200] [--auditeurs 5] [--ips 20] [--ports 10] [--repetitions 5]
+
+Par défaut : 200 affectations x 5 auditeurs x 20 IPs x 10 ports. On compare :
+- avant : une seule requête joinedload (auditeurs, ips.ports, prestataire,
+  demande_audit), qui renvoie auditeurs x IPs x ports lignes par affectation ;
+- selectinload : objets ORM chargés avec une requête par collection ;
+- après : list_affects (colonnes utiles en dicts, une requête par collection),
+  sans limite puis pour une page de 50.
+Pour chaque variante : requêtes émises, lignes lues (les requêtes capturées sont
+rejouées pour compter leurs lignes), objets présents dans la session et durée.
+"""
+import argparse
+
+from sqlalchemy import event
+from sqlalchemy.orm import joinedload, selectinload
+
+from database import SessionLocal, engine, sync_schema
+from backend.models import affectation, audit, auditeur, demande_audit, ip, ports, prestataire, plan, vulnerability  # noqa: F401
+from backend.models.affectation import Affectation
+from backend.models.ip import IP
+from backend.scripts.bench_common import log_table, measure, require_scratch_database
+from backend.scripts.bench_seed import cleanup_affectations, seed_affectations
+from backend.services.affectation import list_affects
+from log_config import setup_logger
+
+logger = setup_logger()
+
+BENCH_PREFIX = "BENCH_AFFECTS"
+PAGE_SIZE = 50
+
+def count_loading(db, load) -> dict:
+    """Exécute load() une fois en capturant ses requêtes, puis les rejoue pour compter les lignes lues."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    db.expunge_all()
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        affects = load()
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    objects = len(db.identity_map)
+
+    rows = 0
+    with engine.connect() as conn:
+        for statement, parameters in statements:
+            rows += len(conn.exec_driver_sql(statement, parameters).fetchall())
+    db.expunge_all()
+    return {"affectations": len(affects), "requetes": len(statements), "lignes": rows, "objets": objects}
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare les chargements de la liste des affectations.")
+    parser.add_argument("--affectations", type=int, default=200)
+    parser.add_argument("--auditeurs", type=int, default=5)
+    parser.add_argument("--ips", type=int, default=20)
+    parser.add_argument("--ports", type=int, default=10)
+    parser.add_argument("--repetitions", type=int, default=5)
+    args = parser.parse_args()
+    require_scratch_database()
+
+    sync_schema()
+    db = SessionLocal()
+    try:
+        cleanup_affectations(db, BENCH_PREFIX)
+        prestataire_id = seed_affectations(db, BENCH_PREFIX, args.affectations, args.auditeurs, args.ips, args.ports)
+
+        def legacy():
+            # Chargement d'origine : un seul SELECT avec toutes les jointures
+            return db.query(Affectation).options(
+                joinedload(Affectation.auditeurs),
+                joinedload(Affectation.ips).joinedload(IP.ports),
+                joinedload(Affectation.prestataire),
+                joinedload(Affectation.demande_audit)
+            ).filter(Affectation.prestataire_id == prestataire_id).all()
+
+        def selectin():
+            return db.query(Affectation).options(
+                selectinload(Affectation.auditeurs),
+                selectinload(Affectation.ips).selectinload(IP.ports)
+            ).filter(Affectation.prestataire_id == prestataire_id).all()
+
+        def projected():
+            return list_affects(db, prestataire_id=prestataire_id)[0]
+
+        def projected_page():
+            return list_affects(db, limit=PAGE_SIZE, prestataire_id=prestataire_id)[0]
+
+        rows = []
+        for name, load in (
+            ("avant : joinedload", legacy),
+            ("selectinload", selectin),
+            ("après : colonnes", projected),
+            (f"après : limit={PAGE_SIZE}", projected_page),
+        ):
+            counts = count_loading(db, load)
+            timing = measure(lambda: (load(), db.expunge_all()), args.repetitions)
+            rows.append((name, counts["affectations"], counts["requetes"], counts["lignes"], counts["objets"],
+                         timing["median_ms"]))
+
+        log_table(
+            f"Chargement des affectations ({args.affectations} x {args.auditeurs} auditeurs x {args.ips} IPs "
+            f"x {args.ports} ports, {args.repetitions} répétitions)",
+            ["variante", "affectations", "requêtes", "lignes lues", "objets", "médiane ms"],
+            rows,
+        )
+    finally:
+        db.rollback()
+        cleanup_affectations(db, BENCH_PREFIX)
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""Outils partagés par les scripts de benchmark (backend/scripts/bench_*.py).
+
+Les benchmarks insèrent des données synthétiques : ils refusent de s'exécuter
+tant que DATABASE_URL ne désigne pas explicitement une base jetable, par exemple
+DATABASE_URL=sqlite:///./bench.db python -m backend.scripts.bench_plan_refs
+"""
+import os
+import statistics
+import sys
+import time
+from typing import Callable, List, Sequence
+
+from log_config import setup_logger
+
+logger = setup_logger()
+
+def require_scratch_database():
+    if not os.getenv("DATABASE_URL"):
+        sys.exit("Définissez DATABASE_URL vers une base de test : le benchmark y insère des données synthétiques.")
+
+def measure(func: Callable, repeat: int = 5) -> dict:
+    """Exécute func `repeat` fois et retourne les durées médiane et minimale en millisecondes."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": statistics.median(durations), "min_ms": min(durations)}
+
+def log_table(title: str, headers: Sequence[str], rows: List[Sequence]):
+    # Tableau aligné dans le journal, une ligne par mesure
+    cells = [[str(h) for h in headers]] + [[f"{v:.2f}" if isinstance(v, float) else str(v) for v in row] for row in rows]
+    widths = [max(len(row[i]) for row in cells) for i in range(len(headers))]
+    logger.info(title)
+    for row in cells:
+        logger.info("  " + "  ".join(value.rjust(width) for value, width in zip(row, widths)))
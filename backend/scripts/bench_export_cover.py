@@ -0,0 +1,80 @@
+"""Micro-benchmark du coût de la page de garde par export de plans.
+
+Usage : DATABASE_URL=sqlite:///./bench.db python -m backend.scripts.bench_export_cover [--repetitions 30]
+
+Compare, pour un classeur contenant seulement la page de garde :
+- avant : Page_de_garde.xlsx rechargé et recopié cellule par cellule, styles
+  copiés un à un, logo relu depuis le disque (export d'origine) ;
+- après : page de garde compilée une fois puis estampillée dans un classeur
+  write-only (write_cover_sheet).
+Aucune donnée n'est écrite en base (le service plan s'y connecte seulement à l'import).
+"""
+import argparse
+import os
+from copy import copy
+from io import BytesIO
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.drawing.image import Image as XLImage
+
+from backend.scripts.bench_common import log_table, measure
+from backend.services.plan import COVER_PATH, LOGO_PATH, compile_cover_template, write_cover_sheet
+from log_config import setup_logger
+
+logger = setup_logger()
+
+def legacy_cover_export():
+    # Reprise du code d'export d'origine, limitée à la page de garde
+    cover_ws = load_workbook(COVER_PATH).active
+    final_wb = Workbook()
+    final_wb.remove(final_wb.active)
+
+    new_cover_ws = final_wb.create_sheet("Page de garde")
+    for row in cover_ws.iter_rows():
+        for cell in row:
+            new_cell = new_cover_ws.cell(row=cell.row, column=cell.column, value=cell.value)
+            if cell.has_style:
+                new_cell.font = copy(cell.font)
+                new_cell.border = copy(cell.border)
+                new_cell.fill = copy(cell.fill)
+                new_cell.number_format = copy(cell.number_format)
+                new_cell.protection = copy(cell.protection)
+                new_cell.alignment = copy(cell.alignment)
+    for col_letter, dim in cover_ws.column_dimensions.items():
+        new_cover_ws.column_dimensions[col_letter].width = dim.width
+    for merged_cell in cover_ws.merged_cells.ranges:
+        new_cover_ws.merge_cells(str(merged_cell))
+    if os.path.exists(LOGO_PATH):
+        img = XLImage(LOGO_PATH)
+        img.width, img.height = 64 * 4, 20 * 7
+        new_cover_ws.add_image(img, 'C18')
+
+    final_wb.save(BytesIO())
+
+def cached_cover_export():
+    final_wb = Workbook(write_only=True)
+    write_cover_sheet(final_wb)
+    final_wb.save(BytesIO())
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare le coût de la page de garde avant et après compilation.")
+    parser.add_argument("--repetitions", type=int, default=30)
+    args = parser.parse_args()
+
+    compile_once = measure(compile_cover_template, 1)
+    cached_cover_export()  # Compile la page de garde mise en cache avant les mesures
+
+    legacy = measure(legacy_cover_export, args.repetitions)
+    cached = measure(cached_cover_export, args.repetitions)
+    log_table(
+        f"Page de garde par export ({args.repetitions} répétitions, ms)",
+        ["variante", "médiane", "min"],
+        [
+            ("avant : rechargement + copie", legacy["median_ms"], legacy["min_ms"]),
+            ("après : modèle compilé", cached["median_ms"], cached["min_ms"]),
+            ("compilation (une fois)", compile_once["median_ms"], compile_once["min_ms"]),
+        ],
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""Benchmark du rendu de 100 fiches PDF (affectations et demandes d'audit).
+
+Usage : python -m backend.scripts.bench_pdf_render [--fiches 100] [--repetitions 3]
+
+Compare, pour chaque template :
+- avant : Environment(FileSystemLoader) créé à chaque fiche, template relu et
+  recompilé, logo référencé en file:/// et feuille de style en <style> dans le
+  document, analysée à chaque rendu avec une configuration de polices neuve ;
+- après : pdf_render (environnement partagé, logo en data URI, CSS et polices réutilisées).
+Chaque fiche a un contenu différent pour que le cache de PDF par contenu ne serve
+jamais un fichier existant.
+Avant la mesure, une fiche de chaque type est mise en page des deux façons et les
+deux résultats sont comparés (nombre de pages, position et texte de chaque boîte).
+Si WeasyPrint ne peut pas être chargé (bibliothèques pango absentes), seule la
+partie template est mesurée et la comparaison porte sur le HTML et la CSS.
+Aucune donnée n'est écrite en base ; les PDF sont écrits dans un répertoire temporaire.
+"""
+import argparse
+import os
+import tempfile
+from datetime import date
+from types import SimpleNamespace
+
+from jinja2 import Environment, FileSystemLoader
+
+from backend.scripts.bench_common import log_table, measure
+from backend.services.pdf_render import (
+    LOGO_PATH, TEMPLATES_DIR, get_font_config, get_logo_data_uri, get_stylesheet, get_template, render_pdf, warm_up,
+)
+from log_config import setup_logger
+
+logger = setup_logger()
+
+AFFECT_TEMPLATE = "affect_template.html"
+DEMANDE_TEMPLATE = "fiche_demande_audit_template.html"
+
+def weasyprint_available() -> bool:
+    try:
+        import weasyprint  # noqa: F401
+    except (ImportError, OSError) as e:
+        logger.warning(f"WeasyPrint indisponible, mesure limitée aux templates : {e}")
+        return False
+    return True
+
+def demande_fields(nom_app: str, index: int) -> dict:
+    return {
+        "type_audit": "Pentest", "date_creation": date(2030, 1 + index % 12, 1 + index % 28), "nom_app": nom_app,
+        "demandeur_nom_1": "Bench", "demandeur_prenom_1": "CP", "demandeur_email_1": f"cp{index}@bench.ma",
+        "demandeur_phone_1": "0600000000", "demandeur_entite_1": "DSI",
+        "demandeur_nom_2": "Bench", "demandeur_prenom_2": "Backup", "demandeur_email_2": f"backup{index}@bench.ma",
+        "demandeur_phone_2": "0600000001", "demandeur_entite_2": "DSI",
+        "description": "Application de démonstration " * 20, "liste_fonctionalites": "Connexion, virements " * 10,
+        "type_app": "Web", "type_app_2": "Interne, Externe", "architecture_projet": True, "protection_waf": True,
+        "commentaires_waf": "WAF en coupure " * 10, "ports": True, "liste_ports": "443, 8443",
+        "cert_ssl_domain_name": True, "commentaires_cert_ssl_domain_name": "Certificat interne " * 10,
+        "sys_exploitation": "Linux", "logiciels_installes": "nginx, postgres " * 10, "env_tests": "recette",
+        "donnees_prod": False, "liste_si_actifs": "SI " * 20, "compte_admin": "admin", "nom_domaine": "bench.ma",
+        "url_app": f"https://app{index}.bench.ma", "compte_test_profile": "Profil testeur " * 10, "urgence": "Normale",
+    }
+
+def make_fiches(count: int, run: int) -> list:
+    # Contenu unique par fiche et par passage : le cache de PDF par contenu n'est jamais utilisé
+    fiches = []
+    for i in range(count):
+        demande = SimpleNamespace(id=i, **demande_fields(f"Application {run}-{i}", i))
+        affect = SimpleNamespace(
+            id=i, demande_audit_id=i, demande_audit=demande, type_audit="Pentest",
+            prestataire=SimpleNamespace(nom=f"Prestataire {i % 7}"), date_affectation=date(2030, 1 + i % 12, 1),
+            auditeurs=[SimpleNamespace(nom="Auditeur", prenom=str(k), email=f"auditeur{k}@bench.ma", phone="0600000000")
+                       for k in range(3)],
+            ips=[SimpleNamespace(adresse_ip=f"10.{run % 256}.{i % 256}.{k}",
+                                 ports=[SimpleNamespace(port=port, status="open") for port in (22, 443, 8443)])
+                 for k in range(5)],
+        )
+        fiches.append((
+            (AFFECT_TEMPLATE, {"affect": affect}),
+            (DEMANDE_TEMPLATE, {"demande_audit": demande, "fichiers": [f"architecture_{i}.pdf"]}),
+        ))
+    return fiches
+
+def stylesheet_path(template_name: str) -> str:
+    return os.path.join(TEMPLATES_DIR, os.path.splitext(template_name)[0] + ".css")
+
+def legacy_html(template_name: str, context: dict) -> str:
+    # Rendu d'origine : nouvel environnement, template relu et compilé à chaque fiche,
+    # feuille de style remise dans le <head> comme dans l'ancien template
+    env = Environment(loader=FileSystemLoader(TEMPLATES_DIR))
+    logo_path_url = f"file:///{LOGO_PATH.replace(os.sep, '/')}"
+    with open(stylesheet_path(template_name), encoding="utf-8") as f:
+        style = f"<style>\n{f.read()}</style>\n"
+    html_content = env.get_template(template_name).render(logo_path=logo_path_url, **context)
+    return html_content.replace("</head>", style + "</head>", 1)
+
+def legacy_document(template_name: str, context: dict):
+    from weasyprint import HTML
+    return HTML(string=legacy_html(template_name, context)).render()
+
+def cached_document(template_name: str, context: dict):
+    from weasyprint import HTML
+    html_content = get_template(template_name).render(logo_path=get_logo_data_uri(), **context)
+    return HTML(string=html_content, base_url=TEMPLATES_DIR).render(
+        stylesheets=[get_stylesheet(template_name)], font_config=get_font_config()
+    )
+
+def layout_signature(document) -> list:
+    # Type, position, taille et texte de chaque boîte, page par page
+    return [
+        [(type(box).__name__, round(box.position_x, 2), round(box.position_y, 2),
+          round(box.width or 0, 2), round(box.height or 0, 2), getattr(box, "text", None))
+         for box in page._page_box.descendants()]
+        for page in document.pages
+    ]
+
+def compare_fiches(full_pdf: bool) -> list:
+    rows = []
+    for template_name, context in make_fiches(1, run=0)[0]:
+        if full_pdf:
+            before, after = layout_signature(legacy_document(template_name, context)), \
+                layout_signature(cached_document(template_name, context))
+            details = f"{len(before)} / {len(after)} pages, {sum(map(len, before))} / {sum(map(len, after))} boîtes"
+        else:
+            # Sans WeasyPrint : le document d'origine doit se retrouver à partir du template et de sa CSS
+            with open(stylesheet_path(template_name), encoding="utf-8") as f:
+                css = f.read()
+            before, after = legacy_html(template_name, context), \
+                get_template(template_name).render(logo_path=get_logo_data_uri(), **context)
+            before = before.replace(f"<style>\n{css}</style>\n", "").replace(
+                f"file:///{LOGO_PATH.replace(os.sep, '/')}", get_logo_data_uri())
+            details = f"{len(after)} caractères de HTML"
+        rows.append((template_name, "identique" if before == after else "DIFFÉRENT", details))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesure le rendu des fiches PDF avant et après pdf_render.")
+    parser.add_argument("--fiches", type=int, default=100)
+    parser.add_argument("--repetitions", type=int, default=3)
+    args = parser.parse_args()
+
+    full_pdf = weasyprint_available()
+    if full_pdf:
+        warm_up(AFFECT_TEMPLATE, DEMANDE_TEMPLATE)
+    log_table("Comparaison avant / après d'une fiche de chaque type", ["template", "résultat", "détail"],
+              compare_fiches(full_pdf))
+
+    rows = []
+    with tempfile.TemporaryDirectory() as pdf_dir:
+        for position, template_name in enumerate((AFFECT_TEMPLATE, DEMANDE_TEMPLATE)):
+            # Fiches préparées hors mesure : un lot neuf par passage (échauffement + répétitions des deux variantes)
+            batches = iter([
+                [fiche[position][1] for fiche in make_fiches(args.fiches, run)]
+                for run in range(1 + 2 * args.repetitions)
+            ])
+
+            def legacy():
+                for index, context in enumerate(next(batches)):
+                    if full_pdf:
+                        from weasyprint import HTML
+                        HTML(string=legacy_html(template_name, context)).write_pdf(
+                            os.path.join(pdf_dir, f"avant_{index}.pdf"))
+                    else:
+                        legacy_html(template_name, context)
+
+            def cached():
+                for context in next(batches):
+                    if full_pdf:
+                        render_pdf(template_name, pdf_dir, **context)
+                    else:
+                        get_template(template_name).render(logo_path=get_logo_data_uri(), **context)
+
+            cached()  # Compilation du template et lecture du logo hors mesure
+            for variant, func in (("avant", legacy), ("après", cached)):
+                timing = measure(func, args.repetitions)
+                rows.append((template_name, variant, timing["median_ms"], timing["median_ms"] / args.fiches))
+
+    log_table(
+        f"Rendu de {args.fiches} fiches ({'PDF complet' if full_pdf else 'templates seulement'}, "
+        f"{args.repetitions} répétitions, ms)",
+        ["template", "variante", "médiane", "par fiche"],
+        rows,
+    )
+
+if __name__ == "__main__":
+    main()
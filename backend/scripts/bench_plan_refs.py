@@ -0,0 +1,106 @@
+"""Benchmark de l'attribution des références de plans (YYYY_L_NN).
+
+Usage : DATABASE_URL=sqlite:///./bench.db python -m backend.scripts.bench_plan_refs
+        [--tailles 1000,10000,100000] [--repetitions 50]
+
+Pour chaque taille, la table plans est remplie de plans synthétiques répartis sur
+plusieurs années (l'année mesurée en garde toujours 1000), puis on mesure :
+- l'ancien calcul : COUNT(*) ... WHERE extract(year) exécuté à chaque nouveau plan ;
+- reserve_plan_refs pour une référence, puis pour un bloc de 500 (import).
+Le coût de reserve_plan_refs ne dépend pas de la taille de la table.
+"""
+import argparse
+from datetime import date
+
+from sqlalchemy import delete, extract, func, insert, select
+
+from database import SessionLocal, sync_schema
+from backend.models.plan import Plan
+from backend.models.plan_ref_sequence import PlanRefSequence
+from backend.models.vulnerability import Vulnerability  # noqa: F401
+from backend.scripts.bench_common import log_table, measure, require_scratch_database
+from backend.services.plan import reserve_plan_refs
+from log_config import setup_logger
+
+logger = setup_logger()
+
+BENCH_PREFIX = "BENCH_REF_"
+YEARS = list(range(2070, 2090))
+TARGET_YEAR = 2080
+# Plans déjà présents pour l'année mesurée : fixe, pour rester sous la limite de 26 x 99 références
+TARGET_YEAR_PLANS = 1000
+OTHER_YEARS = [year for year in YEARS if year != TARGET_YEAR]
+
+def plan_year(i: int) -> int:
+    return TARGET_YEAR if i < TARGET_YEAR_PLANS else OTHER_YEARS[i % len(OTHER_YEARS)]
+
+def seed_plans(db, start: int, stop: int):
+    rows = [
+        {"ref": f"{BENCH_PREFIX}{i}", "application": "bench", "date_realisation": date(plan_year(i), 1 + i % 12, 1)}
+        for i in range(start, stop)
+    ]
+    for offset in range(0, len(rows), 5000):
+        db.execute(insert(Plan), rows[offset:offset + 5000])
+    db.commit()
+
+def cleanup(db):
+    db.execute(delete(Plan).where(Plan.ref.like(f"{BENCH_PREFIX}%")))
+    db.execute(delete(PlanRefSequence).where(PlanRefSequence.annee.in_(YEARS)))
+    db.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesure le coût d'attribution des références de plans.")
+    parser.add_argument("--tailles", default="1000,10000,100000", help="tailles de la table plans, séparées par des virgules")
+    parser.add_argument("--repetitions", type=int, default=50)
+    args = parser.parse_args()
+    require_scratch_database()
+
+    sync_schema()
+    db = SessionLocal()
+    results = []
+    try:
+        cleanup(db)
+        seeded = 0
+        for size in sorted(int(value) for value in args.tailles.split(",")):
+            seed_plans(db, seeded, size)
+            seeded = size
+
+            def legacy_count():
+                db.execute(select(func.count(Plan.id)).where(extract("year", Plan.date_realisation) == TARGET_YEAR)).scalar()
+
+            def reserve_one():
+                reserve_plan_refs(db, TARGET_YEAR, 1)
+                db.commit()
+
+            def reserve_block():
+                reserve_plan_refs(db, TARGET_YEAR, 500)
+                db.rollback()  # Le bloc n'est pas conservé : la limite annuelle n'est pas atteinte
+
+            # La séquence de l'année est créée (et initialisée par un comptage) à la première attribution
+            db.execute(delete(PlanRefSequence).where(PlanRefSequence.annee == TARGET_YEAR))
+            db.commit()
+            first = measure(reserve_one, 1)
+            db.execute(delete(PlanRefSequence).where(PlanRefSequence.annee == TARGET_YEAR))
+            db.commit()
+            reserve_one()
+
+            results.append((
+                size,
+                measure(legacy_count, args.repetitions)["median_ms"],
+                first["median_ms"],
+                measure(reserve_one, args.repetitions)["median_ms"],
+                measure(reserve_block, args.repetitions)["median_ms"],
+            ))
+            logger.info(f"{size} plans mesurés")
+    finally:
+        cleanup(db)
+        db.close()
+
+    log_table(
+        "Attribution des références (médiane, ms)",
+        ["plans", "ancien COUNT(*)", "1re attribution", "reserve 1", "reserve 500"],
+        results,
+    )
+
+if __name__ == "__main__":
+    main()
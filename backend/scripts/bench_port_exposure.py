@@ -0,0 +1,85 @@
+"""Benchmark de la recherche « qui expose le port X » sur 1M de ports synthétiques.
+
+Usage : DATABASE_URL=sqlite:///./bench.db python -m backend.scripts.bench_port_exposure
+        [--affectations 10000] [--ips 10] [--ports 10] [--repetitions 20] [--sans-index]
+
+Par défaut : 10 000 affectations x 10 IPs x 10 ports, soit 100 000 IPs et 1 000 000
+de ports (la moitié tirés parmi les ports courants). On mesure get_port_exposure pour :
+- la première page d'un port courant (3389), puis la page suivante via le curseur ;
+- la première page d'une plage (8000-8999) ;
+- un port absent des données (0).
+Avec --sans-index, les mêmes requêtes sont rejouées après suppression des index
+ix_ports_port_status et ix_ports_ip_id, recréés ensuite.
+"""
+import argparse
+
+from database import SessionLocal, engine, sync_schema
+from backend.models import affectation, audit, auditeur, demande_audit, ip, ports, prestataire, plan, vulnerability  # noqa: F401
+from backend.models.ports import Port
+from backend.scripts.bench_common import log_table, measure, require_scratch_database
+from backend.scripts.bench_seed import cleanup_affectations, seed_affectations
+from backend.services.ports import get_port_exposure
+from log_config import setup_logger
+
+logger = setup_logger()
+
+BENCH_PREFIX = "BENCH_PORTS"
+EXPOSURE_INDEXES = ("ix_ports_port_status", "ix_ports_ip_id")
+ABSENT_PORT = 0  # Jamais tiré : les ports synthétiques vont de 1 à 65535
+
+def exposure_cases(db, repetitions: int) -> list:
+    _, next_cursor = get_port_exposure(db, 3389, 3389)
+    cases = [
+        ("port 3389, page 1", lambda: get_port_exposure(db, 3389, 3389)),
+        ("port 3389, page 2", lambda: get_port_exposure(db, 3389, 3389, cursor=next_cursor)),
+        ("plage 8000-8999, page 1", lambda: get_port_exposure(db, 8000, 8999)),
+        (f"port {ABSENT_PORT} (absent)", lambda: get_port_exposure(db, ABSENT_PORT, ABSENT_PORT)),
+    ]
+    results = []
+    for name, func in cases:
+        rows, _ = func()
+        timing = measure(func, repetitions)
+        results.append((name, len(rows), timing["median_ms"], timing["min_ms"]))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesure la recherche des hôtes exposant un port.")
+    parser.add_argument("--affectations", type=int, default=10000)
+    parser.add_argument("--ips", type=int, default=10, help="IPs par affectation")
+    parser.add_argument("--ports", type=int, default=10, help="ports par IP")
+    parser.add_argument("--repetitions", type=int, default=20)
+    parser.add_argument("--sans-index", action="store_true", help="compare avec les index de ports supprimés")
+    args = parser.parse_args()
+    require_scratch_database()
+
+    sync_schema()
+    db = SessionLocal()
+    try:
+        cleanup_affectations(db, BENCH_PREFIX)
+        seed_affectations(db, BENCH_PREFIX, args.affectations, auditeurs=1, ips=args.ips, ports=args.ports)
+        total_ports = args.affectations * args.ips * args.ports
+
+        rows = [("avec index", *result) for result in exposure_cases(db, args.repetitions)]
+        if args.sans_index:
+            db.rollback()  # Termine la transaction de lecture avant le DDL
+            indexes = [index for index in Port.__table__.indexes if index.name in EXPOSURE_INDEXES]
+            for index in indexes:
+                index.drop(engine)
+            try:
+                rows += [("sans index", *result) for result in exposure_cases(db, args.repetitions)]
+            finally:
+                for index in indexes:
+                    index.create(engine)
+
+        log_table(
+            f"get_port_exposure sur {total_ports} ports ({args.repetitions} répétitions, ms)",
+            ["index", "requête", "lignes", "médiane", "min"],
+            rows,
+        )
+    finally:
+        db.rollback()
+        cleanup_affectations(db, BENCH_PREFIX)
+        db.close()
+
+if __name__ == "__main__":
+    main()
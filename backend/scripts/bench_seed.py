@@ -0,0 +1,111 @@
+"""Données synthétiques partagées par les benchmarks qui écrivent en base.
+
+Séparé de bench_common pour que les benchmarks sans base (rendu PDF, page de garde)
+n'importent pas les modèles, donc n'ouvrent pas de connexion.
+"""
+import ipaddress
+import random
+from datetime import date
+
+from sqlalchemy import delete, insert, select
+
+from backend.models.affectation import Affectation
+from backend.models.associations import affect_auditeur, affect_ip
+from backend.models.auditeur import Auditeur
+from backend.models.demande_audit import Demande_Audit
+from backend.models.ip import IP
+from backend.models.ports import Port
+from backend.models.prestataire import Prestataire
+from backend.services.ip import ip_columns
+from log_config import setup_logger
+
+logger = setup_logger()
+
+# Ports tirés en priorité pour les données synthétiques, le reste au hasard
+COMMON_PORTS = [21, 22, 25, 53, 80, 110, 143, 443, 445, 1433, 3306, 3389, 5432, 8000, 8080, 8443]
+INSERT_BATCH = 5000
+
+def insert_rows(db, table, rows: list):
+    for offset in range(0, len(rows), INSERT_BATCH):
+        db.execute(insert(table), rows[offset:offset + INSERT_BATCH])
+
+def demande_row(nom_app: str, index: int = 0) -> dict:
+    return {
+        "type_audit": "Pentest", "etat": "En attente", "date_creation": date(2030, 1 + index % 12, 1 + index % 28),
+        "demandeur_nom_1": "Bench", "demandeur_prenom_1": "CP", "demandeur_email_1": f"cp{index}@bench.ma",
+        "demandeur_phone_1": "0600000000", "demandeur_entite_1": "DSI",
+        "demandeur_nom_2": "Bench", "demandeur_prenom_2": "Backup", "demandeur_email_2": f"backup{index}@bench.ma",
+        "demandeur_phone_2": "0600000001", "demandeur_entite_2": "DSI",
+        "nom_app": nom_app, "description": "Application de démonstration " * 20, "liste_fonctionalites": "Connexion, virements " * 10,
+        "type_app": "Web", "type_app_2": "Interne", "architecture_projet": True, "commentaires_archi": "RAS " * 20,
+        "protection_waf": True, "commentaires_waf": "WAF en coupure " * 10, "ports": True, "liste_ports": "443, 8443",
+        "cert_ssl_domain_name": True, "commentaires_cert_ssl_domain_name": "Certificat interne " * 10,
+        "sys_exploitation": "Linux", "logiciels_installes": "nginx, postgres " * 10, "env_tests": "recette",
+        "donnees_prod": False, "liste_si_actifs": "SI " * 20, "compte_admin": "admin", "nom_domaine": "bench.ma",
+        "url_app": f"https://app{index}.bench.ma", "compte_test_profile": "Profil testeur " * 10, "urgence": "Normale",
+        "fichiers_attaches": [],
+    }
+
+def seed_affectations(db, prefix: str, count: int, auditeurs: int, ips: int, ports: int, seed: int = 42) -> int:
+    """Crée `count` affectations d'un prestataire synthétique, avec auditeurs, IPs et ports ; retourne son id."""
+    rng = random.Random(seed)
+    insert_rows(db, Prestataire, [{"nom": f"{prefix}-prestataire"}])
+    prestataire_id = db.scalar(select(Prestataire.id).where(Prestataire.nom == f"{prefix}-prestataire"))
+    insert_rows(db, Demande_Audit, [demande_row(f"{prefix}-demande")])
+    demande_id = db.scalar(select(Demande_Audit.id).where(Demande_Audit.nom_app == f"{prefix}-demande"))
+
+    insert_rows(db, Affectation, [
+        {"demande_audit_id": demande_id, "prestataire_id": prestataire_id, "type_audit": ("Pentest", "Audit de code")[i % 2],
+         "date_affectation": date(2030, 1 + i % 12, 1 + i % 28)}
+        for i in range(count)
+    ])
+    affect_ids = db.scalars(select(Affectation.id).where(Affectation.prestataire_id == prestataire_id).order_by(Affectation.id)).all()
+
+    insert_rows(db, Auditeur, [
+        {"nom": "Bench", "prenom": str(i), "email": f"{prefix}-{i}@bench.ma", "phone": "0600000000", "prestataire_id": prestataire_id}
+        for i in range(count * auditeurs)
+    ])
+    auditeur_ids = db.scalars(select(Auditeur.id).where(Auditeur.prestataire_id == prestataire_id).order_by(Auditeur.id)).all()
+    insert_rows(db, affect_auditeur, [
+        {"affectation_id": affect_id, "auditeur_id": auditeur_ids[n * auditeurs + k]}
+        for n, affect_id in enumerate(affect_ids) for k in range(auditeurs)
+    ])
+
+    # Adresses consécutives dans 10.0.0.0/8, une IP n'appartient qu'à une affectation
+    first_address = int(ipaddress.ip_address("10.0.0.1"))
+    insert_rows(db, IP, [
+        {**ip_columns(str(ipaddress.ip_address(first_address + n * ips + k))), "affectation_id": affect_id}
+        for n, affect_id in enumerate(affect_ids) for k in range(ips)
+    ])
+    ip_rows = db.execute(
+        select(IP.id, IP.affectation_id).join(Affectation, Affectation.id == IP.affectation_id)
+        .where(Affectation.prestataire_id == prestataire_id).order_by(IP.id)
+    ).all()
+    insert_rows(db, affect_ip, [{"affectation_id": row.affectation_id, "ip_id": row.id} for row in ip_rows])
+
+    port_rows = []
+    for row in ip_rows:
+        numbers = set()
+        while len(numbers) < ports:
+            numbers.add(rng.choice(COMMON_PORTS) if rng.random() < 0.5 else rng.randint(1, 65535))
+        port_rows += [{"port": number, "status": "open" if rng.random() < 0.7 else "closed", "ip_id": row.id} for number in numbers]
+    insert_rows(db, Port, port_rows)
+    db.commit()
+    logger.info(f"{count} affectation(s), {len(ip_rows)} IP(s) et {len(port_rows)} port(s) synthétiques créés")
+    return prestataire_id
+
+def cleanup_affectations(db, prefix: str):
+    prestataire_id = db.scalar(select(Prestataire.id).where(Prestataire.nom == f"{prefix}-prestataire"))
+    if prestataire_id is None:
+        return
+    affect_ids = select(Affectation.id).where(Affectation.prestataire_id == prestataire_id)
+    ip_ids = select(IP.id).where(IP.affectation_id.in_(affect_ids))
+    db.execute(delete(Port).where(Port.ip_id.in_(ip_ids)))
+    db.execute(delete(affect_ip).where(affect_ip.c.affectation_id.in_(affect_ids)))
+    db.execute(delete(IP).where(IP.affectation_id.in_(affect_ids)))
+    db.execute(delete(affect_auditeur).where(affect_auditeur.c.affectation_id.in_(affect_ids)))
+    db.execute(delete(Auditeur).where(Auditeur.prestataire_id == prestataire_id))
+    db.execute(delete(Affectation).where(Affectation.prestataire_id == prestataire_id))
+    db.execute(delete(Demande_Audit).where(Demande_Audit.nom_app == f"{prefix}-demande"))
+    db.execute(delete(Prestataire).where(Prestataire.id == prestataire_id))
+    db.commit()
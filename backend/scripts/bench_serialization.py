@@ -0,0 +1,170 @@
+"""Benchmark de la sérialisation des listes /plan/plans/, /affectation/affects/ et /audits/.
+
+Usage : DATABASE_URL=sqlite:///./bench.db python -m backend.scripts.bench_serialization
+        [--plans 2000] [--affectations 200] [--demandes 2000] [--repetitions 5]
+
+Pour chaque liste, on mesure la lecture en base plus la production du corps JSON :
+- avant : objets ORM complets, puis chemin par défaut de FastAPI (validation
+  response_model, dump_python(mode="json") puis json.dumps de JSONResponse) ;
+  les plans passent en plus par serialize_plan (un PlanResponse construit par ligne) ;
+- après : le service de la route et sa réponse (projection en dicts, validée par
+  un TypeAdapter compilé puis rendue par FastJSONResponse).
+Le coût par élément est la médiane divisée par le nombre d'éléments renvoyés
+(la demande rattachée aux affectations synthétiques compte dans /audits/).
+"""
+import argparse
+from datetime import date
+from typing import List
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import delete, select
+from sqlalchemy.orm import selectinload
+
+from database import SessionLocal, sync_schema
+from backend.models import affectation, audit, auditeur, demande_audit, ip, ports, prestataire, plan, vulnerability  # noqa: F401
+from backend.models.affectation import Affectation
+from backend.models.demande_audit import Demande_Audit
+from backend.models.ip import IP
+from backend.models.plan import Plan
+from backend.models.vulnerability import Vulnerability
+from backend.schemas.affectation import AffectResponse
+from backend.schemas.demande_audit import DemandeAuditListItem, DemandeAuditResponse
+from backend.schemas.plan import PlanResponse, VulnerabilitySummary
+from backend.schemas.vulnerability import VulnerabiliteResponse
+from backend.scripts.bench_common import log_table, measure, require_scratch_database
+from backend.scripts.bench_seed import cleanup_affectations, demande_row, insert_rows, seed_affectations
+from backend.services.affectation import list_affects
+from backend.services.demande_audit import list_demandes_audit
+from backend.services.plan import CRITICITES, get_filtered_plans
+from backend.services.serialization import json_list_response
+from log_config import setup_logger
+
+logger = setup_logger()
+
+BENCH_PREFIX = "BENCH_SER"
+VULNS_PER_PLAN = 10
+BENCH_PERIOD = (date(2030, 1, 1), date(2030, 12, 31))
+
+def seed_plans(db, count: int):
+    insert_rows(db, Plan, [
+        {"ref": f"{BENCH_PREFIX}_{i}", "application": BENCH_PREFIX, "type_application": "Web", "type_audit": "Pentest",
+         "date_realisation": date(2030, 1 + i % 12, 1), "niveau_securite": "Moyen", "taux_remediation": 40.0,
+         "nb_vulnerabilites": {**{c: VULNS_PER_PLAN // len(CRITICITES) for c in CRITICITES}, "total": VULNS_PER_PLAN},
+         "commentaire_dcsg": "Suivi trimestriel " * 5, "commentaire_cp": "Correctifs planifiés " * 5}
+        for i in range(count)
+    ])
+    plan_ids = db.scalars(select(Plan.id).where(Plan.application == BENCH_PREFIX)).all()
+    insert_rows(db, Vulnerability, [
+        {"plan_id": plan_id, "titre": f"Vulnérabilité {k}", "criticite": CRITICITES[k % len(CRITICITES)],
+         "pourcentage_remediation": 50.0, "statut_remediation": "En cours", "actions": "Appliquer le correctif"}
+        for plan_id in plan_ids for k in range(VULNS_PER_PLAN)
+    ])
+    db.commit()
+
+def cleanup(db):
+    plan_ids = select(Plan.id).where(Plan.application == BENCH_PREFIX)
+    db.execute(delete(Vulnerability).where(Vulnerability.plan_id.in_(plan_ids)))
+    db.execute(delete(Plan).where(Plan.application == BENCH_PREFIX))
+    db.execute(delete(Demande_Audit).where(Demande_Audit.nom_app.like(f"{BENCH_PREFIX}_%")))
+    db.commit()
+    cleanup_affectations(db, BENCH_PREFIX)
+
+def fastapi_default_body(adapter: TypeAdapter, items) -> bytes:
+    # Chemin de FastAPI quand la route renvoie des objets : validation response_model, puis json.dumps
+    content = adapter.dump_python(adapter.validate_python(items, from_attributes=True), mode="json")
+    return JSONResponse(content=content).body
+
+def serialize_plan(db_plan: Plan) -> PlanResponse:
+    # Conversion ligne par ligne d'origine (supprimée du service)
+    return PlanResponse(
+        id=db_plan.id, ref=db_plan.ref, application=db_plan.application, type_application=db_plan.type_application,
+        type_audit=db_plan.type_audit, date_realisation=db_plan.date_realisation, date_cloture=db_plan.date_cloture,
+        date_rapport=db_plan.date_rapport, niveau_securite=db_plan.niveau_securite, taux_remediation=db_plan.taux_remediation,
+        commentaire_dcsg=db_plan.commentaire_dcsg, commentaire_cp=db_plan.commentaire_cp,
+        nb_vulnerabilites=VulnerabilitySummary(**db_plan.nb_vulnerabilites) if isinstance(db_plan.nb_vulnerabilites, dict) else None,
+        vulnerabilites=[
+            VulnerabiliteResponse(id=v.id, titre=v.titre, criticite=v.criticite, pourcentage_remediation=v.pourcentage_remediation,
+                                  statut_remediation=v.statut_remediation, actions=v.actions)
+            for v in db_plan.vulnerabilites
+        ],
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesure le coût de sérialisation par élément des listes.")
+    parser.add_argument("--plans", type=int, default=2000)
+    parser.add_argument("--affectations", type=int, default=200)
+    parser.add_argument("--demandes", type=int, default=2000)
+    parser.add_argument("--repetitions", type=int, default=5)
+    args = parser.parse_args()
+    require_scratch_database()
+
+    sync_schema()
+    db = SessionLocal()
+    try:
+        cleanup(db)
+        seed_plans(db, args.plans)
+        prestataire_id = seed_affectations(db, BENCH_PREFIX, args.affectations, auditeurs=2, ips=5, ports=3)
+        insert_rows(db, Demande_Audit, [demande_row(f"{BENCH_PREFIX}_{i}", i) for i in range(args.demandes)])
+        db.commit()
+
+        plans_adapter = TypeAdapter(List[PlanResponse])
+        affects_adapter = TypeAdapter(List[AffectResponse])
+        demandes_adapter = TypeAdapter(List[DemandeAuditResponse])
+
+        def legacy_plans():
+            plans = db.query(Plan).options(selectinload(Plan.vulnerabilites)).filter(Plan.application == BENCH_PREFIX).all()
+            fastapi_default_body(plans_adapter, [serialize_plan(p) for p in plans])
+            return len(plans)
+
+        def fast_plans():
+            plans, _ = get_filtered_plans(db, application=BENCH_PREFIX)
+            json_list_response(PlanResponse, plans, exclude_unset=True)
+            return len(plans)
+
+        def legacy_affects():
+            affects = db.query(Affectation).options(
+                selectinload(Affectation.auditeurs), selectinload(Affectation.ips).selectinload(IP.ports)
+            ).filter(Affectation.prestataire_id == prestataire_id).all()
+            fastapi_default_body(affects_adapter, affects)
+            return len(affects)
+
+        def fast_affects():
+            affects, _ = list_affects(db, prestataire_id=prestataire_id)
+            json_list_response(AffectResponse, affects)
+            return len(affects)
+
+        def legacy_demandes():
+            demandes = db.query(Demande_Audit).filter(Demande_Audit.date_creation.between(*BENCH_PERIOD)).all()
+            fastapi_default_body(demandes_adapter, demandes)
+            return len(demandes)
+
+        def fast_demandes():
+            demandes, _ = list_demandes_audit(db, date_debut=BENCH_PERIOD[0], date_fin=BENCH_PERIOD[1])
+            json_list_response(DemandeAuditListItem, demandes)
+            return len(demandes)
+
+        rows = []
+        for name, legacy, fast in [
+            ("/plan/plans/", legacy_plans, fast_plans),
+            ("/affectation/affects/", legacy_affects, fast_affects),
+            ("/audits/", legacy_demandes, fast_demandes),
+        ]:
+            for variant, func in (("avant", legacy), ("après", fast)):
+                count = func()  # Échauffement : compilation des schémas et du cache de requêtes
+                db.expunge_all()
+                timing = measure(lambda: (func(), db.expunge_all()), args.repetitions)
+                rows.append((name, variant, count, timing["median_ms"], timing["median_ms"] * 1000 / count))
+
+        log_table(
+            f"Sérialisation des listes ({args.repetitions} répétitions)",
+            ["route", "variante", "éléments", "médiane ms", "µs / élément"],
+            rows,
+        )
+    finally:
+        db.rollback()
+        cleanup(db)
+        db.close()
+
+if __name__ == "__main__":
+    main()
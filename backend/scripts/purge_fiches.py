@@ -0,0 +1,28 @@
+"""Supprime les fiches PDF qui ne sont plus référencées en base.
+
+Usage : python -m backend.scripts.purge_fiches [--dry-run]
+"""
+import argparse
+
+from database import SessionLocal
+# Les relations sont déclarées par nom de classe : tous les modèles liés doivent être chargés
+from backend.models import affectation, audit, auditeur, demande_audit, ip, ports, prestataire  # noqa: F401
+from backend.services.pdf_jobs import purge_documents
+from log_config import setup_logger
+
+logger = setup_logger()
+
+def main():
+    parser = argparse.ArgumentParser(description="Supprime les fiches PDF non référencées.")
+    parser.add_argument("--dry-run", action="store_true", help="liste les fichiers sans les supprimer")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        stats = purge_documents(db, dry_run=args.dry_run)
+    finally:
+        db.close()
+    logger.info(f"Purge terminée : {stats['supprimes']} fichier(s) sur {stats['fichiers']}, {stats['octets'] / 1024:.0f} Ko libérés")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Régénère en masse les fiches PDF des demandes d'audit et des affectations.
+
+Usage : python -m backend.scripts.regenerate_fiches [--type tous|demande_audit|affectation]
+        [--id-min N] [--id-max N] [--depuis AAAA-MM-JJ] [--jusqua AAAA-MM-JJ]
+        [--workers N] [--batch-size 50] [--reprendre]
+
+Les fiches sont rendues en parallèle sur plusieurs processus ; les chemins sont
+enregistrés par lots. Après chaque lot, le dernier id traité est sauvegardé dans
+le fichier d'état, ce qui permet de reprendre avec --reprendre après une interruption.
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+from sqlalchemy import select, update
+
+from database import SessionLocal, sync_schema
+# Les relations sont déclarées par nom de classe : tous les modèles liés doivent être chargés
+from backend.models import affectation, audit, auditeur, demande_audit, ip, ports, prestataire  # noqa: F401
+from backend.services.pdf_jobs import DOCUMENTS, STATUT_ERREUR, STATUT_PRET, init_worker, render_document
+from log_config import setup_logger
+
+logger = setup_logger()
+
+STATE_FILE = os.path.join("logs", "regenerate_fiches.json")
+
+# Type de document -> colonne de date utilisée par --depuis / --jusqua
+DATE_COLUMNS = {
+    "affectation": "date_affectation",
+    "demande_audit": "date_creation",
+}
+
+def render_one(kind: str, object_id: int):
+    # Exécuté dans un processus du pool : une erreur ne doit pas interrompre le lot
+    try:
+        return object_id, render_document(kind, object_id), None
+    except Exception as e:
+        return object_id, None, str(e)
+
+def load_state(filters: dict) -> dict:
+    if not os.path.exists(STATE_FILE):
+        return {}
+    with open(STATE_FILE) as f:
+        state = json.load(f)
+    if state.get("filtres") != filters:
+        logger.warning("Le fichier d'état correspond à d'autres filtres, reprise ignorée")
+        return {}
+    return state
+
+def save_state(state: dict):
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    tmp_path = STATE_FILE + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, STATE_FILE)
+
+def select_ids(db, kind: str, after_id: int, args, limit: int):
+    model, _ = DOCUMENTS[kind]
+    date_column = getattr(model, DATE_COLUMNS[kind])
+    query = select(model.id).where(model.id > after_id).order_by(model.id).limit(limit)
+    if args.id_max is not None:
+        query = query.where(model.id <= args.id_max)
+    if args.depuis:
+        query = query.where(date_column >= args.depuis)
+    if args.jusqua:
+        query = query.where(date_column <= args.jusqua)
+    return db.scalars(query).all()
+
+def regenerate(kind: str, pool: ProcessPoolExecutor, state: dict, args) -> tuple:
+    model, path_column = DOCUMENTS[kind]
+    last_id = max(state.get(kind, 0), (args.id_min or 1) - 1)
+    done, failed = 0, 0
+    start = time.perf_counter()
+
+    db = SessionLocal()
+    try:
+        while True:
+            ids = select_ids(db, kind, last_id, args, args.batch_size)
+            if not ids:
+                break
+
+            results = list(pool.map(render_one, [kind] * len(ids), ids))
+            succeeded = [
+                {"id": object_id, path_column: pdf_path, "document_statut": STATUT_PRET, "document_erreur": None}
+                for object_id, pdf_path, error in results if error is None
+            ]
+            errors = [
+                {"id": object_id, "document_statut": STATUT_ERREUR, "document_erreur": error}
+                for object_id, _, error in results if error is not None
+            ]
+            for row in errors:
+                logger.error(f"Échec de la régénération {kind} ID={row['id']} : {row['document_erreur']}")
+
+            if succeeded:
+                db.execute(update(model), succeeded)
+            if errors:
+                db.execute(update(model), errors)
+            db.commit()
+
+            last_id = ids[-1]
+            state[kind] = last_id
+            save_state(state)
+
+            done += len(succeeded)
+            failed += len(errors)
+            elapsed = time.perf_counter() - start
+            logger.info(f"{kind} : {done} fiche(s) régénérée(s), {failed} échec(s), {done / elapsed:.1f} fiches/s (dernier ID={last_id})")
+    finally:
+        db.close()
+
+    return done, failed, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Régénère les fiches PDF des demandes d'audit et des affectations.")
+    parser.add_argument("--type", choices=["tous", *DOCUMENTS], default="tous")
+    parser.add_argument("--id-min", type=int)
+    parser.add_argument("--id-max", type=int)
+    parser.add_argument("--depuis", type=date.fromisoformat, help="date minimale (AAAA-MM-JJ)")
+    parser.add_argument("--jusqua", type=date.fromisoformat, help="date maximale (AAAA-MM-JJ)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--reprendre", action="store_true", help="reprend après le dernier lot enregistré")
+    args = parser.parse_args()
+
+    kinds = list(DOCUMENTS) if args.type == "tous" else [args.type]
+    filters = {
+        "type": args.type, "id_min": args.id_min, "id_max": args.id_max,
+        "depuis": args.depuis and args.depuis.isoformat(), "jusqua": args.jusqua and args.jusqua.isoformat(),
+    }
+    state = load_state(filters) if args.reprendre else {}
+    state["filtres"] = filters
+
+    sync_schema()
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker) as pool:
+        for kind in kinds:
+            done, failed, elapsed = regenerate(kind, pool, state, args)
+            rate = done / elapsed if elapsed else 0
+            logger.info(f"Régénération {kind} terminée : {done} fiche(s), {failed} échec(s) en {elapsed:.1f}s ({rate:.1f} fiches/s)")
+
+    if os.path.exists(STATE_FILE):
+        os.remove(STATE_FILE)
+
+if __name__ == "__main__":
+    main()
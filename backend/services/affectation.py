@@ -1,12 +1,16 @@
-import os
+from datetime import date
+from typing import Optional
 
 from reportlab.lib import colors
 from reportlab.lib.units import cm
+from fastapi import HTTPException
+from sqlalchemy import insert, select
 from sqlalchemy.orm import Session, joinedload
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
 
 from backend.models.affectation import Affectation
+from backend.models.associations import affect_auditeur, affect_ip
 from backend.models.auditeur import (Auditeur)
 from backend.models.ip import IP
 from backend.models.ports import Port
@@ -14,108 +18,107 @@ from backend.models.prestataire import Prestataire
 from backend.schemas.affectation import AffectSchema
 from backend.schemas.auditeur import AuditeurSchema
 from backend.schemas.prestataire import PrestataireSchema
+from backend.services.ip import ip_columns
+from backend.services.pagination import apply_id_keyset, split_page
+from backend.services.pdf_jobs import submit_document, STATUT_EN_ATTENTE
 
-from jinja2 import Environment, FileSystemLoader
-from weasyprint import HTML
+from backend.services.pdf_render import render_pdf
 
 from log_config import setup_logger
 
 logger = setup_logger()
 
+PDF_DIR = "fichiers_affectations"
+
 def generate_affect_pdf(affect):
     logger.info(f"Génération du PDF via HTML pour l'affectation ID={affect.id}")
 
-    # Load the HTML template
-    env = Environment(loader=FileSystemLoader('templates'))
-    template = env.get_template('affect_template.html')
-
-    logo_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "pictures", "logo.png"))
-    logo_path_url = f"file:///{logo_path.replace(os.sep, '/')}"
-
-    # Render the HTML with the data
-    html_content = template.render(affect=affect, logo_path=logo_path_url)
-
-    # Prepare output folder
-    pdf_dir = "fichiers_affectations"
-    os.makedirs(pdf_dir, exist_ok=True)
-    pdf_filename = f"fiche_affectation_{affect.id}_{affect.demande_audit.nom_app}_{affect.prestataire.nom}_{affect.date_affectation}.pdf"
-    pdf_path = os.path.join(pdf_dir, pdf_filename)
-
-    # Generate PDF from HTML
-    HTML(string=html_content).write_pdf(pdf_path)
+    # Le nom du fichier est dérivé du contenu : une fiche inchangée n'est pas régénérée
+    pdf_path = render_pdf("affect_template.html", PDF_DIR, affect=affect)
 
     logger.info("PDF généré avec succès via HTML.")
-    return pdf_path.replace("\\", "/")
+    return pdf_path
 
 def create_affect(db: Session, affect_data: AffectSchema):
     logger.info("Création d'une nouvelle affectation d'audit")
-    affect = Affectation(
-        type_audit=affect_data.type_audit,
-        demande_audit_id=affect_data.demande_audit_id,
-        prestataire_id=affect_data.prestataire_id
-    )
-    db.add(affect)
-    db.commit()
-    db.refresh(affect)
-
-    for auditeur_data in affect_data.auditeurs:
-        existing_auditeur = db.query(Auditeur).filter(
-            Auditeur.email == auditeur_data.email
-        ).first()
-
-        if not existing_auditeur:
-            logger.debug(f"Création du nouvel auditeur : {auditeur_data.email}")
-            auditeur = Auditeur(
-                nom=auditeur_data.nom,
-                prenom=auditeur_data.prenom,
-                email=auditeur_data.email,
-                phone=auditeur_data.phone,
-                prestataire_id=auditeur_data.prestataire_id
-            )
-            db.add(auditeur)
-            db.commit()
-            db.refresh(auditeur)
-            affect.auditeurs.append(auditeur)
-        else:
-            logger.debug(f"Auditeur déjà existant trouvé : {existing_auditeur.email}")
-            affect.auditeurs.append(existing_auditeur)
-
-    for ip_data in affect_data.ips:
-        existing_ip = db.query(IP).filter(
-            IP.adresse_ip == ip_data.adresse_ip
-        ).first()
-
-        if not existing_ip:
-            logger.debug(f"Ajout d'une nouvelle IP : {ip_data.adresse_ip}")
-            ip = IP(
-                adresse_ip=ip_data.adresse_ip,
-                affectation_id=affect.id
+    try:
+        affect = Affectation(
+            type_audit=affect_data.type_audit,
+            demande_audit_id=affect_data.demande_audit_id,
+            prestataire_id=affect_data.prestataire_id,
+            # La fiche PDF est générée en arrière-plan
+            document_statut=STATUT_EN_ATTENTE
+        )
+        db.add(affect)
+        db.flush()
+
+        # Auditeurs : une requête pour les existants, un INSERT groupé pour les nouveaux.
+        # Emails mis en minuscules côté Python : la collation MySQL compare sans tenir compte
+        # de la casse et la colonne reste comparée telle quelle, ce qui garde son index utilisable
+        auditeurs_data = {auditeur_data.email.lower(): auditeur_data for auditeur_data in affect_data.auditeurs}
+        auditeur_ids = {
+            email.lower(): auditeur_id for email, auditeur_id in
+            db.execute(select(Auditeur.email, Auditeur.id).where(Auditeur.email.in_(auditeurs_data))).all()
+        }
+        new_auditeurs = [email for email in auditeurs_data if email not in auditeur_ids]
+        if new_auditeurs:
+            logger.debug(f"Création de {len(new_auditeurs)} nouvel(s) auditeur(s)")
+            db.execute(insert(Auditeur), [auditeurs_data[email].model_dump() for email in new_auditeurs])
+            auditeur_ids.update(
+                (email.lower(), auditeur_id) for email, auditeur_id in
+                db.execute(select(Auditeur.email, Auditeur.id).where(
+                    Auditeur.email.in_([auditeurs_data[email].email for email in new_auditeurs])
+                )).all()
             )
-            db.add(ip)
-            db.commit()
-            db.refresh(ip)
-
-            # Ajouter les ports
+        if auditeurs_data:
+            db.execute(affect_auditeur.insert(), [
+                {"affectation_id": affect.id, "auditeur_id": auditeur_ids[email]} for email in auditeurs_data
+            ])
+
+        # IPs : les entrées qui désignent la même adresse une fois normalisée mettent leurs ports en commun
+        ips_ports = {}
+        for ip_data in affect_data.ips:
+            ports_by_number = ips_ports.setdefault(ip_columns(ip_data.adresse_ip)["adresse_ip"], {})
             for port_data in ip_data.ports:
-                logger.debug(f"Ajout du port {port_data.port}/{port_data.status} à l'IP {ip.adresse_ip}")
-                port = Port(
-                    port=port_data.port,
-                    status=port_data.status,
-                    ip_id=ip.id
-                )
-                db.add(port)
-            db.commit()
-            affect.ips.append(ip)
-        else:
-            logger.warning(f"IP déjà existante détectée : {existing_ip.adresse_ip}")
-            affect.ips.append(existing_ip)
-
-    affectationpath = generate_affect_pdf(affect)
-    affect.affectationpath = affectationpath
-    db.commit()
+                ports_by_number[port_data.port] = port_data
+        ip_ids = dict(db.execute(
+            select(IP.adresse_ip, IP.id).where(IP.adresse_ip.in_(ips_ports))
+        ).all())
+        for adresse_ip in ip_ids:
+            logger.warning(f"IP déjà existante détectée : {adresse_ip}")
+        new_ips = [adresse_ip for adresse_ip in ips_ports if adresse_ip not in ip_ids]
+        if new_ips:
+            logger.debug(f"Ajout de {len(new_ips)} nouvelle(s) IP(s)")
+            db.execute(insert(IP), [{**ip_columns(adresse_ip), "affectation_id": affect.id} for adresse_ip in new_ips])
+            new_ip_ids = dict(db.execute(
+                select(IP.adresse_ip, IP.id).where(IP.adresse_ip.in_(new_ips))
+            ).all())
+            ports = [
+                {"port": port_data.port, "status": port_data.status, "ip_id": new_ip_ids[adresse_ip]}
+                for adresse_ip in new_ips for port_data in ips_ports[adresse_ip].values()
+            ]
+            if ports:
+                db.execute(insert(Port), ports)
+            ip_ids.update(new_ip_ids)
+        if ips_ports:
+            db.execute(affect_ip.insert(), [
+                {"affectation_id": affect.id, "ip_id": ip_ids[adresse_ip]} for adresse_ip in ips_ports
+            ])
+
+        db.commit()
+    except HTTPException as e:
+        db.rollback()
+        logger.warning(f"Affectation refusée, transaction annulée : {e.detail}")
+        raise
+    except Exception:
+        db.rollback()
+        logger.exception("Échec de la création de l'affectation, transaction annulée")
+        raise
+
+    submit_document("affectation", affect.id)
 
     logger.info(f"Affectation créée avec succès : ID={affect.id}")
-    return affect
+    return get_affect(db, affect.id)
 
 def get_affect(db: Session, affectation_id: int):
     logger.info(f"Recherche de l'affectation avec ID: {affectation_id}")
@@ -134,16 +137,84 @@ def get_affect(db: Session, affectation_id: int):
         logger.warning(f"Aucune affectation trouvée avec ID: {affectation_id}")
     return affect
 
-def list_affects(db: Session):
-    logger.info("Récupération de toutes les affectations")
-    affects = db.query(Affectation).options(
-        joinedload(Affectation.auditeurs),
-        joinedload(Affectation.ips).joinedload(IP.ports),
-        joinedload(Affectation.prestataire),
-        joinedload(Affectation.demande_audit)
-    ).all()
+AFFECTS_PAGE_MAX = 500
+# Taille des lots pour les IN (...) sur les collections des affectations
+AFFECTS_IN_BATCH_SIZE = 1000
+
+AFFECT_LIST_COLUMNS = [
+    Affectation.id, Affectation.demande_audit_id, Affectation.prestataire_id, Affectation.type_audit,
+    Affectation.date_affectation, Affectation.affectationpath, Affectation.document_statut
+]
+
+def _batches(ids: list):
+    for i in range(0, len(ids), AFFECTS_IN_BATCH_SIZE):
+        yield ids[i:i + AFFECTS_IN_BATCH_SIZE]
+
+def list_affects(
+    db: Session,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    prestataire_id: Optional[int] = None,
+    type_audit: Optional[str] = None,
+    date_debut: Optional[date] = None,
+    date_fin: Optional[date] = None
+):
+    logger.info("Récupération des affectations")
+    # Projection des colonnes : les lignes sont converties directement en dicts, sans objets ORM
+    query = select(*AFFECT_LIST_COLUMNS)
+    if prestataire_id is not None:
+        query = query.where(Affectation.prestataire_id == prestataire_id)
+    if type_audit:
+        query = query.where(Affectation.type_audit == type_audit)
+    if date_debut:
+        query = query.where(Affectation.date_affectation >= date_debut)
+    if date_fin:
+        query = query.where(Affectation.date_affectation <= date_fin)
+
+    rows = db.execute(apply_id_keyset(query, Affectation.id, limit, cursor)).all()
+    affects, next_cursor = split_page([row._asdict() for row in rows], limit, id_getter=lambda affect: affect["id"])
+    attach_affect_collections(db, affects)
     logger.info(f"{len(affects)} affectation(s) récupérée(s)")
-    return affects
+    return affects, next_cursor
+
+def attach_affect_collections(db: Session, affects: list):
+    """Ajoute auditeurs, IPs et ports aux affectations : une requête par collection, colonnes utiles seulement."""
+    affects_by_id = {affect["id"]: affect for affect in affects}
+    for affect in affects:
+        affect["auditeurs"], affect["ips"] = [], []
+
+    ips_by_id = {}
+    for batch in _batches(list(affects_by_id)):
+        auditeurs = db.execute(
+            select(affect_auditeur.c.affectation_id, Auditeur.id, Auditeur.nom, Auditeur.prenom, Auditeur.email,
+                   Auditeur.phone, Auditeur.prestataire_id)
+            .join(Auditeur, Auditeur.id == affect_auditeur.c.auditeur_id)
+            .where(affect_auditeur.c.affectation_id.in_(batch))
+            .order_by(Auditeur.id)
+        )
+        for row in auditeurs:
+            auditeur = row._asdict()
+            affects_by_id[auditeur.pop("affectation_id")]["auditeurs"].append(auditeur)
+
+        ips = db.execute(
+            select(affect_ip.c.affectation_id.label("affect_id"), IP.id, IP.adresse_ip, IP.affectation_id)
+            .join(IP, IP.id == affect_ip.c.ip_id)
+            .where(affect_ip.c.affectation_id.in_(batch))
+            .order_by(IP.id)
+        )
+        for row in ips:
+            # Une IP rattachée à plusieurs affectations est partagée entre leurs listes
+            ip = ips_by_id.setdefault(row.id, {"id": row.id, "adresse_ip": row.adresse_ip,
+                                               "affectation_id": row.affectation_id, "ports": []})
+            affects_by_id[row.affect_id]["ips"].append(ip)
+
+    for batch in _batches(list(ips_by_id)):
+        ports = db.execute(
+            select(Port.ip_id, Port.id, Port.port, Port.status).where(Port.ip_id.in_(batch)).order_by(Port.id)
+        )
+        for row in ports:
+            port = row._asdict()
+            ips_by_id[port.pop("ip_id")]["ports"].append(port)
 
 def create_auditeur(db: Session, auditeur_data: AuditeurSchema):
     auditeur = Auditeur(
@@ -1,10 +1,14 @@
-from datetime import datetime
+from datetime import date, datetime
+from typing import List, Optional
 from fastapi import HTTPException
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import and_, case, func, literal_column, select
+from sqlalchemy.orm import Session, joinedload, selectinload
 from backend.models.audit import Audit
+from backend.models.prestataire import Prestataire
 from backend.models.auditeur import Auditeur
 from backend.models.affectation import Affectation
 from backend.schemas.audit import AuditBase
+from backend.services.pagination import apply_id_keyset, split_page
 from log_config import setup_logger
 
 logger = setup_logger()
@@ -46,18 +50,45 @@ def get_audit(db: Session, audit_id: int):
     logger.info(f"Affectation trouvée: {audit.id}")
     return audit
 
-def list_audits(db: Session):
-    audits = (
+AUDITS_PAGE_MAX = 500
+SLA_OVERDUE_MAX = 500
+
+def list_audits(
+    db: Session,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    prestataire_id: Optional[int] = None,
+    etat: Optional[str] = None,
+    type_audit: Optional[str] = None,
+    date_debut: Optional[date] = None,
+    date_fin: Optional[date] = None
+):
+    # Relations simples en jointure, auditeurs par selectinload pour éviter la multiplication des lignes
+    query = (
         db.query(Audit)
         .options(
             joinedload(Audit.prestataire),
             joinedload(Audit.demande_audit),
-            joinedload(Audit.affectation).joinedload(Affectation.auditeurs)
+            selectinload(Audit.auditeurs)
         )
-        .all()
     )
+    if prestataire_id is not None:
+        query = query.filter(Audit.prestataire_id == prestataire_id)
+    if etat:
+        query = query.filter(Audit.etat == etat)
+    if type_audit or date_debut or date_fin:
+        # Type et date de l'audit sont ceux de son affectation
+        query = query.join(Affectation, Affectation.id == Audit.affectation_id)
+        if type_audit:
+            query = query.filter(Affectation.type_audit == type_audit)
+        if date_debut:
+            query = query.filter(Affectation.date_affectation >= date_debut)
+        if date_fin:
+            query = query.filter(Affectation.date_affectation <= date_fin)
+
+    audits, next_cursor = split_page(apply_id_keyset(query, Audit.id, limit, cursor).all(), limit)
     logger.info(f"{len(audits)} audit(s) récupéré(s)")
-    return audits
+    return audits, next_cursor
 
 def update_audit_duration(audit: Audit):
     now = datetime.utcnow()
@@ -83,4 +114,100 @@ def change_audit_etat(db: Session, audit_id: int, new_etat: str):
     audit.etat = new_etat
     db.commit()
     db.refresh(audit)
-    return audit
\ No newline at end of file
+    return audit
+
+def elapsed_days(db: Session, now: datetime):
+    # Jours écoulés depuis start_time, calculés par la base
+    if db.bind.dialect.name == "mysql":
+        return func.timestampdiff(literal_column("SECOND"), Audit.start_time, now) / 86400.0
+    return func.julianday(now) - func.julianday(Audit.start_time)
+
+def duration_expression(db: Session, now: datetime):
+    """Durée en jours : total_duration plus le temps écoulé si l'audit est en cours (même règle que update_audit_duration)."""
+    running = and_(Audit.etat == "En cours", Audit.start_time.isnot(None))
+    return func.coalesce(Audit.total_duration, 0.0) + case((running, elapsed_days(db, now)), else_=0.0)
+
+def filter_audits(query, prestataire_id: Optional[int] = None, etat: Optional[str] = None):
+    if prestataire_id is not None:
+        query = query.where(Audit.prestataire_id == prestataire_id)
+    if etat:
+        query = query.where(Audit.etat == etat)
+    return query
+
+def get_audit_durations(
+    db: Session,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    prestataire_id: Optional[int] = None,
+    etat: Optional[str] = None,
+    audit_ids: Optional[List[int]] = None
+):
+    duration = duration_expression(db, datetime.utcnow()).label("duration")
+    query = filter_audits(select(Audit.id, Audit.etat, Audit.prestataire_id, duration), prestataire_id, etat)
+    if audit_ids is not None:
+        query = query.where(Audit.id.in_(audit_ids))
+
+    rows = db.execute(apply_id_keyset(query, Audit.id, limit, cursor)).all()
+    durations, next_cursor = split_page([row._asdict() for row in rows], limit, lambda row: row["id"])
+    logger.info(f"Durées calculées pour {len(durations)} audit(s)")
+    return durations, next_cursor
+
+def get_sla_report(
+    db: Session,
+    seuil_jours: float,
+    prestataire_id: Optional[int] = None,
+    etat: Optional[str] = None,
+    depassements_max: int = SLA_OVERDUE_MAX
+):
+    duration = duration_expression(db, datetime.utcnow())
+    overdue = case((duration > seuil_jours, 1), else_=0)
+
+    # Audits au-delà du seuil, les plus longs d'abord
+    depassements = db.execute(
+        filter_audits(
+            select(Audit.id, Audit.etat, Audit.prestataire_id, duration.label("duration")), prestataire_id, etat
+        )
+        .where(duration > seuil_jours)
+        .order_by(duration.desc(), Audit.id)
+        .limit(depassements_max)
+    ).all()
+
+    par_prestataire = db.execute(
+        filter_audits(
+            select(
+                Audit.prestataire_id,
+                Prestataire.nom.label("prestataire_nom"),
+                func.count(Audit.id).label("nb_audits"),
+                func.avg(duration).label("duree_moyenne"),
+                func.max(duration).label("duree_max"),
+                func.sum(overdue).label("nb_depassements"),
+            )
+            .outerjoin(Prestataire, Prestataire.id == Audit.prestataire_id),
+            prestataire_id, etat
+        )
+        .group_by(Audit.prestataire_id, Prestataire.nom)
+        .order_by(Audit.prestataire_id)
+    ).all()
+
+    par_etat = db.execute(
+        filter_audits(
+            select(
+                Audit.etat,
+                func.count(Audit.id).label("nb_audits"),
+                func.avg(duration).label("duree_moyenne"),
+                func.sum(duration).label("duree_totale"),
+                func.sum(overdue).label("nb_depassements"),
+            ),
+            prestataire_id, etat
+        )
+        .group_by(Audit.etat)
+        .order_by(Audit.etat)
+    ).all()
+
+    logger.info(f"Rapport SLA ({seuil_jours} jours) : {len(depassements)} audit(s) en dépassement")
+    return {
+        "seuil_jours": seuil_jours,
+        "depassements": [row._asdict() for row in depassements],
+        "par_prestataire": [row._asdict() for row in par_prestataire],
+        "par_etat": [row._asdict() for row in par_etat],
+    }
@@ -0,0 +1,31 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Optional
+
+from log_config import setup_logger
+
+logger = setup_logger()
+
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", 2))
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=CPU_WORKERS)
+    return _pool
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+async def run_cpu_bound(func, *args, **kwargs):
+    # Calcul lourd (pandas, openpyxl...) dans un autre processus : ni la boucle d'événements
+    # ni le GIL du worker ne sont bloqués pendant ce temps
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_pool(), partial(func, *args, **kwargs))
@@ -0,0 +1,58 @@
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import Session
+
+from backend.models.data_version import DataVersion
+from log_config import setup_logger
+
+logger = setup_logger()
+
+# Domaine versionné -> tables dont toute écriture incrémente la version
+VERSIONED_TABLES = {
+    "plans": {"plans", "vulnerabilites"},
+}
+
+def get_data_version(db: Session, nom: str) -> int:
+    version = db.execute(select(DataVersion.version).where(DataVersion.nom == nom)).scalar()
+    return version or 0
+
+def bump_data_version(db: Session, nom: str):
+    result = db.execute(
+        update(DataVersion).where(DataVersion.nom == nom).values(version=DataVersion.version + 1)
+    )
+    if result.rowcount == 0:
+        db.execute(insert(DataVersion).values(nom=nom, version=1))
+    logger.debug(f"Version des données '{nom}' incrémentée")
+
+def _mark_tables(session: Session, tables):
+    touched = session.info.setdefault("tables_modifiees", set())
+    touched.update(tables)
+
+@event.listens_for(Session, "after_flush")
+def _track_orm_writes(session, flush_context):
+    tables = {
+        obj.__table__.name
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+        if hasattr(obj, "__table__")
+    }
+    _mark_tables(session, tables)
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_writes(orm_execute_state):
+    # INSERT/UPDATE/DELETE groupés (insert(Plan), query(...).delete(), ...)
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None:
+            _mark_tables(orm_execute_state.session, {table.name})
+
+@event.listens_for(Session, "before_commit")
+def _bump_versions(session):
+    session.flush()
+    touched = session.info.pop("tables_modifiees", set())
+    for nom, tables in VERSIONED_TABLES.items():
+        if touched & tables:
+            bump_data_version(session, nom)
+    session.info.pop("tables_modifiees", None)
+
+@event.listens_for(Session, "after_rollback")
+def _reset_tracking(session):
+    session.info.pop("tables_modifiees", None)
@@ -1,13 +1,15 @@
 import json
 import os
-import shutil
 
-from fastapi import UploadFile, HTTPException
 from reportlab.lib import colors
 from reportlab.lib.units import cm
+from datetime import date
+from fastapi import HTTPException
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from backend.models.demande_audit import Demande_Audit
+from backend.services.pdf_jobs import submit_document, STATUT_EN_ATTENTE
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
 
@@ -17,8 +19,8 @@ from reportlab.platypus import Paragraph, Frame
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_JUSTIFY
 
-from jinja2 import Environment, FileSystemLoader
-from weasyprint import HTML
+from backend.services.pdf_render import render_pdf
+from backend.services.pagination import apply_id_keyset, split_page
 
 logger = setup_logger()
 
@@ -27,58 +29,32 @@ STATIC_DIR = "pictures"
 os.makedirs(PDF_DIR, exist_ok=True)
 os.makedirs(STATIC_DIR, exist_ok=True)
 
-def save_uploaded_file(upload_file: UploadFile):
-    print(f"Trying to save file: {upload_file.filename}")  # Debugging
-    try:
-        upload_folder = "fichiers_attaches_audit"
-        os.makedirs(upload_folder, exist_ok=True)
-        file_path = os.path.join(upload_folder, upload_file.filename)
-
-        # Écriture du fichier sur le disque
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(upload_file.file, buffer)
-
-        print(f"Saved to: {file_path}")  # Debugging
-        logger.info("Fichier '%s' sauvegardé avec succès à l'emplacement : %s", upload_file.filename, file_path)
-        return file_path
-    except Exception as e:
-        logger.error("Échec de l'enregistrement du fichier '%s' : %s", upload_file.filename, str(e))
-        return None
+DEMANDES_PAGE_MAX = 500
+# Colonnes affichées dans le tableau des demandes, toujours renvoyées par la liste
+LIST_FIELDS = ("id", "nom_app", "type_audit", "etat", "urgence", "date_creation")
+# Colonnes supplémentaires que le client peut demander avec fields=
+LIST_EXTRA_FIELDS = tuple(
+    column.name for column in Demande_Audit.__table__.columns
+    if column.name not in LIST_FIELDS and not column.name.startswith("document_")
+)
 
 def generate_audit_pdf(demande_audit) -> str:
-    pdf_path = os.path.join(PDF_DIR, f"fiche_demande_audit_{demande_audit.id}_{demande_audit.nom_app}_{demande_audit.date_creation}.pdf")
-
-    # Load the HTML template
-    env = Environment(loader=FileSystemLoader('templates'))
-    template = env.get_template('fiche_demande_audit_template.html')
-
-    try:
-        template = env.get_template("fiche_demande_audit_template.html")
-
-        # Prepare data
-        fichiers_list = []
-        if demande_audit.fichiers_attaches:
-            if isinstance(demande_audit.fichiers_attaches, str):
-                try:
-                    fichiers_list = json.loads(demande_audit.fichiers_attaches)
-                except json.JSONDecodeError:
-                    fichiers_list = [demande_audit.fichiers_attaches]
-            else:
-                fichiers_list = demande_audit.fichiers_attaches
-        if not fichiers_list:
-            fichiers_list = ["Aucun"]
-
-        logo_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "pictures", "logo.png"))
-        logo_path_url = f"file:///{logo_path.replace(os.sep, '/')}"
-
-        html_content = template.render(demande_audit=demande_audit, fichiers=fichiers_list, logo_path=logo_path_url)
-
-        HTML(string=html_content).write_pdf(pdf_path)
-        return pdf_path
+    # Prepare data
+    fichiers_list = []
+    if demande_audit.fichiers_attaches:
+        if isinstance(demande_audit.fichiers_attaches, str):
+            try:
+                fichiers_list = json.loads(demande_audit.fichiers_attaches)
+            except json.JSONDecodeError:
+                fichiers_list = [demande_audit.fichiers_attaches]
+        else:
+            fichiers_list = demande_audit.fichiers_attaches
+    fichiers_list = [fichier["nom"] if isinstance(fichier, dict) else fichier for fichier in fichiers_list]
+    if not fichiers_list:
+        fichiers_list = ["Aucun"]
 
-    except Exception as e:
-        print(f"Erreur lors de la génération: {e}")
-        return ""
+    # Les erreurs remontent à la file de génération, qui les enregistre et réessaie
+    return render_pdf("fiche_demande_audit_template.html", PDF_DIR, demande_audit=demande_audit, fichiers=fichiers_list)
 
 def create_demande_audit(
         type_audit=str,
@@ -115,21 +91,13 @@ def create_demande_audit(
         url_app=str,
         compte_test_profile=str,
         urgence=str,
-        fichiers_attaches=Optional[UploadFile],
+        fichiers_attaches=Optional[List[dict]],
         db= Session
 ) -> Demande_Audit:
     logger.info("Début de la création d'un audit.")
     logger.debug("Création d'un audit par %s %s (%s)", demandeur_prenom_1, demandeur_nom_1,
                  demandeur_email_1)
 
-    fichiers_paths = []
-    for file in fichiers_attaches:
-        path = save_uploaded_file(file)
-        if path:
-            fichiers_paths.append(path)
-        else:
-            raise HTTPException(status_code=400, detail=f"Failed to upload file: {file.filename}")
-
     # Création de l'objet ORM
     demande = Demande_Audit(
         type_audit=type_audit,
@@ -166,7 +134,10 @@ def create_demande_audit(
         url_app=url_app,
         compte_test_profile=compte_test_profile,
         urgence=urgence,
-        fichiers_attaches=fichiers_paths
+        # Métadonnées des fichiers déjà enregistrés (nom d'origine, SHA-256, taille, chemin)
+        fichiers_attaches=fichiers_attaches or [],
+        # La fiche PDF est générée en arrière-plan
+        document_statut=STATUT_EN_ATTENTE
     )
 
     db.add(demande)
@@ -175,19 +146,46 @@ def create_demande_audit(
 
     logger.info("Audit inséré en base avec l'ID : %d", demande.id)
 
-    # Génération du PDF
-    pdf_path = generate_audit_pdf(demande)
-    demande.fiche_demande_path = pdf_path
-    db.commit()
+    submit_document("demande_audit", demande.id)
 
-    logger.info("Création de l'audit terminée avec succès. PDF généré : %s", pdf_path)
+    logger.info("Création de l'audit terminée avec succès. PDF en cours de génération.")
 
     return demande
 
-def get_all_audits(db: Session) -> List[Demande_Audit]:
-    demande_audits = db.query(Demande_Audit).all()
-    logger.info("Récupération de tous les audits. Total : %d", len(demande_audits))
-    return demande_audits
+def list_demandes_audit(
+    db: Session,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    etat: Optional[str] = None,
+    type_audit: Optional[str] = None,
+    urgence: Optional[str] = None,
+    date_debut: Optional[date] = None,
+    date_fin: Optional[date] = None,
+    fields: Optional[List[str]] = None
+) -> Tuple[List[dict], Optional[str]]:
+    # Seules les colonnes du tableau sont lues ; les colonnes Text ne le sont que si fields les demande
+    unknown = [name for name in fields or [] if name not in LIST_EXTRA_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Champ(s) inconnu(s) : {', '.join(unknown)}")
+    columns = [getattr(Demande_Audit, name) for name in LIST_FIELDS]
+    columns += [getattr(Demande_Audit, name) for name in LIST_EXTRA_FIELDS if name in (fields or [])]
+
+    query = select(*columns)
+    if etat:
+        query = query.where(Demande_Audit.etat == etat)
+    if type_audit:
+        query = query.where(Demande_Audit.type_audit == type_audit)
+    if urgence:
+        query = query.where(Demande_Audit.urgence == urgence)
+    if date_debut:
+        query = query.where(Demande_Audit.date_creation >= date_debut)
+    if date_fin:
+        query = query.where(Demande_Audit.date_creation <= date_fin)
+
+    rows = db.execute(apply_id_keyset(query, Demande_Audit.id, limit, cursor)).all()
+    demandes, next_cursor = split_page([row._asdict() for row in rows], limit, lambda row: row["id"])
+    logger.info("Récupération des demandes d'audit. Total : %d", len(demandes))
+    return demandes, next_cursor
 
 
 def get_audit_by_id(demande_audit_id: int, db: Session) -> Optional[Demande_Audit]:
@@ -0,0 +1,89 @@
+import re
+from typing import List
+
+from sqlalchemy import column, func, literal_column, select, table, text
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.orm import Session
+
+from database import engine
+from backend.models.demande_audit import Demande_Audit
+from log_config import setup_logger
+
+logger = setup_logger()
+
+SEARCH_COLUMNS = ("nom_app", "description", "liste_fonctionalites", "url_app")
+SEARCH_PAGE_MAX = 100
+FTS_TABLE = "demandes_audits_fts"
+
+# Colonnes renvoyées par la recherche : celles du tableau des demandes
+SEARCH_RESULT_COLUMNS = (
+    Demande_Audit.id,
+    Demande_Audit.nom_app,
+    Demande_Audit.type_audit,
+    Demande_Audit.etat,
+    Demande_Audit.urgence,
+    Demande_Audit.date_creation,
+)
+
+def setup_search_index():
+    """Crée l'index FTS5 et ses triggers sous SQLite ; sous MySQL l'index FULLTEXT est déclaré sur le modèle."""
+    if engine.dialect.name != "sqlite":
+        return
+
+    columns = ", ".join(SEARCH_COLUMNS)
+    new_values = ", ".join(f"new.{name}" for name in SEARCH_COLUMNS)
+    old_values = ", ".join(f"old.{name}" for name in SEARCH_COLUMNS)
+    with engine.begin() as connection:
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+        ).first()
+        connection.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5({columns}, "
+            f"content='demandes_audits', content_rowid='id')"
+        ))
+        # Triggers : l'index suit les créations, suppressions et modifications des colonnes indexées
+        connection.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON demandes_audits BEGIN "
+            f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_values}); END"
+        ))
+        connection.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON demandes_audits BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END"
+        ))
+        connection.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {columns} ON demandes_audits BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+            f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_values}); END"
+        ))
+        if not exists:
+            connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+            logger.info("Index de recherche des demandes construit")
+
+def search_terms(q: str) -> List[str]:
+    # Seuls les mots sont conservés : pas d'opérateurs de la syntaxe plein texte venant du client
+    return re.findall(r"\w+", q.lower())
+
+def search_demandes(db: Session, q: str, limit: int = 20, offset: int = 0) -> List[dict]:
+    terms = search_terms(q)
+    if not terms:
+        return []
+    limit = min(limit, SEARCH_PAGE_MAX)
+
+    if db.bind.dialect.name == "mysql":
+        score = match(*(getattr(Demande_Audit, name) for name in SEARCH_COLUMNS), against=" ".join(terms))
+        score = score.in_natural_language_mode()
+        query = select(*SEARCH_RESULT_COLUMNS, score.label("score")).where(score > 0)
+    else:
+        fts = table(FTS_TABLE, column("rowid"))
+        rank = func.bm25(literal_column(FTS_TABLE))
+        # bm25 est négatif, plus petit = plus pertinent
+        score = -rank
+        query = (
+            select(*SEARCH_RESULT_COLUMNS, score.label("score"))
+            .join(fts, fts.c.rowid == Demande_Audit.id)
+            .where(literal_column(FTS_TABLE).op("MATCH")(" OR ".join(f'"{term}"' for term in terms)))
+        )
+
+    rows = db.execute(query.order_by(score.desc(), Demande_Audit.id).limit(limit).offset(offset)).all()
+    logger.info("Recherche '%s' : %d demande(s) trouvée(s)", q, len(rows))
+    return [row._asdict() for row in rows]
@@ -0,0 +1,99 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Optional
+
+from log_config import setup_logger
+
+logger = setup_logger()
+
+SERVICES_DIR = os.path.dirname(os.path.abspath(__file__))
+EXPORT_CACHE_DIR = os.path.join(SERVICES_DIR, '..', '..', 'exports_plan')
+
+# Limites d'éviction des fichiers en cache
+EXPORT_CACHE_MAX_BYTES = int(os.getenv("EXPORT_CACHE_MAX_BYTES", 500 * 1024 * 1024))
+EXPORT_CACHE_MAX_AGE = int(os.getenv("EXPORT_CACHE_MAX_AGE", 7 * 24 * 3600))  # en secondes
+
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+_stats_lock = threading.Lock()
+
+def _count(name: str, n: int = 1):
+    with _stats_lock:
+        _stats[name] += n
+
+def normalize_filters(filters: dict) -> dict:
+    # Les filtres vides sont ignorés ; ref et application (ilike) sont insensibles à la casse
+    normalized = {}
+    for key, value in filters.items():
+        if value is None or value == "":
+            continue
+        if key in ("ref", "application"):
+            value = value.lower()
+        normalized[key] = value
+    return normalized
+
+def make_cache_key(filters: dict, data_version: int) -> str:
+    payload = json.dumps({"filtres": normalize_filters(filters), "version": data_version}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def cache_path(key: str) -> str:
+    return os.path.join(EXPORT_CACHE_DIR, f"plans_export_{key}.xlsx")
+
+def get_cached_export(key: str) -> Optional[str]:
+    path = cache_path(key)
+    if os.path.exists(path):
+        os.utime(path)  # Rafraîchit la date d'accès pour l'éviction LRU
+        _count("hits")
+        logger.info(f"Export servi depuis le cache : {path}")
+        return path
+    _count("misses")
+    return None
+
+def store_export(key: str, tmp_path: str) -> str:
+    path = cache_path(key)
+    os.replace(tmp_path, path)  # Remplacement atomique si deux exports identiques se croisent
+    # Le fichier qui vient d'être publié va être servi : il n'est jamais évincé, même s'il dépasse seul la limite
+    evict_exports(keep=path)
+    return path
+
+def evict_exports(keep: Optional[str] = None):
+    now = time.time()
+    entries = []
+    for name in os.listdir(EXPORT_CACHE_DIR):
+        if not name.endswith(".xlsx"):
+            continue
+        path = os.path.join(EXPORT_CACHE_DIR, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    entries.sort()
+    total_size = sum(size for _, size, _ in entries)
+    evicted = 0
+    for mtime, size, path in entries:
+        if now - mtime <= EXPORT_CACHE_MAX_AGE and total_size <= EXPORT_CACHE_MAX_BYTES:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+            evicted += 1
+        except FileNotFoundError:
+            pass
+        total_size -= size
+
+    if evicted:
+        _count("evictions", evicted)
+        logger.info(f"{evicted} export(s) supprimé(s) du cache")
+
+def get_cache_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+    files = [f for f in os.listdir(EXPORT_CACHE_DIR) if f.endswith(".xlsx")] if os.path.isdir(EXPORT_CACHE_DIR) else []
+    stats["fichiers"] = len(files)
+    stats["taille_octets"] = sum(os.path.getsize(os.path.join(EXPORT_CACHE_DIR, f)) for f in files)
+    return stats
@@ -0,0 +1,110 @@
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from database import SessionLocal, engine
+from backend.services.export_cache import EXPORT_CACHE_DIR, EXPORT_CACHE_MAX_AGE
+from log_config import setup_logger
+
+logger = setup_logger()
+
+EXPORT_JOBS_DIR = os.path.join(EXPORT_CACHE_DIR, 'jobs')
+EXPORT_JOB_WORKERS = int(os.getenv("EXPORT_JOB_WORKERS", 2))
+
+# Les états sont stockés sur disque pour être lisibles depuis n'importe quel worker de l'API
+STATUT_EN_ATTENTE = "en_attente"
+STATUT_EN_COURS = "en_cours"
+STATUT_TERMINE = "termine"
+STATUT_VIDE = "vide"
+STATUT_ERREUR = "erreur"
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+def _job_path(job_id: str) -> str:
+    return os.path.join(EXPORT_JOBS_DIR, f"{job_id}.json")
+
+def _write_job(job_id: str, **fields):
+    job = read_job(job_id) or {"job_id": job_id}
+    job.update(fields, updated_at=time.time())
+    tmp_path = f"{_job_path(job_id)}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(job, f)
+    os.replace(tmp_path, _job_path(job_id))
+
+def read_job(job_id: str) -> Optional[dict]:
+    try:
+        with open(_job_path(job_id), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def _init_worker():
+    # Les connexions héritées du processus parent ne doivent pas être réutilisées
+    engine.dispose(close=False)
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=EXPORT_JOB_WORKERS, initializer=_init_worker)
+    return _pool
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def run_export_job(job_id: str, filters: dict):
+    # Exécuté dans un processus du pool
+    from backend.services.plan import export_plans_to_excel
+
+    def on_progress(written: int, total: int):
+        _write_job(job_id, lignes_ecrites=written, total=total)
+
+    _write_job(job_id, statut=STATUT_EN_COURS)
+    db = SessionLocal()
+    try:
+        file_path = export_plans_to_excel(db, **filters, progress=on_progress)
+        if file_path is None:
+            _write_job(job_id, statut=STATUT_VIDE)
+        else:
+            _write_job(job_id, statut=STATUT_TERMINE, fichier=file_path)
+        logger.info(f"Export {job_id} terminé")
+    except Exception as e:
+        error_message = str(e.orig) if hasattr(e, 'orig') else str(e)
+        logger.error(f"Erreur lors de l'export {job_id} : {error_message}")
+        _write_job(job_id, statut=STATUT_ERREUR, erreur=error_message)
+    finally:
+        db.close()
+
+def purge_jobs():
+    now = time.time()
+    for name in os.listdir(EXPORT_JOBS_DIR):
+        path = os.path.join(EXPORT_JOBS_DIR, name)
+        try:
+            if now - os.path.getmtime(path) > EXPORT_CACHE_MAX_AGE:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def submit_export_job(filters: dict) -> dict:
+    os.makedirs(EXPORT_JOBS_DIR, exist_ok=True)
+    purge_jobs()
+
+    job_id = uuid.uuid4().hex
+    _write_job(job_id, statut=STATUT_EN_ATTENTE, filtres=filters, lignes_ecrites=0, total=None)
+
+    future = get_pool().submit(run_export_job, job_id, filters)
+
+    def on_done(f):
+        # Le processus a pu mourir sans mettre à jour l'état (pool cassé, annulation...)
+        if f.cancelled() or f.exception() is not None:
+            reason = "Export annulé" if f.cancelled() else str(f.exception())
+            _write_job(job_id, statut=STATUT_ERREUR, erreur=reason)
+
+    future.add_done_callback(on_done)
+    logger.info(f"Export {job_id} soumis avec les filtres {filters}")
+    return read_job(job_id)
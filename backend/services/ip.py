@@ -0,0 +1,125 @@
+import ipaddress
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.orm import Session, selectinload
+
+from backend.models.affectation import Affectation
+from backend.models.associations import affect_ip
+from backend.models.prestataire import Prestataire
+from backend.models.ip import IP
+from backend.services.pagination import encode_cursor, decode_cursor
+from log_config import setup_logger
+
+logger = setup_logger()
+
+IPS_PAGE_MAX = 1000
+
+def ip_columns(adresse_ip: str) -> dict:
+    """Forme normalisée d'une adresse et ses colonnes de recherche (version, octets)."""
+    try:
+        address = ipaddress.ip_address(adresse_ip.strip())
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Adresse IP invalide : {adresse_ip}")
+    return {"adresse_ip": str(address), "version_ip": address.version, "adresse_bin": address.packed}
+
+def parse_network(reseau: str):
+    try:
+        return ipaddress.ip_network(reseau.strip(), strict=False)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Réseau invalide : {reseau}")
+
+def get_ip_affectations(db: Session, ip_ids: Iterable[int]) -> Dict[int, List[dict]]:
+    """Résumé des affectations de chaque IP, en une seule requête."""
+    affectations = defaultdict(list)
+    ip_ids = set(ip_ids)
+    if not ip_ids:
+        return affectations
+    rows = db.execute(
+        select(
+            affect_ip.c.ip_id, Affectation.id, Affectation.demande_audit_id, Affectation.prestataire_id,
+            Prestataire.nom.label("prestataire_nom"), Affectation.type_audit, Affectation.date_affectation
+        )
+        .join(Affectation, Affectation.id == affect_ip.c.affectation_id)
+        .outerjoin(Prestataire, Prestataire.id == Affectation.prestataire_id)
+        .where(affect_ip.c.ip_id.in_(ip_ids))
+        .order_by(Affectation.id)
+    ).all()
+    for row in rows:
+        summary = row._asdict()
+        affectations[summary.pop("ip_id")].append(summary)
+    return affectations
+
+def get_ips_in_network(
+    db: Session, reseau: str, limit: int = 100, cursor: Optional[str] = None
+) -> Tuple[List[dict], Optional[str]]:
+    network = parse_network(reseau)
+    limit = min(limit, IPS_PAGE_MAX)
+    logger.info(f"Recherche des IPs du réseau {network}")
+    # Les octets d'une même version se comparent comme les adresses : la plage est un parcours d'index
+    query = (
+        select(IP)
+        .where(IP.version_ip == network.version)
+        .where(IP.adresse_bin.between(network.network_address.packed, network.broadcast_address.packed))
+        .options(selectinload(IP.ports))
+        .order_by(IP.adresse_bin, IP.id)
+        .limit(limit + 1)
+    )
+    if cursor:
+        # Curseur (adresse sous forme d'entier, id), comme (port, id) pour l'exposition des ports
+        last_address, last_id = decode_cursor(cursor, 2)
+        try:
+            last_bin = last_address.to_bytes(len(network.network_address.packed), "big")
+        except OverflowError:
+            raise HTTPException(status_code=400, detail="Curseur de pagination invalide.")
+        query = query.where(or_(IP.adresse_bin > last_bin, and_(IP.adresse_bin == last_bin, IP.id > last_id)))
+
+    ips = db.scalars(query).all()
+    next_cursor = None
+    if len(ips) > limit:
+        ips = ips[:limit]
+        next_cursor = encode_cursor([int.from_bytes(ips[-1].adresse_bin, "big"), ips[-1].id])
+
+    affectations = get_ip_affectations(db, (ip.id for ip in ips))
+    rows = [
+        {
+            "id": ip.id,
+            "adresse_ip": ip.adresse_ip,
+            "version_ip": ip.version_ip,
+            "ports": ip.ports,
+            "affectations": affectations.get(ip.id, []),
+        }
+        for ip in ips
+    ]
+    return rows, next_cursor
+
+def backfill_ip_columns(db: Session, batch_size: int = 1000) -> dict:
+    """Normalise les adresses existantes et remplit version_ip / adresse_bin."""
+    last_id, stats = 0, {"mises_a_jour": 0, "invalides": 0}
+    while True:
+        rows = db.execute(
+            select(IP.id, IP.adresse_ip)
+            .where(IP.id > last_id, IP.adresse_bin.is_(None))
+            .order_by(IP.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        values = []
+        for row in rows:
+            try:
+                values.append({"id": row.id, **ip_columns(row.adresse_ip)})
+            except HTTPException:
+                stats["invalides"] += 1
+                logger.warning(f"Adresse IP invalide ignorée : ID={row.id} '{row.adresse_ip}'")
+        if values:
+            db.execute(update(IP), values)
+        db.commit()
+
+        last_id = rows[-1].id
+        stats["mises_a_jour"] += len(values)
+        logger.info(f"{stats['mises_a_jour']} IP(s) normalisée(s)")
+    return stats
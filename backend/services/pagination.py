@@ -0,0 +1,35 @@
+import base64
+import binascii
+import json
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+
+def encode_cursor(key: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str, size: int) -> List[int]:
+    # Curseurs composés d'entiers (id, ou port et id)
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if len(key) != size:
+            raise ValueError(cursor)
+        return [int(value) for value in key]
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide.")
+
+def apply_id_keyset(query, id_column, limit: Optional[int], cursor: Optional[str]):
+    """Filtre et ordonne une requête par id croissant ; une ligne de plus que la page est demandée."""
+    if cursor:
+        (last_id,) = decode_cursor(cursor, 1)
+        query = query.where(id_column > last_id)
+    query = query.order_by(id_column)
+    if limit is not None:
+        query = query.limit(limit + 1)
+    return query
+
+def split_page(items: list, limit: Optional[int], id_getter=lambda item: item.id) -> Tuple[list, Optional[str]]:
+    if limit is None or len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    return items, encode_cursor([id_getter(items[-1])])
@@ -0,0 +1,184 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from database import SessionLocal, engine
+from backend.models.affectation import Affectation
+from backend.models.demande_audit import Demande_Audit
+from backend.services.pdf_render import warm_up
+from log_config import setup_logger
+
+logger = setup_logger()
+
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", 2))
+PDF_MAX_RETRIES = int(os.getenv("PDF_MAX_RETRIES", 3))
+PDF_RETRY_DELAY = float(os.getenv("PDF_RETRY_DELAY", 2))  # en secondes, multiplié par la tentative
+PDF_PURGE_GRACE = 3600  # en secondes : un rendu récent n'est peut-être pas encore référencé
+PDF_WAIT_MAX = 30  # Attente maximale acceptée par les routes de statut
+
+STATUT_EN_ATTENTE = "en_attente"
+STATUT_EN_COURS = "en_cours"
+STATUT_PRET = "pret"
+STATUT_ERREUR = "erreur"
+STATUTS_FINAUX = {STATUT_PRET, STATUT_ERREUR}
+
+# Type de document -> (modèle, colonne du chemin du PDF)
+DOCUMENTS = {
+    "affectation": (Affectation, "affectationpath"),
+    "demande_audit": (Demande_Audit, "fiche_demande_path"),
+}
+TEMPLATES = ("affect_template.html", "fiche_demande_audit_template.html")
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+def init_worker():
+    # Les connexions héritées du processus parent ne doivent pas être réutilisées
+    engine.dispose(close=False)
+    try:
+        warm_up(*TEMPLATES)
+    except Exception as e:
+        # Le rendu réessaiera de charger les ressources à la première fiche
+        logger.warning(f"Préchargement des templates PDF impossible : {e}")
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, initializer=init_worker)
+    return _pool
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def _set_status(kind: str, object_id: int, **values):
+    model, _ = DOCUMENTS[kind]
+    db = SessionLocal()
+    try:
+        db.execute(update(model).where(model.id == object_id).values(**values))
+        db.commit()
+    finally:
+        db.close()
+
+def render_document(kind: str, object_id: int) -> str:
+    # Import tardif : les services importent ce module pour soumettre leurs rendus
+    if kind == "affectation":
+        from backend.services.affectation import generate_affect_pdf, get_affect
+        db = SessionLocal()
+        try:
+            return generate_affect_pdf(get_affect(db, object_id))
+        finally:
+            db.close()
+
+    from backend.services.demande_audit import generate_audit_pdf, get_audit_by_id
+    db = SessionLocal()
+    try:
+        return generate_audit_pdf(get_audit_by_id(object_id, db))
+    finally:
+        db.close()
+
+def run_document_job(kind: str, object_id: int):
+    # Exécuté dans un processus du pool, avec nouvelles tentatives en cas d'échec
+    _, path_column = DOCUMENTS[kind]
+    for attempt in range(1, PDF_MAX_RETRIES + 1):
+        _set_status(kind, object_id, document_statut=STATUT_EN_COURS, document_tentatives=attempt)
+        try:
+            pdf_path = render_document(kind, object_id)
+            _set_status(kind, object_id, **{path_column: pdf_path}, document_statut=STATUT_PRET, document_erreur=None)
+            logger.info(f"PDF {kind} ID={object_id} généré : {pdf_path}")
+            return pdf_path
+        except Exception as e:
+            error_message = str(e.orig) if hasattr(e, 'orig') else str(e)
+            logger.error(f"Échec de la génération du PDF {kind} ID={object_id} (tentative {attempt}/{PDF_MAX_RETRIES}) : {error_message}")
+            _set_status(kind, object_id, document_erreur=error_message)
+            if attempt < PDF_MAX_RETRIES:
+                time.sleep(PDF_RETRY_DELAY * attempt)
+
+    _set_status(kind, object_id, document_statut=STATUT_ERREUR)
+    return None
+
+def submit_document(kind: str, object_id: int):
+    future = get_pool().submit(run_document_job, kind, object_id)
+
+    def on_done(f):
+        # Le processus a pu mourir sans mettre à jour le statut (pool cassé, annulation...)
+        if f.cancelled() or f.exception() is not None:
+            reason = "Génération annulée" if f.cancelled() else str(f.exception())
+            _set_status(kind, object_id, document_statut=STATUT_ERREUR, document_erreur=reason)
+
+    future.add_done_callback(on_done)
+    logger.info(f"Génération du PDF {kind} ID={object_id} mise en file d'attente")
+
+def read_document_status(db: Session, kind: str, object_id: int) -> Optional[dict]:
+    model, path_column = DOCUMENTS[kind]
+    row = db.execute(
+        select(model.id, getattr(model, path_column).label("chemin"), model.document_statut,
+               model.document_erreur, model.document_tentatives)
+        .where(model.id == object_id)
+    ).first()
+    if row is None:
+        return None
+
+    status = {
+        "id": row.id,
+        "statut": row.document_statut,
+        "chemin": row.chemin,
+        "erreur": row.document_erreur,
+        "tentatives": row.document_tentatives,
+    }
+    if status["statut"] is None:
+        # Fiches générées avant la file d'attente
+        status["statut"] = STATUT_PRET if row.chemin else STATUT_ERREUR
+    return status
+
+async def wait_for_document(db: Session, kind: str, object_id: int, timeout: float) -> dict:
+    deadline = time.monotonic() + min(timeout, PDF_WAIT_MAX)
+    while True:
+        status = await run_in_threadpool(read_document_status, db, kind, object_id)
+        if status is None:
+            raise HTTPException(status_code=404, detail="Document non trouvé")
+        if status["statut"] in STATUTS_FINAUX or time.monotonic() >= deadline:
+            return status
+        # Termine la transaction pour lire l'état à jour au prochain tour (REPEATABLE READ)
+        await run_in_threadpool(db.rollback)
+        await asyncio.sleep(0.5)
+
+def document_dirs() -> dict:
+    # Import tardif, comme pour render_document
+    from backend.services.affectation import PDF_DIR as AFFECT_PDF_DIR
+    from backend.services.demande_audit import PDF_DIR as AUDIT_PDF_DIR
+    return {"affectation": AFFECT_PDF_DIR, "demande_audit": AUDIT_PDF_DIR}
+
+def purge_documents(db: Session, dry_run: bool = False) -> dict:
+    """Supprime les PDF qui ne sont plus référencés par aucune affectation ou demande."""
+    stats = {"fichiers": 0, "supprimes": 0, "octets": 0}
+    now = time.time()
+    for kind, pdf_dir in document_dirs().items():
+        if not os.path.isdir(pdf_dir):
+            continue
+        model, path_column = DOCUMENTS[kind]
+        referenced = {
+            os.path.normpath(path)
+            for path in db.scalars(select(getattr(model, path_column)).where(getattr(model, path_column).isnot(None)))
+        }
+        for entry in os.scandir(pdf_dir):
+            if not entry.is_file():
+                continue
+            stats["fichiers"] += 1
+            info = entry.stat()
+            if os.path.normpath(entry.path) in referenced or now - info.st_mtime < PDF_PURGE_GRACE:
+                continue
+            stats["supprimes"] += 1
+            stats["octets"] += info.st_size
+            if not dry_run:
+                os.remove(entry.path)
+            logger.info(f"PDF non référencé {'à supprimer' if dry_run else 'supprimé'} : {entry.path}")
+    return stats
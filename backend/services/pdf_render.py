@@ -0,0 +1,93 @@
+import base64
+import hashlib
+import os
+import threading
+import time
+from functools import lru_cache
+
+from jinja2 import Environment, FileSystemLoader
+
+from log_config import setup_logger
+
+logger = setup_logger()
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+TEMPLATES_DIR = os.path.join(ROOT_DIR, "templates")
+LOGO_PATH = os.path.join(ROOT_DIR, "pictures", "logo.png")
+
+# Environnement partagé : Jinja garde les templates compilés en cache, sans
+# vérifier la date des fichiers à chaque rendu
+_env = Environment(loader=FileSystemLoader(TEMPLATES_DIR), auto_reload=False, cache_size=50)
+_lock = threading.Lock()
+
+@lru_cache(maxsize=None)
+def get_logo_data_uri() -> str:
+    # Le logo est lu une seule fois et embarqué dans le HTML
+    with open(LOGO_PATH, "rb") as f:
+        return "data:image/png;base64," + base64.b64encode(f.read()).decode("ascii")
+
+@lru_cache(maxsize=None)
+def get_font_config():
+    from weasyprint.text.fonts import FontConfiguration
+    return FontConfiguration()
+
+@lru_cache(maxsize=None)
+def get_stylesheet(template_name: str):
+    # La feuille de style associée au template (même nom, extension .css) n'est analysée qu'une fois
+    from weasyprint import CSS
+    css_path = os.path.join(TEMPLATES_DIR, os.path.splitext(template_name)[0] + ".css")
+    return CSS(filename=css_path, font_config=get_font_config())
+
+def get_template(template_name: str):
+    return _env.get_template(template_name)
+
+def warm_up(*template_names: str):
+    # Compile les templates et prépare les ressources avant le premier rendu
+    get_logo_data_uri()
+    for template_name in template_names:
+        get_template(template_name)
+        get_stylesheet(template_name)
+
+@lru_cache(maxsize=None)
+def get_template_digest(template_name: str) -> str:
+    # Empreinte du template et de sa feuille de style : une modification de mise en page invalide le cache
+    digest = hashlib.sha256()
+    for path in (os.path.join(TEMPLATES_DIR, template_name),
+                 os.path.join(TEMPLATES_DIR, os.path.splitext(template_name)[0] + ".css")):
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def render_pdf(template_name: str, pdf_dir: str, **context) -> str:
+    """Rend le template en PDF sous un nom dérivé de son contenu et retourne son chemin.
+
+    Si un PDF identique existe déjà, il est réutilisé sans appel à WeasyPrint.
+    """
+    start = time.perf_counter()
+    html_content = get_template(template_name).render(logo_path=get_logo_data_uri(), **context)
+    rendered = time.perf_counter()
+
+    digest = hashlib.sha256(get_template_digest(template_name).encode())
+    digest.update(html_content.encode("utf-8"))
+    pdf_path = os.path.join(pdf_dir, f"{digest.hexdigest()}.pdf").replace("\\", "/")
+    if os.path.exists(pdf_path):
+        logger.info(f"PDF {os.path.basename(pdf_path)} inchangé, rendu ignoré ({(rendered - start) * 1000:.1f} ms)")
+        return pdf_path
+
+    from weasyprint import HTML
+
+    os.makedirs(pdf_dir, exist_ok=True)
+    tmp_path = f"{pdf_path}.{os.getpid()}.tmp"
+    # FontConfiguration n'est pas prévue pour être utilisée par plusieurs threads à la fois
+    with _lock:
+        HTML(string=html_content, base_url=TEMPLATES_DIR).write_pdf(
+            tmp_path, stylesheets=[get_stylesheet(template_name)], font_config=get_font_config()
+        )
+    os.replace(tmp_path, pdf_path)
+    written = time.perf_counter()
+
+    logger.info(
+        f"PDF {os.path.basename(pdf_path)} généré en {(written - start) * 1000:.0f} ms "
+        f"(template {(rendered - start) * 1000:.1f} ms, WeasyPrint {(written - rendered) * 1000:.0f} ms)"
+    )
+    return pdf_path
@@ -1,369 +1,742 @@
+import base64
+import binascii
+import html
+import json
 import os
+import re
+import threading
+import time
 from copy import copy
-from datetime import datetime, date
+from functools import lru_cache
+from datetime import date
 from io import BytesIO
-from typing import Optional, List
+from itertools import chain
+from types import SimpleNamespace
+from typing import Optional, List, Callable, Tuple
 
-import numpy as np
 import pandas as pd
-from bs4 import BeautifulSoup
 from fastapi import HTTPException, UploadFile
 from openpyxl.styles import PatternFill
-from sqlalchemy import extract, func
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import extract, func, insert, select, update, delete, or_, and_, case
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 from backend.models.plan import Plan
+from backend.models.plan_ref_sequence import PlanRefSequence
 from backend.models.vulnerability import Vulnerability
-from backend.schemas.plan import PlanUpdate, VulnerabilitySummary, PlanResponse
+from backend.schemas.plan import PlanUpdate
 
-from collections import defaultdict, Counter
+from collections import Counter
 from openpyxl import load_workbook, Workbook
-from openpyxl.utils.dataframe import dataframe_to_rows
+from openpyxl.cell import WriteOnlyCell
 
 from openpyxl.drawing.image import Image as XLImage
 
 from openpyxl.styles import Font, Alignment
 
-from backend.schemas.vulnerability import VulnerabiliteResponse
+from backend.services.cpu_pool import run_cpu_bound
+from backend.services.data_version import get_data_version
+from backend.services.plan_filters import compile_plan_filters, date_predicates
+from backend.services.export_cache import make_cache_key, get_cached_export, store_export, EXPORT_CACHE_DIR
 from log_config import setup_logger
 
 logger = setup_logger()
 
-def generate_plan_ref(session: Session, date_realisation: date) -> str:
-    year = date_realisation.year
-    total_existing = session.query(func.count()).filter(
-        func.extract('year', Plan.date_realisation) == year
+def count_plans_for_year(session: Session, year: int) -> int:
+    return session.query(func.count(Plan.id)).filter(
+        *date_predicates(Plan.date_realisation, year)
     ).scalar() or 0
 
-    letter_index = total_existing // 99
+def format_plan_ref(year: int, index: int) -> str:
+    letter_index = index // 99
     if letter_index >= 26:
         raise ValueError("Trop de plans pour l'année !")
 
     letter = chr(ord('A') + letter_index)
-    number = (total_existing % 99) + 1
+    number = (index % 99) + 1
     return f"{year}_{letter}_{number:02d}"
 
-async def process_uploaded_plan(file: UploadFile, db: Session):
+# Limite imposée par le format YYYY_L_NN : 26 lettres x 99 numéros
+MAX_PLANS_PER_YEAR = 26 * 99
+
+def reserve_plan_refs(session: Session, year: int, count: int = 1) -> List[str]:
+    """Réserve `count` références consécutives pour l'année donnée.
+
+    La ligne de séquence de l'année est verrouillée (SELECT ... FOR UPDATE)
+    jusqu'au commit de l'appelant, ce qui sérialise les imports concurrents
+    sans jamais distribuer deux fois la même référence.
+    """
+    query = session.query(PlanRefSequence).filter(PlanRefSequence.annee == year).with_for_update()
+    sequence = query.first()
+
+    if sequence is None:
+        # Première allocation de l'année : on part des plans déjà existants
+        try:
+            with session.begin_nested():
+                sequence = PlanRefSequence(annee=year, prochain_index=count_plans_for_year(session, year))
+                session.add(sequence)
+        except IntegrityError:
+            # Une autre transaction a créé la séquence entre-temps
+            sequence = query.one()
+
+    first = sequence.prochain_index
+    if first + count > MAX_PLANS_PER_YEAR:
+        raise ValueError("Trop de plans pour l'année !")
+
+    sequence.prochain_index = first + count
+    session.flush()
+
+    return [format_plan_ref(year, first + offset) for offset in range(count)]
+
+# Codes MySQL : interblocage (1213) et attente de verrou expirée (1205). InnoDB annule alors toute
+# la transaction, la reprise se fait donc au niveau de l'appelant
+MYSQL_DEADLOCK_ERRORS = {1213, 1205}
+DEADLOCK_RETRIES = 3
+
+def is_deadlock(error: OperationalError) -> bool:
+    args = getattr(error.orig, "args", ())
+    return bool(args) and args[0] in MYSQL_DEADLOCK_ERRORS
+
+def generate_plan_ref(session: Session, date_realisation: date) -> str:
+    return reserve_plan_refs(session, date_realisation.year)[0]
+
+PLAN_IMPORT_COLUMNS = {
+    "ref", "application", "type_application", "type_audit",
+    "date_realisation", "date_cloture", "date_rapport",
+    "nb_vulnerabilites", "niveau_securite", "commentaire_dcsg",
+    "commentaire_cp", "taux_remediation",
+    "titre", "criticite", "pourcentage_remediation", "statut_remediation", "actions"
+}
+
+PLAN_FIELDS = [
+    "application", "type_application", "type_audit", "date_realisation", "date_cloture",
+    "date_rapport", "niveau_securite", "commentaire_dcsg", "commentaire_cp"
+]
+
+VULNERABILITY_FIELDS = ["titre", "criticite", "pourcentage_remediation", "statut_remediation", "actions"]
+
+CRITICITES = ["critique", "majeure", "moderee", "mineure"]
+
+# Taille des lots pour les INSERT groupés (executemany)
+IMPORT_BATCH_SIZE = 1000
+
+
+def _column_to_python(serie: pd.Series) -> list:
+    # Convertit une colonne pandas en valeurs Python natives (NaN/NaT -> None)
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        values = serie.dt.date.astype(object)
+    else:
+        values = serie.astype(object)
+    return values.where(serie.notna(), None).tolist()
+
+
+def _frame_to_records(df: pd.DataFrame, columns: List[str]) -> List[dict]:
+    data = {col: _column_to_python(df[col]) for col in columns}
+    return [dict(zip(columns, values)) for values in zip(*data.values())]
+
+
+def _chunks(items: list, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _parse_dates(serie: pd.Series, dayfirst: bool = False):
+    """Convertit chaque valeur distincte comme une date isolée.
+
+    Une colonne aux formats mélangés (dates Excel, jj/mm/aaaa, ISO) reste lisible,
+    là où une conversion vectorisée impose un seul format. Retourne les dates et le
+    masque des cellules non vides illisibles.
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie, pd.Series(False, index=serie.index)
+    # Chaînes vides traitées comme des cellules vides
+    filled = serie.where(serie.astype(str).str.strip() != "", None)
+    parsed_values = {value: pd.to_datetime(value, dayfirst=dayfirst, errors="coerce") for value in filled.dropna().unique()}
+    parsed = pd.to_datetime(filled.map(parsed_values))
+    return parsed, filled.notna() & parsed.isna()
+
+
+def prepare_plan_import(df: pd.DataFrame):
+    """Normalise le classeur importé et calcule les résumés par plan.
+
+    Retourne (plans, vulnerabilites, rapport) : une ligne par `ref` valide,
+    les vulnérabilités associées (colonne `ref`) et les erreurs de validation.
+    """
+    df = df.dropna(subset=["ref", "date_realisation"]).copy()
+    df["ref"] = df["ref"].astype(str).str.strip()
+
+    df["pourcentage_remediation"] = pd.to_numeric(df["pourcentage_remediation"], errors="coerce")
+
+    # Les champs du plan sont lus sur la première ligne de chaque groupe
+    plans = df.drop_duplicates(subset="ref", keep="first").set_index("ref")
+
+    rapport = []
+    plans["date_realisation"], _ = _parse_dates(plans["date_realisation"], dayfirst=True)
+    invalid = plans["date_realisation"].isna()
+    for ref in plans.index[invalid]:
+        rapport.append({"ref": ref, "statut": "erreur", "detail": "Date de réalisation invalide."})
+    # Une date facultative illisible rejette le plan au lieu d'être remplacée par une valeur vide
+    for column, detail in (("date_cloture", "Date de clôture invalide."), ("date_rapport", "Date de rapport invalide.")):
+        plans[column], unreadable = _parse_dates(plans[column])
+        unreadable &= ~invalid
+        for ref in plans.index[unreadable]:
+            rapport.append({"ref": ref, "statut": "erreur", "detail": detail})
+        invalid |= unreadable
+    plans = plans[~invalid]
+    df = df[df["ref"].isin(plans.index)]
+
+    # Résumés calculés en une seule passe groupée
+    grouped = df.groupby("ref", sort=False)
+    counts = (
+        pd.crosstab(df["ref"], df["criticite"])
+        .reindex(index=plans.index, columns=CRITICITES, fill_value=0)
+    )
+    totals = grouped.size().reindex(plans.index, fill_value=0)
+    taux = grouped["pourcentage_remediation"].mean().reindex(plans.index).round(2).fillna(0.0)
+
+    plans = plans.assign(taux_remediation=taux)
+    plan_records = _frame_to_records(plans.reset_index(), ["ref"] + PLAN_FIELDS + ["taux_remediation"])
+    for record, crit_counts, total in zip(plan_records, counts.itertuples(index=False), totals.tolist()):
+        summary = dict(zip(CRITICITES, (int(c) for c in crit_counts)))
+        summary["total"] = int(total)
+        record["nb_vulnerabilites"] = summary
+        record.update(plan_comment_texts(record["commentaire_dcsg"], record["commentaire_cp"]))
+
+    vuln_records = _frame_to_records(df, ["ref"] + VULNERABILITY_FIELDS)
+    return plan_records, vuln_records, rapport
+
+
+def read_plan_workbook(contents: bytes):
+    """Lit le classeur et prépare l'import ; exécuté dans le pool de calcul.
+
+    Retourne (colonnes manquantes, (plans, vulnerabilites, rapport)).
+    """
+    df = pd.read_excel(BytesIO(contents))
+    missing = PLAN_IMPORT_COLUMNS - set(df.columns)
+    if missing:
+        return missing, None
+    return set(), prepare_plan_import(df)
+
+def import_plans(db: Session, df: pd.DataFrame) -> dict:
+    return import_plan_records(db, *prepare_plan_import(df))
+
+def insert_plan_records(db: Session, plan_records: List[dict], vuln_records: List[dict]):
+    # Attribution des références par année : un bloc réservé par année.
+    # source_ref garde la référence du fichier, même si la transaction est rejouée
+    for year in sorted({p["date_realisation"].year for p in plan_records}):
+        year_plans = [p for p in plan_records if p["date_realisation"].year == year]
+        for plan, plan_ref in zip(year_plans, reserve_plan_refs(db, year, len(year_plans))):
+            plan.setdefault("source_ref", plan["ref"])
+            plan["ref"] = plan_ref
+
+    plan_rows = [{k: v for k, v in p.items() if k != "source_ref"} for p in plan_records]
+    for batch in _chunks(plan_rows, IMPORT_BATCH_SIZE):
+        db.execute(insert(Plan), batch)
+
+    plan_ids = {}
+    for batch in _chunks([p["ref"] for p in plan_records], IMPORT_BATCH_SIZE):
+        plan_ids.update(db.execute(select(Plan.ref, Plan.id).where(Plan.ref.in_(batch))).all())
+
+    ids_by_source = {p["source_ref"]: plan_ids[p["ref"]] for p in plan_records}
+    vuln_rows = []
+    for vuln in vuln_records:
+        row = {k: v for k, v in vuln.items() if k != "ref"}
+        row["plan_id"] = ids_by_source[vuln["ref"]]
+        vuln_rows.append(row)
+    for batch in _chunks(vuln_rows, IMPORT_BATCH_SIZE):
+        db.execute(insert(Vulnerability), batch)
+
+def import_plan_records(db: Session, plan_records: List[dict], vuln_records: List[dict], rapport: List[dict]) -> dict:
+    if not plan_records:
+        return {"importes": 0, "erreurs": len(rapport), "rapport": rapport}
+
+    for attempt in range(1, DEADLOCK_RETRIES + 1):
+        try:
+            insert_plan_records(db, plan_records, vuln_records)
+            db.commit()
+            break
+        except OperationalError as e:
+            db.rollback()
+            # Deux premiers imports de l'année peuvent s'interbloquer sur les verrous d'intervalle de la séquence
+            if not is_deadlock(e) or attempt == DEADLOCK_RETRIES:
+                raise
+            logger.warning(f"Interblocage lors de l'import des plans, nouvelle tentative ({attempt}/{DEADLOCK_RETRIES})")
+            time.sleep(0.1 * attempt)
+        except Exception:
+            db.rollback()
+            raise
+
+    for plan in plan_records:
+        rapport.append({
+            "ref": plan["source_ref"],
+            "statut": "succes",
+            "plan_ref": plan["ref"],
+            "nb_vulnerabilites": plan["nb_vulnerabilites"]["total"],
+        })
+
+    return {"importes": len(plan_records), "erreurs": len(rapport) - len(plan_records), "rapport": rapport}
+
+async def process_uploaded_plan(file: UploadFile, db: AsyncSession):
     if not file.filename.endswith((".xls", ".xlsx")):
         raise HTTPException(status_code=400, detail="Format de fichier non supporté.")
 
     try:
         contents = await file.read()
-        df = pd.read_excel(BytesIO(contents))
-        df.replace({np.nan: None}, inplace=True)
-
-        required_columns = {
-            "ref", "application", "type_application", "type_audit",
-            "date_realisation", "date_cloture", "date_rapport",
-            "nb_vulnerabilites", "niveau_securite", "commentaire_dcsg",
-            "commentaire_cp", "taux_remediation",
-            "titre", "criticite", "pourcentage_remediation", "statut_remediation", "actions"
-        }
-
-        if not required_columns.issubset(df.columns):
-            raise HTTPException(status_code=400, detail=f"Colonnes manquantes : {required_columns - set(df.columns)}")
-
-        # Nettoyage
-        df = df.dropna(subset=['ref', 'date_realisation'])
-
-        grouped = defaultdict(list)
-        for index, row in df.iterrows():
-            grouped[row["ref"]].append(row.to_dict())
-
-        for ref, rows in grouped.items():
-            first_row = rows[0]
-            try:
-                date_realisation = pd.to_datetime(first_row["date_realisation"], dayfirst=True, errors="coerce")
-                if pd.isnull(date_realisation):
-                    raise ValueError("Date de réalisation invalide.")
-
-                plan_ref = generate_plan_ref(db, date_realisation)
-
-                plan = Plan(
-                    ref=plan_ref,
-                    application=first_row["application"],
-                    type_application=first_row["type_application"],
-                    type_audit=first_row["type_audit"],
-                    date_realisation=date_realisation,
-                    date_cloture=pd.to_datetime(first_row.get("date_cloture")) if first_row.get("date_cloture") else None,
-                    date_rapport=pd.to_datetime(first_row.get("date_rapport")) if first_row.get("date_rapport") else None,
-                    niveau_securite=first_row.get("niveau_securite"),
-                    taux_remediation=first_row.get("taux_remediation"),
-                    commentaire_dcsg=first_row.get("commentaire_dcsg"),
-                    commentaire_cp=first_row.get("commentaire_cp")
-                )
-
-                db.add(plan)
-                db.flush()
-                db.refresh(plan)
-
-                for row in rows:
-                    vuln = Vulnerability(
-                        plan_id=plan.id,
-                        titre=row.get("titre"),
-                        criticite=row.get("criticite"),
-                        pourcentage_remediation=row.get("pourcentage_remediation"),
-                        statut_remediation=row.get("statut_remediation"),
-                        actions=row.get("actions")
-                    )
-                    db.add(vuln)
-
-                db.flush()
-                vulnerabilites = db.query(Vulnerability).filter_by(plan_id=plan.id).all()
-                summary = compute_vulnerability_summary(vulnerabilites)
-                plan.nb_vulnerabilites = VulnerabilitySummary(**compute_vulnerability_summary(vulnerabilites)).dict()
-                plan.taux_remediation = compute_taux_remediation(vulnerabilites)
-
-                db.commit()
-
-            except Exception as e:
-                logger.error(f"Erreur insertion vulnérabilité pour ref {ref} : {e}")
-                db.rollback()
-
-        logger.info("Plans et vulnérabilités insérés avec succès.")
-        return {"message": "Importation réussie"}
+        missing, prepared = await run_cpu_bound(read_plan_workbook, contents)
 
+        if missing:
+            raise HTTPException(status_code=400, detail=f"Colonnes manquantes : {missing}")
+
+        # Insertion avec le code synchrone existant, sur la connexion asynchrone
+        result = await db.run_sync(import_plan_records, *prepared)
+
+        logger.info(f"Import terminé : {result['importes']} plan(s) inséré(s), {result['erreurs']} erreur(s).")
+        return {"message": "Importation réussie", **result}
+
+    except HTTPException:
+        raise
     except Exception as e:
         error_message = str(e.orig) if hasattr(e, 'orig') else str(e)
         logger.error(f"Erreur lors du traitement du fichier : {error_message}")
         raise HTTPException(status_code=500, detail="Erreur de traitement du fichier.")
 
-def export_plans_to_excel(
-    db: Session,
-    ref: Optional[str] = None,
-    application: Optional[str] = None,
-    type_audit: Optional[str] = None,
-    niveau_securite: Optional[str] = None,
-    date_realisation: Optional[str] = None,
-    date_cloture: Optional[str] = None,
-    date_rapport: Optional[str] = None,
-    realisation_year: Optional[int] = None,
-    realisation_month: Optional[int] = None,
-    cloture_year: Optional[int] = None,
-    cloture_month: Optional[int] = None,
-    rapport_year: Optional[int] = None,
-    rapport_month: Optional[int] = None,
-):
-    query = db.query(Plan).options(joinedload(Plan.vulnerabilites))
-
-    # Filtres
-    if ref:
-        query = query.filter(Plan.ref.ilike(f"%{ref}%"))
-    if application:
-        query = query.filter(Plan.application.ilike(f"%{application}%"))
-    if type_audit:
-        query = query.filter(Plan.type_audit == type_audit)
-    if niveau_securite:
-        query = query.filter(Plan.niveau_securite == niveau_securite)
-    if date_realisation:
-        query = query.filter(Plan.date_realisation == date_realisation)
-    if date_cloture:
-        query = query.filter(Plan.date_cloture == date_cloture)
-    if date_rapport:
-        query = query.filter(Plan.date_rapport == date_rapport)
-    if realisation_year:
-        query = query.filter(extract('year', Plan.date_realisation) == realisation_year)
-    if realisation_month:
-        query = query.filter(extract('month', Plan.date_realisation) == realisation_month)
-    if cloture_year:
-        query = query.filter(extract('year', Plan.date_cloture) == cloture_year)
-    if cloture_month:
-        query = query.filter(extract('month', Plan.date_cloture) == cloture_month)
-    if rapport_year:
-        query = query.filter(extract('year', Plan.date_rapport) == rapport_year)
-    if rapport_month:
-        query = query.filter(extract('month', Plan.date_rapport) == rapport_month)
-
-    plans = query.all()
-    if not plans:
-        return None
-
-    # Construction des données
-    combined_data = []
-    for plan in plans:
-        if plan.vulnerabilites:
-            for vuln in plan.vulnerabilites:
-                combined_data.append({
-                    "Réf": plan.ref,
-                    "Application/Solution": plan.application,
-                    "Type d'application": plan.type_application,
-                    "Type d'audit": plan.type_audit,
-                    "Date de realisation de la mission": plan.date_realisation,
-                    "Date de cloture de la mission": plan.date_cloture,
-                    "Date de communication du rapport": plan.date_rapport,
-                    "Niveau de securité": plan.niveau_securite,
-                    "Nombre de vulnérabilités": format_vulnerabilites(plan.nb_vulnerabilites),
-                    "Commentaire DCSG": clean_html(plan.commentaire_dcsg),
-                    "Commentaire CP": clean_html(plan.commentaire_cp),
-                    "Titre vulnérabilité": vuln.titre,
-                    "Criticité": vuln.criticite,
-                    "Pourcentage de remédiation": vuln.pourcentage_remediation,
-                    "Statut de remédiation": vuln.statut_remediation,
-                    "Actions": vuln.actions
-                })
-        else:
-            combined_data.append({
-                "Réf": plan.ref,
-                "Application/Solution": plan.application,
-                "Type d'application": plan.type_application,
-                "Type d'audit": plan.type_audit,
-                "Date de realisation de la mission": plan.date_realisation,
-                "Date de cloture de la mission": plan.date_cloture,
-                "Date de communication du rapport": plan.date_rapport,
-                "Niveau de securité": plan.niveau_securite,
-                "Nombre de vulnérabilités": plan.nb_vulnerabilites,
-                "Commentaire DCSG": plan.commentaire_dcsg,
-                "Commentaire CP": plan.commentaire_cp,
-                "Titre vulnérabilité": "",
-                "Criticité": "",
-                "Pourcentage de remédiation": "",
-                "Statut de remédiation": "",
-                "Actions": ""
-            })
-
-    # Chemin vers le modèle de la page de garde
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    cover_path = os.path.join(current_dir, '..', '..', 'Page_de_garde.xlsx')
-
-    # Charger la page de garde existante
-    cover_wb = load_workbook(cover_path)
-    cover_ws = cover_wb.active
-
-    # Nouveau fichier final
-    final_wb = Workbook()
-    final_wb.remove(final_wb.active)
-
-    CRITICITE_COLOR_MAP = {
-        "mineure": PatternFill(start_color="A9D08E", end_color="A9D08E", fill_type="solid"),
-        "moderee": PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid"),
-        "majeure": PatternFill(start_color="FFC000", end_color="FFC000", fill_type="solid"),
-        "critique": PatternFill(start_color="C00000", end_color="C00000", fill_type="solid"),
+EXPORT_HEADERS = [
+    "Réf", "Application/Solution", "Type d'application", "Type d'audit",
+    "Date de realisation de la mission", "Date de cloture de la mission", "Date de communication du rapport",
+    "Niveau de securité", "Nombre de vulnérabilités", "Commentaire DCSG", "Commentaire CP",
+    "Titre vulnérabilité", "Criticité", "Pourcentage de remédiation", "Statut de remédiation", "Actions"
+]
+
+EXPORT_PLAN_COLUMNS = [
+    Plan.id, Plan.ref, Plan.application, Plan.type_application, Plan.type_audit,
+    Plan.date_realisation, Plan.date_cloture, Plan.date_rapport, Plan.niveau_securite,
+    Plan.nb_vulnerabilites, Plan.commentaire_dcsg, Plan.commentaire_cp,
+    Plan.commentaire_dcsg_texte, Plan.commentaire_cp_texte
+]
+
+EXPORT_VULNERABILITY_COLUMNS = [
+    Vulnerability.titre, Vulnerability.criticite, Vulnerability.pourcentage_remediation,
+    Vulnerability.statut_remediation, Vulnerability.actions
+]
+
+# Nombre de lignes lues par aller-retour sur le curseur serveur
+EXPORT_YIELD_PER = 1000
+
+CRITICITE_COLOR_MAP = {
+    "mineure": PatternFill(start_color="A9D08E", end_color="A9D08E", fill_type="solid"),
+    "moderee": PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid"),
+    "majeure": PatternFill(start_color="FFC000", end_color="FFC000", fill_type="solid"),
+    "critique": PatternFill(start_color="C00000", end_color="C00000", fill_type="solid"),
+}
+
+HEADER_FILL = PatternFill(start_color="70AD47", end_color="70AD47", fill_type="solid")
+HEADER_FONT = Font(bold=True)
+HEADER_ALIGNMENT = Alignment(horizontal="center", vertical="center", wrap_text=True)
+
+SERVICES_DIR = os.path.dirname(os.path.abspath(__file__))
+COVER_PATH = os.path.join(SERVICES_DIR, '..', '..', 'Page_de_garde.xlsx')
+LOGO_PATH = os.path.join(SERVICES_DIR, '..', '..', 'pictures', 'logo.png')
+
+# Page de garde compilée, recompilée uniquement si un des fichiers source change
+_cover_template = None
+_cover_lock = threading.Lock()
+
+def _file_mtime(path: str) -> Optional[float]:
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+def compile_cover_template() -> dict:
+    version = (_file_mtime(COVER_PATH), _file_mtime(LOGO_PATH))
+    cover_ws = load_workbook(COVER_PATH).active
+
+    # Valeurs et styles figés une fois pour toutes (les styles openpyxl sont immuables)
+    rows = []
+    for row in cover_ws.iter_rows():
+        rows.append([
+            (cell.value, (copy(cell.font), copy(cell.border), copy(cell.fill), cell.number_format,
+                          copy(cell.protection), copy(cell.alignment)) if cell.has_style else None)
+            for cell in row
+        ])
+
+    logo = None
+    if version[1] is not None:
+        with open(LOGO_PATH, "rb") as f:
+            logo = f.read()
+
+    logger.info("Page de garde compilée depuis %s", COVER_PATH)
+    return {
+        "version": version,
+        "rows": rows,
+        "widths": {col_letter: dim.width for col_letter, dim in cover_ws.column_dimensions.items()},
+        "merges": [str(merged_cell) for merged_cell in cover_ws.merged_cells.ranges],
+        "logo": logo,
     }
 
-    # Copier chaque cellule avec son style
+def get_cover_template() -> dict:
+    global _cover_template
+    version = (_file_mtime(COVER_PATH), _file_mtime(LOGO_PATH))
+    if _cover_template is None or _cover_template["version"] != version:
+        with _cover_lock:
+            if _cover_template is None or _cover_template["version"] != version:
+                _cover_template = compile_cover_template()
+    return _cover_template
+
+def write_cover_sheet(final_wb: Workbook):
+    template = get_cover_template()
     new_cover_ws = final_wb.create_sheet("Page de garde")
-    for row in cover_ws.iter_rows():
-        for cell in row:
-            new_cell = new_cover_ws.cell(row=cell.row, column=cell.column, value=cell.value)
-            if cell.has_style:
-                new_cell.font = copy(cell.font)
-                new_cell.border = copy(cell.border)
-                new_cell.fill = copy(cell.fill)
-                new_cell.number_format = copy(cell.number_format)
-                new_cell.protection = copy(cell.protection)
-                new_cell.alignment = copy(cell.alignment)
-
-    # Gérer la largeur des colonnes
-    for col_letter, dim in cover_ws.column_dimensions.items():
-        new_cover_ws.column_dimensions[col_letter].width = dim.width
+
+    # Gérer la largeur des colonnes (avant toute écriture en mode write-only)
+    for col_letter, width in template["widths"].items():
+        new_cover_ws.column_dimensions[col_letter].width = width
+
+    for row in template["rows"]:
+        new_row = []
+        for value, style in row:
+            new_cell = WriteOnlyCell(new_cover_ws, value=value)
+            if style:
+                (new_cell.font, new_cell.border, new_cell.fill, new_cell.number_format,
+                 new_cell.protection, new_cell.alignment) = style
+            new_row.append(new_cell)
+        new_cover_ws.append(new_row)
 
     # Gérer les fusions
-    for merged_cell in cover_ws.merged_cells.ranges:
-        new_cover_ws.merge_cells(str(merged_cell))
+    for merged_cell in template["merges"]:
+        new_cover_ws.merged_cells.add(merged_cell)
 
     # Ajouter une image à la page de garde (entre C18 et F24)
-    image_path = os.path.join(current_dir, '..', '..', 'pictures', 'logo.png')
-    if os.path.exists(image_path):
-        img = XLImage(image_path)
+    if template["logo"]:
+        img = XLImage(BytesIO(template["logo"]))
 
         img.width = 64 * 4  # ≈ 256 pixels
         img.height = 20 * 7  # ≈ 140 pixels
 
         new_cover_ws.add_image(img, 'C18')  # Position d’ancrage
 
-    # Ajouter les données "Plans"
+def write_plans_sheet(final_wb: Workbook, rows, progress: Optional[Callable[[int], None]] = None):
     plans_ws = final_wb.create_sheet("Plans")
-    df = pd.DataFrame(combined_data)
-
-    for r in dataframe_to_rows(df, index=False, header=True):
-        plans_ws.append(r)
-
-    # Appliquer une mise en forme à la première ligne (en-tête)
-    header_fill = PatternFill(start_color="70AD47", end_color="70AD47", fill_type="solid")
-    header_font = Font(bold=True)
-    header_alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-
-    for cell in plans_ws[1]:  # Ligne 1 = en-tête
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = header_alignment
-
-    # Appliquer le style de couleur selon la criticité
-    criticite_column_index = None
-    for idx, cell in enumerate(plans_ws[1], start=1):
-        if cell.value == "Criticité":
-            criticite_column_index = idx
-            break
-
-    if criticite_column_index:
-        for row in plans_ws.iter_rows(min_row=2, min_col=criticite_column_index, max_col=criticite_column_index):
-            for cell in row:
-                criticite_value = str(cell.value).strip().lower() if cell.value else ""
-                if criticite_value in CRITICITE_COLOR_MAP:
-                    cell.fill = CRITICITE_COLOR_MAP[criticite_value]
 
-    # Sauvegarde
-    EXPORT_DIR = os.path.join(current_dir, '..', '..', 'exports_plan')
-    os.makedirs(EXPORT_DIR, exist_ok=True)
-    file_path = os.path.join(EXPORT_DIR, f"plans_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx")
-    final_wb.save(file_path)
+    # En-tête stylé dès l'écriture
+    header = []
+    for title in EXPORT_HEADERS:
+        cell = WriteOnlyCell(plans_ws, value=title)
+        cell.fill = HEADER_FILL
+        cell.font = HEADER_FONT
+        cell.alignment = HEADER_ALIGNMENT
+        header.append(cell)
+    plans_ws.append(header)
+
+    current_plan_id = None
+    plan_values = []
+    written = 0
+    for row in rows:
+        # Les colonnes du plan ne sont calculées qu'une fois par plan (lignes triées par plan)
+        if row.id != current_plan_id:
+            current_plan_id = row.id
+            plan_values = [
+                row.ref,
+                row.application,
+                row.type_application,
+                row.type_audit,
+                row.date_realisation,
+                row.date_cloture,
+                row.date_rapport,
+                row.niveau_securite,
+                format_vulnerabilites(row.nb_vulnerabilites),
+                _comment_text(row.commentaire_dcsg_texte, row.commentaire_dcsg),
+                _comment_text(row.commentaire_cp_texte, row.commentaire_cp),
+            ]
+
+        criticite_cell = WriteOnlyCell(plans_ws, value=_export_value(row.criticite))
+        criticite_value = str(row.criticite).strip().lower() if row.criticite else ""
+        if criticite_value in CRITICITE_COLOR_MAP:
+            criticite_cell.fill = CRITICITE_COLOR_MAP[criticite_value]
+
+        plans_ws.append(plan_values + [
+            _export_value(row.titre),
+            criticite_cell,
+            _export_value(row.pourcentage_remediation),
+            _export_value(row.statut_remediation),
+            _export_value(row.actions),
+        ])
+
+        written += 1
+        if progress and written % EXPORT_YIELD_PER == 0:
+            progress(written)
+
+    if progress:
+        progress(written)
+
+def _comment_text(texte: Optional[str], raw_html: Optional[str]) -> str:
+    # Les plans antérieurs au stockage du texte sont convertis à la volée
+    return texte if texte is not None else clean_html(raw_html)
+
+def _export_value(value):
+    # Cellule vide pour les plans sans vulnérabilité (jointure externe)
+    return "" if value is None else value
 
-    return file_path
-
-def get_filtered_plans(
+def export_plans_to_excel(
     db: Session,
     ref: Optional[str] = None,
     application: Optional[str] = None,
     type_audit: Optional[str] = None,
     niveau_securite: Optional[str] = None,
-    # Filtres exacts
     date_realisation: Optional[str] = None,
     date_cloture: Optional[str] = None,
     date_rapport: Optional[str] = None,
-    # Filtres par année/mois
     realisation_year: Optional[int] = None,
     realisation_month: Optional[int] = None,
     cloture_year: Optional[int] = None,
     cloture_month: Optional[int] = None,
     rapport_year: Optional[int] = None,
     rapport_month: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
 ):
-    query = db.query(Plan).options(joinedload(Plan.vulnerabilites))
-
-    # Filtres textuels
-    if ref:
-        query = query.filter(Plan.ref.ilike(f"%{ref}%"))
-    if application:
-        query = query.filter(Plan.application.ilike(f"%{application}%"))
-    if type_audit:
-        query = query.filter(Plan.type_audit == type_audit)
-    if niveau_securite:
-        query = query.filter(Plan.niveau_securite == niveau_securite)
-
-    # Filtres exacts sur les dates
-    if date_realisation:
-        query = query.filter(Plan.date_realisation == date_realisation)
-    if date_cloture:
-        query = query.filter(Plan.date_cloture == date_cloture)
-    if date_rapport:
-        query = query.filter(Plan.date_rapport == date_rapport)
-
-    # Filtres par année/mois
-    if realisation_year:
-        query = query.filter(extract('year', Plan.date_realisation) == realisation_year)
-    if realisation_month:
-        query = query.filter(extract('month', Plan.date_realisation) == realisation_month)
-
-    if cloture_year:
-        query = query.filter(extract('year', Plan.date_cloture) == cloture_year)
-    if cloture_month:
-        query = query.filter(extract('month', Plan.date_cloture) == cloture_month)
-
-    if rapport_year:
-        query = query.filter(extract('year', Plan.date_rapport) == rapport_year)
-    if rapport_month:
-        query = query.filter(extract('month', Plan.date_rapport) == rapport_month)
-
-    return query.all()
+    filters = {
+        "ref": ref, "application": application, "type_audit": type_audit, "niveau_securite": niveau_securite,
+        "date_realisation": date_realisation, "date_cloture": date_cloture, "date_rapport": date_rapport,
+        "realisation_year": realisation_year, "realisation_month": realisation_month,
+        "cloture_year": cloture_year, "cloture_month": cloture_month,
+        "rapport_year": rapport_year, "rapport_month": rapport_month,
+    }
+    cache_key = make_cache_key(filters, get_data_version(db, "plans"))
+    cached_path = get_cached_export(cache_key)
+    if cached_path:
+        return cached_path
+
+    query = db.query(Plan).filter(*compile_plan_filters(**filters))
+
+    query = query.outerjoin(Vulnerability, Vulnerability.plan_id == Plan.id)
+
+    # Le total de lignes n'est compté que si l'appelant suit la progression
+    on_rows_written = None
+    if progress:
+        total = query.with_entities(func.count()).scalar() or 0
+        on_rows_written = lambda written: progress(written, total)
+
+    rows = iter(
+        query.with_entities(*EXPORT_PLAN_COLUMNS, *EXPORT_VULNERABILITY_COLUMNS)
+        .order_by(Plan.id, Vulnerability.id)
+        .execution_options(yield_per=EXPORT_YIELD_PER)
+    )
+    first_row = next(rows, None)
+    if first_row is None:
+        return None
+
+    final_wb = Workbook(write_only=True)
+    write_cover_sheet(final_wb)
+    write_plans_sheet(final_wb, chain([first_row], rows), on_rows_written)
+
+    # Sauvegarde dans un fichier temporaire puis publication dans le cache
+    os.makedirs(EXPORT_CACHE_DIR, exist_ok=True)
+    tmp_path = os.path.join(EXPORT_CACHE_DIR, f".{cache_key}.{os.getpid()}.{threading.get_ident()}.tmp")
+    final_wb.save(tmp_path)
+
+    return store_export(cache_key, tmp_path)
+
+def filter_plans_query(db: Session, **filters):
+    return db.query(Plan).filter(*compile_plan_filters(**filters))
+
+# Tailles de page acceptées par la liste des plans
+PLANS_PAGE_MAX = 500
+PLAN_SORT_COLUMNS = {"id": Plan.id, "date_realisation": Plan.date_realisation}
+
+PLAN_HEADER_COLUMNS = [
+    Plan.id, Plan.ref, Plan.application, Plan.type_application, Plan.type_audit,
+    Plan.date_realisation, Plan.date_cloture, Plan.date_rapport, Plan.niveau_securite,
+    Plan.nb_vulnerabilites, Plan.taux_remediation, Plan.commentaire_dcsg, Plan.commentaire_cp
+]
+
+def encode_plan_cursor(plan, order_by: str) -> str:
+    key = [plan.id] if order_by == "id" else [getattr(plan, order_by).isoformat() if getattr(plan, order_by) else None, plan.id]
+    return base64.urlsafe_b64encode(json.dumps(key).encode("utf-8")).decode("ascii")
+
+def decode_plan_cursor(cursor: str, order_by: str) -> list:
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if order_by == "id":
+            (last_id,) = key
+            return [int(last_id)]
+        last_value, last_id = key
+        return [date.fromisoformat(last_value) if last_value else None, int(last_id)]
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide.")
+
+def apply_plan_keyset(query, order_by: str, cursor: Optional[str]):
+    if order_by == "id":
+        if cursor:
+            (last_id,) = decode_plan_cursor(cursor, order_by)
+            query = query.filter(Plan.id > last_id)
+        return query.order_by(Plan.id)
+
+    # Tri (colonne, id) : MySQL place les dates nulles en premier en ordre croissant
+    column = PLAN_SORT_COLUMNS[order_by]
+    if cursor:
+        last_value, last_id = decode_plan_cursor(cursor, order_by)
+        if last_value is None:
+            query = query.filter(or_(and_(column.is_(None), Plan.id > last_id), column.isnot(None)))
+        else:
+            query = query.filter(or_(column > last_value, and_(column == last_value, Plan.id > last_id)))
+    return query.order_by(column, Plan.id)
+
+def get_filtered_plans(
+    db: Session,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    order_by: str = "id",
+    include_vulnerabilites: bool = True,
+    **filters,
+) -> Tuple[List[dict], Optional[str]]:
+    # Projection des colonnes : les lignes sont converties directement en dicts, sans objets ORM
+    query = filter_plans_query(db, **filters).with_entities(*PLAN_HEADER_COLUMNS)
+    query = apply_plan_keyset(query, order_by, cursor)
+
+    next_cursor = None
+    if limit is None:
+        rows = query.all()
+    else:
+        # Une ligne de plus que la page pour savoir s'il existe une page suivante
+        rows = query.limit(limit + 1).all()
+        if len(rows) > limit:
+            next_cursor = encode_plan_cursor(rows[limit - 1], order_by)
+            rows = rows[:limit]
+
+    plans = [plan_row_to_dict(row) for row in rows]
+    if include_vulnerabilites:
+        attach_vulnerabilites(db, plans)
+    return plans, next_cursor
+
+def plan_row_to_dict(row) -> dict:
+    plan = row._asdict()
+    summary = plan["nb_vulnerabilites"]
+    plan["nb_vulnerabilites"] = {k: summary.get(k, 0) for k in CRITICITES + ["total"]} \
+        if isinstance(summary, dict) else None
+    return plan
+
+def attach_vulnerabilites(db: Session, plans: List[dict]):
+    # La clé n'est présente que si les vulnérabilités ont été demandées
+    plans_by_id = {plan["id"]: plan for plan in plans}
+    for plan in plans:
+        plan["vulnerabilites"] = []
+    for batch in _chunks(list(plans_by_id), IMPORT_BATCH_SIZE):
+        rows = db.execute(
+            select(Vulnerability.plan_id, Vulnerability.id, *[getattr(Vulnerability, f) for f in VULNERABILITY_FIELDS])
+            .where(Vulnerability.plan_id.in_(batch))
+            .order_by(Vulnerability.id)
+        )
+        for row in rows:
+            vuln = row._asdict()
+            plans_by_id[vuln.pop("plan_id")]["vulnerabilites"].append(vuln)
+
+def count_filtered_plans(db: Session, **filters) -> int:
+    return filter_plans_query(db, **filters).with_entities(func.count(Plan.id)).scalar() or 0
+
+def get_plan_vulnerabilites(db: Session, plan_id: int) -> List[Vulnerability]:
+    if not db.query(Plan.id).filter(Plan.id == plan_id).first():
+        raise HTTPException(status_code=404, detail="Plan non trouvé.")
+    return db.query(Vulnerability).filter(Vulnerability.plan_id == plan_id).order_by(Vulnerability.id).all()
+
+# Statistiques du tableau de bord, recalculées quand la version des données change
+_stats_cache = {"version": None, "data": None}
+_stats_lock = threading.Lock()
+
+def compute_plan_stats(db: Session) -> List[dict]:
+    # Comptage des vulnérabilités par plan, puis agrégation par année/type/niveau
+    vulns_per_plan = (
+        select(
+            Vulnerability.plan_id.label("plan_id"),
+            *[func.sum(case((Vulnerability.criticite == c, 1), else_=0)).label(c) for c in CRITICITES],
+            func.count(Vulnerability.id).label("total"),
+        )
+        .group_by(Vulnerability.plan_id)
+        .subquery()
+    )
+
+    annee = extract('year', Plan.date_realisation).label("annee")
+    query = (
+        select(
+            annee,
+            Plan.type_audit,
+            Plan.niveau_securite,
+            func.count(Plan.id).label("nb_plans"),
+            *[func.coalesce(func.sum(vulns_per_plan.c[c]), 0).label(c) for c in CRITICITES + ["total"]],
+            func.avg(Plan.taux_remediation).label("taux_remediation_moyen"),
+        )
+        .outerjoin(vulns_per_plan, vulns_per_plan.c.plan_id == Plan.id)
+        .group_by(annee, Plan.type_audit, Plan.niveau_securite)
+        .order_by(annee, Plan.type_audit, Plan.niveau_securite)
+    )
+
+    stats = []
+    for row in db.execute(query).mappings():
+        taux = row["taux_remediation_moyen"]
+        stats.append({
+            "annee": int(row["annee"]) if row["annee"] is not None else None,
+            "type_audit": row["type_audit"],
+            "niveau_securite": row["niveau_securite"],
+            "nb_plans": row["nb_plans"],
+            "vulnerabilites": {c: int(row[c]) for c in CRITICITES + ["total"]},
+            "taux_remediation_moyen": round(float(taux), 2) if taux is not None else None,
+        })
+    return stats
+
+def get_plan_stats(db: Session) -> List[dict]:
+    version = get_data_version(db, "plans")
+    with _stats_lock:
+        if _stats_cache["version"] == version:
+            return _stats_cache["data"]
+
+    data = compute_plan_stats(db)
+    with _stats_lock:
+        _stats_cache["version"] = version
+        _stats_cache["data"] = data
+    logger.info(f"Statistiques des plans recalculées (version {version})")
+    return data
+
+def sync_plan_vulnerabilites(db: Session, plan: Plan, vulnerabilites_data: List[dict]):
+    """Applique la liste reçue aux vulnérabilités du plan par différence sur les ids.
+
+    Les vulnérabilités sans id sont insérées, celles dont un champ a changé sont
+    mises à jour et celles absentes de la liste sont supprimées, chaque catégorie
+    en une seule requête groupée.
+    """
+    existing = {
+        row.id: dict(row._mapping)
+        for row in db.execute(
+            select(Vulnerability.id, *[getattr(Vulnerability, f) for f in VULNERABILITY_FIELDS])
+            .where(Vulnerability.plan_id == plan.id)
+        )
+    }
+
+    to_insert, to_update, kept_ids = [], [], set()
+    for vuln_data in vulnerabilites_data:
+        vuln_id = vuln_data.get("id")
+        values = {f: vuln_data.get(f) for f in VULNERABILITY_FIELDS}
+        if vuln_id is None:
+            to_insert.append({"plan_id": plan.id, **values})
+            continue
+        if vuln_id not in existing:
+            raise HTTPException(status_code=400, detail=f"Vulnérabilité {vuln_id} introuvable pour ce plan.")
+        kept_ids.add(vuln_id)
+        if any(existing[vuln_id][f] != values[f] for f in VULNERABILITY_FIELDS):
+            to_update.append({"id": vuln_id, **values})
+
+    to_delete = [vuln_id for vuln_id in existing if vuln_id not in kept_ids]
+
+    if to_delete:
+        db.execute(delete(Vulnerability).where(Vulnerability.id.in_(to_delete)))
+    if to_update:
+        db.execute(update(Vulnerability), to_update)
+    if to_insert:
+        db.execute(insert(Vulnerability), to_insert)
+
+    # Résumés recalculés à partir de l'état final connu en mémoire, sans relire la table
+    final_rows = {vuln_id: existing[vuln_id] for vuln_id in kept_ids}
+    final_rows.update({row["id"]: row for row in to_update})
+    vulns = [SimpleNamespace(**row) for row in list(final_rows.values()) + to_insert]
+    plan.nb_vulnerabilites = compute_vulnerability_summary(vulns)
+    plan.taux_remediation = compute_taux_remediation(vulns)
+
+    logger.info(f"Plan {plan.id} : {len(to_insert)} ajout(s), {len(to_update)} modification(s), "
+                f"{len(to_delete)} suppression(s) de vulnérabilités.")
 
 def update_plan(db: Session, plan_id: int, updated_data: PlanUpdate, vulnerabilites=None):
     plan = db.query(Plan).filter(Plan.id == plan_id).first()
@@ -378,25 +751,13 @@ def update_plan(db: Session, plan_id: int, updated_data: PlanUpdate, vulnerabili
         # Mise à jour des champs du plan
         for key, value in update_fields.items():
             setattr(plan, key, value)
+        if "commentaire_dcsg" in update_fields or "commentaire_cp" in update_fields:
+            for key, value in plan_comment_texts(plan.commentaire_dcsg, plan.commentaire_cp).items():
+                setattr(plan, key, value)
 
         # Si les vulnérabilités sont incluses
         if vulnerabilites_data is not None:
-            # Supprimer les vulnérabilités existantes
-            db.query(Vulnerability).filter(Vulnerability.plan_id == plan.id).delete()
-
-            # Ajouter les nouvelles
-            new_vulns = []
-            for vuln_data in vulnerabilites_data:
-                vuln = Vulnerability(plan_id=plan.id, **vuln_data)
-                db.add(vuln)
-                new_vulns.append(vuln)
-
-            db.flush()  # s'assurer que les vulnérabilités sont bien insérées avant résumé
-
-            # Mettre à jour les champs résumés à partir des nouvelles vulnérabilités
-            summary = compute_vulnerability_summary(new_vulns)
-            plan.nb_vulnerabilites = dict(summary)
-            plan.taux_remediation = compute_taux_remediation(new_vulns)
+            sync_plan_vulnerabilites(db, plan, vulnerabilites_data)
 
         db.commit()
         db.refresh(plan)
@@ -404,41 +765,15 @@ def update_plan(db: Session, plan_id: int, updated_data: PlanUpdate, vulnerabili
         logger.info(f"Plan {plan_id} et vulnérabilités mis à jour avec succès.")
         return plan
 
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         error_message = str(e.orig) if hasattr(e, 'orig') else str(e)
         logger.error(f"Erreur lors de la mise à jour du plan : {error_message}")
         raise HTTPException(status_code=500, detail="Erreur lors de la mise à jour du plan.")
 
-def serialize_plan(plan: Plan) -> PlanResponse:
-    return PlanResponse(
-        id=plan.id,
-        ref=plan.ref,
-        application=plan.application,
-        type_application=plan.type_application,
-        type_audit=plan.type_audit,
-        date_realisation=plan.date_realisation,
-        date_cloture=plan.date_cloture,
-        date_rapport=plan.date_rapport,
-        niveau_securite=plan.niveau_securite,
-        taux_remediation=plan.taux_remediation,
-        commentaire_dcsg=plan.commentaire_dcsg,
-        commentaire_cp=plan.commentaire_cp,
-        nb_vulnerabilites=VulnerabilitySummary(**plan.nb_vulnerabilites)
-        if isinstance(plan.nb_vulnerabilites, dict) else None,
-
-        vulnerabilites=[
-            VulnerabiliteResponse(
-                id=v.id,
-                titre=v.titre,
-                criticite=v.criticite,
-                pourcentage_remediation=v.pourcentage_remediation,
-                statut_remediation=v.statut_remediation,
-                actions=v.actions
-            ) for v in plan.vulnerabilites
-        ]
-    )
-
 def compute_vulnerability_summary(vulnerabilities):
     criticity_counts = Counter([v.criticite for v in vulnerabilities if v.criticite])
     return {
@@ -478,7 +813,18 @@ def format_vulnerabilites(vuln_dict):
 
     return "\n".join(lines)
 
+HTML_TAG_PATTERN = re.compile(r"<!--.*?-->|<[^>]*>", re.DOTALL)
+
+@lru_cache(maxsize=4096)
 def clean_html(raw_html):
+    # Équivalent de BeautifulSoup(...).get_text(separator=" ") sans construire d'arbre
     if not raw_html:
         return ""
-    return BeautifulSoup(raw_html, "html.parser").get_text(separator=" ").strip()
\ No newline at end of file
+    parts = [html.unescape(part) for part in HTML_TAG_PATTERN.split(str(raw_html)) if part]
+    return " ".join(parts).strip()
+
+def plan_comment_texts(commentaire_dcsg: Optional[str], commentaire_cp: Optional[str]) -> dict:
+    return {
+        "commentaire_dcsg_texte": clean_html(commentaire_dcsg) if commentaire_dcsg else None,
+        "commentaire_cp_texte": clean_html(commentaire_cp) if commentaire_cp else None,
+    }
\ No newline at end of file
@@ -0,0 +1,82 @@
+from datetime import date
+from typing import Optional, List, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import extract
+
+from backend.models.plan import Plan
+
+# Colonne de date filtrée pour chaque préfixe de paramètre (realisation_year, cloture_month, ...)
+DATE_COLUMNS = {
+    "realisation": Plan.date_realisation,
+    "cloture": Plan.date_cloture,
+    "rapport": Plan.date_rapport,
+}
+
+# Bornes acceptées pour les paramètres *_year : la fin d'intervalle (année suivante) doit rester une date valide
+YEAR_MIN = 1
+YEAR_MAX = 9998
+
+def date_bounds(year: int, month: Optional[int] = None) -> Tuple[date, date]:
+    # Intervalle semi-ouvert [début, fin) couvrant l'année ou le mois demandé
+    if not YEAR_MIN <= year <= YEAR_MAX or (month and not 1 <= month <= 12):
+        raise HTTPException(status_code=400, detail=f"Année ou mois invalide : {year}-{month}")
+    if month:
+        start = date(year, month, 1)
+        end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    else:
+        start = date(year, 1, 1)
+        end = date(year + 1, 1, 1)
+    return start, end
+
+def date_predicates(column, year: Optional[int] = None, month: Optional[int] = None) -> list:
+    # Les bornes portent directement sur la colonne pour que l'index soit utilisable
+    if year:
+        start, end = date_bounds(year, month)
+        return [column >= start, column < end]
+    if month:
+        # Un mois sans année ne peut pas s'exprimer en intervalle
+        return [extract('month', column) == month]
+    return []
+
+def compile_plan_filters(
+    ref: Optional[str] = None,
+    application: Optional[str] = None,
+    type_audit: Optional[str] = None,
+    niveau_securite: Optional[str] = None,
+    date_realisation: Optional[str] = None,
+    date_cloture: Optional[str] = None,
+    date_rapport: Optional[str] = None,
+    realisation_year: Optional[int] = None,
+    realisation_month: Optional[int] = None,
+    cloture_year: Optional[int] = None,
+    cloture_month: Optional[int] = None,
+    rapport_year: Optional[int] = None,
+    rapport_month: Optional[int] = None,
+) -> List:
+    predicates = []
+
+    # Filtres textuels
+    if ref:
+        predicates.append(Plan.ref.ilike(f"%{ref}%"))
+    if application:
+        predicates.append(Plan.application.ilike(f"%{application}%"))
+    if type_audit:
+        predicates.append(Plan.type_audit == type_audit)
+    if niveau_securite:
+        predicates.append(Plan.niveau_securite == niveau_securite)
+
+    # Filtres exacts sur les dates
+    if date_realisation:
+        predicates.append(Plan.date_realisation == date_realisation)
+    if date_cloture:
+        predicates.append(Plan.date_cloture == date_cloture)
+    if date_rapport:
+        predicates.append(Plan.date_rapport == date_rapport)
+
+    # Filtres par année/mois
+    predicates += date_predicates(DATE_COLUMNS["realisation"], realisation_year, realisation_month)
+    predicates += date_predicates(DATE_COLUMNS["cloture"], cloture_year, cloture_month)
+    predicates += date_predicates(DATE_COLUMNS["rapport"], rapport_year, rapport_month)
+
+    return predicates
@@ -0,0 +1,53 @@
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+
+from backend.models.ip import IP
+from backend.models.ports import Port
+from backend.services.ip import get_ip_affectations
+from backend.services.pagination import encode_cursor, decode_cursor
+from log_config import setup_logger
+
+logger = setup_logger()
+
+PORTS_PAGE_MAX = 500
+
+def get_port_exposure(
+    db: Session,
+    port_min: int,
+    port_max: int,
+    status: Optional[str] = "open",
+    limit: int = 100,
+    cursor: Optional[str] = None
+) -> Tuple[List[dict], Optional[str]]:
+    """Hôtes exposant un port (ou une plage de ports), avec leurs affectations et prestataires."""
+    if port_min > port_max:
+        raise HTTPException(status_code=400, detail="port_min doit être inférieur ou égal à port_max.")
+    limit = min(limit, PORTS_PAGE_MAX)
+
+    # Parcours de l'index (port, status) dans l'ordre (port, id) pour une pagination stable
+    query = (
+        select(Port.id.label("port_id"), Port.port, Port.status, Port.ip_id, IP.adresse_ip)
+        .join(IP, IP.id == Port.ip_id)
+        # Un port unique en égalité : l'index (port, status) est alors déjà trié par id
+        .where(Port.port == port_min if port_min == port_max else Port.port.between(port_min, port_max))
+        .order_by(Port.port, Port.id)
+        .limit(limit + 1)
+    )
+    if status:
+        query = query.where(Port.status == status)
+    if cursor:
+        last_port, last_id = decode_cursor(cursor, 2)
+        query = query.where(or_(Port.port > last_port, and_(Port.port == last_port, Port.id > last_id)))
+
+    rows = db.execute(query).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1].port, rows[-1].port_id])
+
+    affectations = get_ip_affectations(db, (row.ip_id for row in rows))
+    logger.info(f"{len(rows)} exposition(s) trouvée(s) pour les ports {port_min}-{port_max}")
+    return [{**row._asdict(), "affectations": affectations.get(row.ip_id, [])} for row in rows], next_cursor
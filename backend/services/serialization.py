@@ -0,0 +1,30 @@
+from functools import lru_cache
+from typing import List, Type, Optional, Iterable
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import to_json
+
+
+class FastJSONResponse(JSONResponse):
+    # Encodage JSON par pydantic-core (Rust) au lieu de json.dumps
+    def render(self, content) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return to_json(content)
+
+
+@lru_cache(maxsize=None)
+def list_adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    # Un TypeAdapter compilé une seule fois par schéma de liste
+    return TypeAdapter(List[schema])
+
+
+def json_list_response(
+    schema: Type[BaseModel], items: Iterable, headers: Optional[dict] = None, exclude_unset: bool = False
+) -> FastJSONResponse:
+    # Validation et sérialisation de toute la liste en un seul appel, sans passer par des dicts Python.
+    # exclude_unset : les clés absentes des éléments restent absentes du JSON au lieu de prendre leur valeur par défaut
+    adapter = list_adapter(schema)
+    body = adapter.dump_json(adapter.validate_python(items, from_attributes=True), exclude_unset=exclude_unset)
+    return FastJSONResponse(content=body, headers=headers)
@@ -0,0 +1,90 @@
+import hashlib
+import os
+import re
+import tempfile
+from typing import List, Tuple
+
+from fastapi import HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from log_config import setup_logger
+
+logger = setup_logger()
+
+UPLOAD_DIR = "fichiers_attaches_audit"
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+UPLOAD_MAX_FILE_BYTES = int(os.getenv("UPLOAD_MAX_FILE_BYTES", 25 * 1024 * 1024))
+UPLOAD_MAX_REQUEST_BYTES = int(os.getenv("UPLOAD_MAX_REQUEST_BYTES", 100 * 1024 * 1024))
+
+def _extension(filename: str) -> str:
+    # Seule l'extension du nom client est conservée, le reste du nom vient du contenu
+    extension = os.path.splitext(os.path.basename(filename or ""))[1].lower()
+    return extension if re.fullmatch(r"\.[a-z0-9]{1,10}", extension) else ""
+
+def _write_chunk(file, digest, chunk: bytes):
+    digest.update(chunk)
+    file.write(chunk)
+
+def _finalize(tmp_path: str, final_path: str) -> bool:
+    # Un fichier identique déjà présent est conservé : la copie temporaire est supprimée
+    if os.path.exists(final_path):
+        os.remove(tmp_path)
+        return False
+    os.replace(tmp_path, final_path)
+    return True
+
+def _remove_files(paths: List[str]):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+async def store_upload(upload_file: UploadFile, max_bytes: int) -> Tuple[dict, bool]:
+    """Enregistre un fichier par blocs, hors de la boucle d'événements, sous le nom de son SHA-256.
+
+    Retourne la description du fichier et indique s'il vient d'être créé.
+    """
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    limit = min(max_bytes, UPLOAD_MAX_FILE_BYTES)
+    digest = hashlib.sha256()
+    size = 0
+
+    fd, tmp_path = tempfile.mkstemp(dir=UPLOAD_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            while chunk := await upload_file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > limit:
+                    detail = (f"Le fichier '{upload_file.filename}' dépasse la taille maximale autorisée."
+                              if limit == UPLOAD_MAX_FILE_BYTES else "Taille totale des pièces jointes dépassée.")
+                    raise HTTPException(status_code=413, detail=detail)
+                await run_in_threadpool(_write_chunk, tmp, digest, chunk)
+
+        sha256 = digest.hexdigest()
+        final_path = os.path.join(UPLOAD_DIR, sha256 + _extension(upload_file.filename)).replace("\\", "/")
+        created = await run_in_threadpool(_finalize, tmp_path, final_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    logger.info("Fichier '%s' (%d octets) %s : %s", upload_file.filename, size,
+                "sauvegardé" if created else "déjà présent", final_path)
+    return {"nom": upload_file.filename, "sha256": sha256, "taille": size, "chemin": final_path}, created
+
+async def store_uploads(upload_files: List[UploadFile]) -> List[dict]:
+    fichiers, created_paths, total = [], [], 0
+    try:
+        for upload_file in upload_files:
+            fichier, created = await store_upload(upload_file, UPLOAD_MAX_REQUEST_BYTES - total)
+            total += fichier["taille"]
+            fichiers.append(fichier)
+            if created:
+                created_paths.append(fichier["chemin"])
+    except BaseException:
+        # La demande ne sera pas créée : les fichiers écrits par cette requête sont supprimés.
+        # Ceux qui existaient déjà peuvent appartenir à une autre demande et restent en place
+        await run_in_threadpool(_remove_files, created_paths)
+        if created_paths:
+            logger.warning("Envoi interrompu, %d fichier(s) supprimé(s)", len(created_paths))
+        raise
+    return fichiers
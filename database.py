@@ -1,6 +1,7 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from dotenv import load_dotenv
 import os
 
@@ -15,12 +16,19 @@ DB_PASSWORD = os.getenv("DB_PASSWORD")
 DB_HOST = os.getenv("DB_HOST")
 DB_NAME = os.getenv("DB_NAME")
 
-DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
+# Surchargeable pour les benchmarks et les tests (ex. sqlite:///./test.db)
+DATABASE_URL = os.getenv("DATABASE_URL", f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}")
+# Pilote asynchrone pour les routes async (ex. sqlite+aiosqlite:///./test.db en local)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", f"mysql+aiomysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}")
 
 engine = create_engine(DATABASE_URL, pool_pre_ping=True)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Créés au premier usage : le pilote asynchrone n'est chargé que si une route async en a besoin
+_async_engine = None
+_async_session_factory = None
+
 Base = declarative_base()
 
 try:
@@ -32,6 +40,23 @@ except Exception as e:
     logger.error(f"Erreur lors de la connexion à la base de données : {error_message}")
     raise
 
+def sync_schema():
+    # create_all ne modifie pas les tables existantes : on ajoute les colonnes
+    # nullables et les index déclarés dans les modèles qui manquent en base
+    Base.metadata.create_all(bind=engine)
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type} NULL"))
+                    logger.info(f"Colonne {table.name}.{column.name} ajoutée")
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -39,3 +64,20 @@ def get_db():
     finally:
         db.close()
 
+def get_async_session_factory() -> async_sessionmaker:
+    global _async_engine, _async_session_factory
+    if _async_session_factory is None:
+        _async_engine = create_async_engine(ASYNC_DATABASE_URL, pool_pre_ping=True)
+        # expire_on_commit=False : les objets restent lisibles après commit sans nouvel accès à la base
+        _async_session_factory = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_session_factory
+
+async def dispose_async_engine():
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine, _async_session_factory = None, None
+
+async def get_async_db():
+    async with get_async_session_factory()() as db:
+        yield db
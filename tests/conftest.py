@@ -0,0 +1,33 @@
+import os
+import sys
+import tempfile
+
+# Base SQLite jetable : database.py se connecte dès l'import, les variables doivent être posées avant
+_db_dir = tempfile.mkdtemp(prefix="audit_tests_")
+_db_path = os.path.join(_db_dir, "test.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_path}"
+os.environ["ASYNC_DATABASE_URL"] = f"sqlite+aiosqlite:///{_db_path}"
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# Les dossiers servis par l'application sont relatifs au répertoire courant
+os.chdir(_db_dir)
+for directory in ("fichiers_attaches_audit", "fiches_demandes_audit", "fichiers_affectations"):
+    os.makedirs(directory, exist_ok=True)
+
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+
+
+# SQLite n'a pas de verrous de ligne : deux transactions asynchrones qui lisent puis écrivent échouent
+# aussitôt ("database is locked"). BEGIN IMMEDIATE les fait attendre leur tour, comme sous MySQL.
+@event.listens_for(Engine, "connect")
+def _aiosqlite_autocommit_driver(dbapi_connection, connection_record):
+    if type(dbapi_connection).__name__.startswith("AsyncAdapt_aiosqlite"):
+        dbapi_connection.isolation_level = None
+
+
+@event.listens_for(Engine, "begin")
+def _aiosqlite_begin_immediate(connection):
+    if connection.dialect.driver == "aiosqlite":
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
@@ -0,0 +1,89 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import selectinload
+
+from backend.models.affectation import Affectation
+from backend.models.associations import affect_auditeur, affect_ip
+from backend.models.auditeur import Auditeur
+from backend.models.ip import IP
+from backend.models.ports import Port
+from backend.models.prestataire import Prestataire
+from backend.schemas.affectation import AffectResponse
+from backend.services.ip import ip_columns
+from backend.services.serialization import list_adapter
+from database import SessionLocal
+
+
+@pytest.fixture
+def client():
+    from backend.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def prestataire_id(client):
+    db = SessionLocal()
+    prestataire = Prestataire(nom="Prestataire liste")
+    db.add(prestataire)
+    db.flush()
+    auditeurs = [Auditeur(nom="Audit", prenom=str(i), email=f"liste{i}@exemple.ma", phone="0600000000",
+                          prestataire_id=prestataire.id) for i in range(2)]
+    affects = [Affectation(type_audit="Pentest", demande_audit_id=1, prestataire_id=prestataire.id) for _ in range(3)]
+    db.add_all(auditeurs + affects)
+    db.flush()
+    ips = [IP(**ip_columns(f"10.40.0.{i}"), affectation_id=affects[0].id) for i in range(3)]
+    db.add_all(ips)
+    db.flush()
+    db.add_all([Port(port=port, status="open", ip_id=ip.id) for ip in ips for port in (22, 443)])
+    # La deuxième IP est partagée par les deux premières affectations ; la troisième affectation est vide
+    links = [(affects[0], ips[0]), (affects[0], ips[1]), (affects[1], ips[1]), (affects[1], ips[2])]
+    db.execute(affect_ip.insert(), [{"affectation_id": a.id, "ip_id": ip.id} for a, ip in links])
+    db.execute(affect_auditeur.insert(), [
+        {"affectation_id": affects[0].id, "auditeur_id": auditeurs[0].id},
+        {"affectation_id": affects[0].id, "auditeur_id": auditeurs[1].id},
+        {"affectation_id": affects[1].id, "auditeur_id": auditeurs[1].id},
+    ])
+    db.commit()
+    yield prestataire.id
+    affect_ids = [a.id for a in affects]
+    ip_ids = [ip.id for ip in ips]
+    db.execute(affect_ip.delete().where(affect_ip.c.affectation_id.in_(affect_ids)))
+    db.execute(affect_auditeur.delete().where(affect_auditeur.c.affectation_id.in_(affect_ids)))
+    db.query(Port).filter(Port.ip_id.in_(ip_ids)).delete()
+    db.query(IP).filter(IP.id.in_(ip_ids)).delete()
+    db.query(Affectation).filter(Affectation.id.in_(affect_ids)).delete()
+    db.query(Auditeur).filter(Auditeur.prestataire_id == prestataire.id).delete()
+    db.query(Prestataire).filter(Prestataire.id == prestataire.id).delete()
+    db.commit()
+    db.close()
+
+
+def test_affect_list_matches_orm_serialization(client, prestataire_id):
+    response = client.get("/affectation/affects/", params={"prestataire_id": prestataire_id})
+    assert response.status_code == 200
+
+    db = SessionLocal()
+    try:
+        affects = db.query(Affectation).options(
+            selectinload(Affectation.auditeurs), selectinload(Affectation.ips).selectinload(IP.ports)
+        ).filter(Affectation.prestataire_id == prestataire_id).order_by(Affectation.id).all()
+        adapter = list_adapter(AffectResponse)
+        expected = adapter.dump_python(adapter.validate_python(affects, from_attributes=True), mode="json")
+    finally:
+        db.close()
+
+    assert response.json() == expected
+    assert [len(a["ips"]) for a in expected] == [2, 2, 0]
+
+
+def test_affect_list_pages_with_cursor(client, prestataire_id):
+    params = {"prestataire_id": prestataire_id, "limit": 2}
+    first = client.get("/affectation/affects/", params=params)
+    assert len(first.json()) == 2
+
+    second = client.get("/affectation/affects/", params={**params, "cursor": first.headers["X-Next-Cursor"]})
+    assert len(second.json()) == 1
+    assert second.json()[0]["ips"] == []
+    assert "X-Next-Cursor" not in second.headers
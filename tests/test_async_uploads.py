@@ -0,0 +1,118 @@
+import asyncio
+import io
+import time
+
+import httpx
+import pandas as pd
+
+from backend.models.demande_audit import Demande_Audit
+from backend.models.plan import Plan
+from backend.models.plan_ref_sequence import PlanRefSequence
+from backend.models.vulnerability import Vulnerability
+from backend.services import demande_audit as demande_service
+from database import SessionLocal, dispose_async_engine
+
+# Pause tolérée de la boucle d'événements : le client de test encode lui-même les envois sur la boucle,
+# mais lire un classeur sur la boucle la bloquerait plus de deux secondes
+MAX_LOOP_STALL = 0.75
+
+
+def plan_workbook(year: int, rows: int = 6000) -> bytes:
+    records = [{
+        "ref": f"C{year}-{i // 10}", "application": "app", "type_application": "Web", "type_audit": "Pentest",
+        "date_realisation": f"15/03/{year}", "date_cloture": None, "date_rapport": None,
+        "nb_vulnerabilites": None, "niveau_securite": "Moyen", "commentaire_dcsg": "dcsg",
+        "commentaire_cp": "cp", "taux_remediation": None, "titre": f"vuln {i}", "criticite": "majeure",
+        "pourcentage_remediation": 50, "statut_remediation": "En cours", "actions": "Corriger",
+    } for i in range(rows)]
+    buffer = io.BytesIO()
+    pd.DataFrame(records).to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+def demande_form(i: int) -> dict:
+    return {
+        "type_audit": "Pentest", "demandeur_nom_1": "Nom", "demandeur_prenom_1": "Prenom",
+        "demandeur_email_1": f"cp{i}@exemple.ma", "demandeur_phone_1": "0600000000", "demandeur_entite_1": "DSI",
+        "demandeur_nom_2": "Backup", "demandeur_prenom_2": "B", "demandeur_email_2": f"backup{i}@exemple.ma",
+        "demandeur_phone_2": "0600000001", "demandeur_entite_2": "DSI",
+        "nom_app": f"Application concurrente {i}", "description": "desc", "liste_fonctionalites": "f",
+        "type_app": "Web", "type_app_2": "Interne", "architecture_projet": "true", "commentaires_archi": "",
+        "protection_waf": "false", "commentaires_waf": "", "ports": "true", "liste_ports": "443",
+        "cert_ssl_domain_name": "true", "commentaires_cert_ssl_domain_name": "", "sys_exploitation": "Linux",
+        "logiciels_installes": "", "env_tests": "recette", "donnees_prod": "false", "liste_si_actifs": "si",
+        "compte_admin": "admin", "nom_domaine": "exemple.ma", "url_app": "https://app.exemple.ma",
+        "compte_test_profile": "testeur", "urgence": "Normale",
+    }
+
+
+async def watch_loop(stop: asyncio.Event, stalls: list):
+    # Mesure le retard des réveils : une tâche synchrone sur la boucle le fait exploser
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        stalls.append(time.perf_counter() - start - 0.01)
+
+
+async def run_concurrent_uploads(app, workbooks, attachments):
+    stop, stalls, probes = asyncio.Event(), [], []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=60) as client:
+        async def probe():
+            while not stop.is_set():
+                start = time.perf_counter()
+                response = await client.get("/")
+                assert response.status_code == 200
+                probes.append(time.perf_counter() - start)
+                await asyncio.sleep(0.02)
+
+        watcher = asyncio.create_task(watch_loop(stop, stalls))
+        prober = asyncio.create_task(probe())
+        started = time.perf_counter()
+        responses = await asyncio.gather(
+            *(client.post("/plan/upload", files={"file": (f"plans_{i}.xlsx", data)})
+              for i, data in enumerate(workbooks)),
+            *(client.post("/audits/request", data=demande_form(i), files={"files": (f"piece_{i}.pdf", data)})
+              for i, data in enumerate(attachments)),
+        )
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await asyncio.gather(watcher, prober)
+    await dispose_async_engine()
+    return responses, elapsed, stalls, probes
+
+
+def test_concurrent_uploads_do_not_block_the_event_loop(monkeypatch):
+    from backend.main import app, stop_background_jobs
+
+    # Seul le chemin requête -> base est testé ici, pas le rendu des fiches PDF
+    monkeypatch.setattr(demande_service, "submit_document", lambda kind, object_id: None)
+    years = [2041, 2042, 2043]
+    workbooks = [plan_workbook(year) for year in years]
+    attachments = [bytes([i]) * (4 * 1024 * 1024) for i in range(3)]
+
+    try:
+        responses, elapsed, stalls, probes = asyncio.run(run_concurrent_uploads(app, workbooks, attachments))
+    finally:
+        stop_background_jobs()
+
+    assert [response.status_code for response in responses] == [200] * 6, [r.text for r in responses]
+    assert [response.json()["importes"] for response in responses[:3]] == [600] * 3
+    # Les uploads ont duré bien plus longtemps que la plus longue pause de la boucle
+    assert elapsed > 3 * MAX_LOOP_STALL
+    assert max(stalls) < MAX_LOOP_STALL, f"boucle bloquée {max(stalls):.3f}s"
+    assert len(probes) > 10 and max(probes) < MAX_LOOP_STALL, f"{len(probes)} sondes, max {max(probes):.3f}s"
+
+    db = SessionLocal()
+    try:
+        assert db.query(Plan).filter(Plan.ref.like("204%")).count() == 1800
+        assert db.query(Demande_Audit).filter(Demande_Audit.nom_app.like("Application concurrente %")).count() == 3
+    finally:
+        plan_ids = [plan_id for (plan_id,) in db.query(Plan.id).filter(Plan.ref.like("204%"))]
+        db.query(Vulnerability).filter(Vulnerability.plan_id.in_(plan_ids)).delete(synchronize_session=False)
+        db.query(Plan).filter(Plan.id.in_(plan_ids)).delete(synchronize_session=False)
+        db.query(PlanRefSequence).filter(PlanRefSequence.annee.in_(years)).delete(synchronize_session=False)
+        db.query(Demande_Audit).filter(Demande_Audit.nom_app.like("Application concurrente %")).delete(
+            synchronize_session=False)
+        db.commit()
+        db.close()
@@ -0,0 +1,44 @@
+import os
+import time
+
+import pytest
+
+from backend.services import export_cache
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(export_cache, "EXPORT_CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def write_tmp(directory, name: str, size: int) -> str:
+    path = os.path.join(directory, name)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    return path
+
+
+def test_store_export_keeps_file_larger_than_the_limit(cache_dir, monkeypatch):
+    monkeypatch.setattr(export_cache, "EXPORT_CACHE_MAX_BYTES", 100)
+    old = export_cache.store_export("ancien", write_tmp(cache_dir, "ancien.tmp", 50))
+    os.utime(old, (time.time() - 60, time.time() - 60))
+
+    path = export_cache.store_export("nouveau", write_tmp(cache_dir, "nouveau.tmp", 500))
+
+    assert os.path.exists(path)
+    assert not os.path.exists(old)
+
+
+def test_evict_exports_removes_oldest_first(cache_dir, monkeypatch):
+    monkeypatch.setattr(export_cache, "EXPORT_CACHE_MAX_BYTES", 100)
+    now = time.time()
+    paths = []
+    for i in range(3):
+        path = export_cache.store_export(f"cle{i}", write_tmp(cache_dir, f"{i}.tmp", 40))
+        os.utime(path, (now - 100 + i, now - 100 + i))
+        paths.append(path)
+
+    export_cache.evict_exports()
+
+    assert [os.path.exists(path) for path in paths] == [False, True, True]
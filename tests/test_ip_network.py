@@ -0,0 +1,76 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.models.affectation import Affectation
+from backend.models.associations import affect_ip
+from backend.models.ip import IP
+from backend.models.ports import Port
+from backend.models.prestataire import Prestataire
+from backend.services.ip import ip_columns
+from database import SessionLocal
+
+
+@pytest.fixture
+def client():
+    from backend.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def ips(client):
+    db = SessionLocal()
+    prestataire = Prestataire(nom="Prestataire réseau")
+    db.add(prestataire)
+    db.flush()
+    affect = Affectation(type_audit="Pentest", demande_audit_id=1, prestataire_id=prestataire.id)
+    db.add(affect)
+    db.flush()
+    # Insérées dans le désordre : l'ordre de la réponse est celui des adresses
+    addresses = ["10.30.0.20", "10.30.0.3", "10.30.1.1", "10.31.0.1", "10.30.0.100"]
+    rows = []
+    for adresse_ip in addresses:
+        ip = IP(**ip_columns(adresse_ip), affectation_id=affect.id)
+        db.add(ip)
+        db.flush()
+        db.add(Port(port=443, status="open", ip_id=ip.id))
+        db.execute(affect_ip.insert().values(affectation_id=affect.id, ip_id=ip.id))
+        rows.append(ip.id)
+    db.commit()
+    yield addresses
+    db.query(Port).filter(Port.ip_id.in_(rows)).delete()
+    db.execute(affect_ip.delete().where(affect_ip.c.ip_id.in_(rows)))
+    db.query(IP).filter(IP.id.in_(rows)).delete()
+    db.delete(affect)
+    db.delete(prestataire)
+    db.commit()
+    db.close()
+
+
+def test_network_search_pages_with_cursor(client, ips):
+    seen, cursor = [], None
+    while True:
+        params = {"reseau": "10.30.0.0/16", "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/affectation/ips/reseau", params=params)
+        assert response.status_code == 200
+        seen += [row["adresse_ip"] for row in response.json()]
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+
+    assert seen == ["10.30.0.3", "10.30.0.20", "10.30.0.100", "10.30.1.1"]
+
+
+def test_network_search_returns_ports_and_affectations(client, ips):
+    (row,) = client.get("/affectation/ips/reseau", params={"reseau": "10.31.0.0/24"}).json()
+    assert row["adresse_ip"] == "10.31.0.1"
+    assert [port["port"] for port in row["ports"]] == [443]
+    assert [affect["prestataire_nom"] for affect in row["affectations"]] == ["Prestataire réseau"]
+
+
+def test_network_search_rejects_bad_cursor(client, ips):
+    response = client.get("/affectation/ips/reseau", params={"reseau": "10.30.0.0/16", "cursor": "pas-un-curseur"})
+    assert response.status_code == 400
@@ -0,0 +1,69 @@
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy.dialects import mysql
+
+from backend.models.plan import Plan
+from backend.services.plan_filters import compile_plan_filters, date_bounds, date_predicates
+
+
+def compile_sql(predicate) -> str:
+    return str(predicate.compile(dialect=mysql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def test_date_bounds_month():
+    assert date_bounds(2024, 3) == (date(2024, 3, 1), date(2024, 4, 1))
+
+
+def test_date_bounds_december_rolls_over():
+    assert date_bounds(2024, 12) == (date(2024, 12, 1), date(2025, 1, 1))
+
+
+def test_date_bounds_year():
+    assert date_bounds(2024) == (date(2024, 1, 1), date(2025, 1, 1))
+
+
+@pytest.mark.parametrize("year, month", [(2024, 13), (2024, -1), (9999, None), (0, 1)])
+def test_date_bounds_rejects_invalid_values(year, month):
+    with pytest.raises(HTTPException) as excinfo:
+        date_bounds(year, month)
+    assert excinfo.value.status_code == 400
+
+
+def test_year_month_filter_is_a_range_on_the_column():
+    predicates = date_predicates(Plan.date_realisation, 2024, 3)
+    assert [compile_sql(p) for p in predicates] == [
+        "plans.date_realisation >= '2024-03-01'",
+        "plans.date_realisation < '2024-04-01'",
+    ]
+
+
+def test_month_without_year_falls_back_to_extract():
+    (predicate,) = date_predicates(Plan.date_cloture, None, 5)
+    assert compile_sql(predicate) == "EXTRACT(month FROM plans.date_cloture) = 5"
+
+
+def test_compile_plan_filters_uses_ranges_for_each_date():
+    sql = [compile_sql(p) for p in compile_plan_filters(cloture_year=2023, rapport_year=2022, rapport_month=2)]
+    assert sql == [
+        "plans.date_cloture >= '2023-01-01'",
+        "plans.date_cloture < '2024-01-01'",
+        "plans.date_rapport >= '2022-02-01'",
+        "plans.date_rapport < '2022-03-01'",
+    ]
+    assert not any("EXTRACT" in predicate for predicate in sql)
+
+
+@pytest.mark.parametrize("params", [
+    {"realisation_year": 2024, "realisation_month": 13},
+    {"cloture_year": 9999},
+    {"rapport_month": 0},
+])
+def test_plans_route_rejects_out_of_range_dates(params):
+    from backend.main import app
+
+    with TestClient(app) as client:
+        response = client.get("/plan/plans/", params=params)
+    assert response.status_code == 422
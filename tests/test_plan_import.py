@@ -0,0 +1,107 @@
+from datetime import date, datetime
+
+import pandas as pd
+import pymysql
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from backend.models import affectation, audit, auditeur, demande_audit, ip, ports, prestataire  # noqa: F401
+from backend.models.plan import Plan
+from backend.models.plan_ref_sequence import PlanRefSequence
+from backend.models.vulnerability import Vulnerability
+from backend.services import plan as plan_service
+from database import SessionLocal, sync_schema
+
+
+@pytest.fixture
+def db():
+    sync_schema()
+    session = SessionLocal()
+    yield session
+    session.query(Vulnerability).delete()
+    session.query(Plan).delete()
+    session.query(PlanRefSequence).delete()
+    session.commit()
+    session.close()
+
+
+def workbook_rows(*refs: str) -> pd.DataFrame:
+    rows = []
+    for ref in refs:
+        rows.append({
+            "ref": ref, "application": f"app-{ref}", "type_application": "Web", "type_audit": "Pentest",
+            "date_realisation": "15/03/2031", "date_cloture": None, "date_rapport": None,
+            "nb_vulnerabilites": None, "niveau_securite": "Moyen", "commentaire_dcsg": None,
+            "commentaire_cp": None, "taux_remediation": None, "titre": "XSS", "criticite": "critique",
+            "pourcentage_remediation": 50, "statut_remediation": "En cours", "actions": "Corriger",
+        })
+    return pd.DataFrame(rows)
+
+
+def deadlock() -> OperationalError:
+    return OperationalError("SELECT ... FOR UPDATE", {}, pymysql.err.OperationalError(1213, "Deadlock found"))
+
+
+def test_import_retries_after_deadlock(db, monkeypatch):
+    reserve = plan_service.reserve_plan_refs
+    calls = []
+
+    def reserve_with_one_deadlock(session, year, count=1):
+        calls.append(year)
+        if len(calls) == 1:
+            raise deadlock()
+        return reserve(session, year, count)
+
+    monkeypatch.setattr(plan_service, "reserve_plan_refs", reserve_with_one_deadlock)
+    monkeypatch.setattr(plan_service.time, "sleep", lambda seconds: None)
+
+    result = plan_service.import_plans(db, workbook_rows("F-1", "F-2"))
+
+    assert len(calls) == 2
+    assert result["importes"] == 2
+    assert [line["ref"] for line in result["rapport"]] == ["F-1", "F-2"]
+    assert sorted(ref for (ref,) in db.query(Plan.ref).all()) == ["2031_A_01", "2031_A_02"]
+    assert db.query(Vulnerability).count() == 2
+
+
+def test_import_gives_up_after_repeated_deadlocks(db, monkeypatch):
+    def always_deadlock(session, year, count=1):
+        raise deadlock()
+
+    monkeypatch.setattr(plan_service, "reserve_plan_refs", always_deadlock)
+    monkeypatch.setattr(plan_service.time, "sleep", lambda seconds: None)
+
+    with pytest.raises(OperationalError):
+        plan_service.import_plans(db, workbook_rows("F-3"))
+    assert db.query(Plan).count() == 0
+
+
+def test_prepare_reads_mixed_date_formats():
+    df = workbook_rows("M-1", "M-2", "M-3", "M-4")
+    df["date_realisation"] = ["15/03/2031", datetime(2031, 4, 2), "2031-05-20", "02/06/2031"]
+    df["date_cloture"] = [None, " ", "2031-06-30", "30/06/2031"]
+
+    plans, vulnerabilites, rapport = plan_service.prepare_plan_import(df)
+
+    assert rapport == []
+    assert [p["date_realisation"] for p in plans] == [
+        date(2031, 3, 15), date(2031, 4, 2), date(2031, 5, 20), date(2031, 6, 2),
+    ]
+    assert [p["date_cloture"] for p in plans] == [None, None, date(2031, 6, 30), date(2031, 6, 30)]
+    assert len(vulnerabilites) == 4
+
+
+def test_prepare_reports_unreadable_optional_dates():
+    df = workbook_rows("B-1", "B-2", "B-3")
+    df["date_cloture"] = ["pas une date", None, None]
+    df["date_rapport"] = [None, "31/02/2031", "2031-07-01"]
+
+    plans, vulnerabilites, rapport = plan_service.prepare_plan_import(df)
+
+    assert rapport == [
+        {"ref": "B-1", "statut": "erreur", "detail": "Date de clôture invalide."},
+        {"ref": "B-2", "statut": "erreur", "detail": "Date de rapport invalide."},
+    ]
+    assert [p["ref"] for p in plans] == ["B-3"]
+    assert plans[0]["date_rapport"] == date(2031, 7, 1)
+    assert [v["ref"] for v in vulnerabilites] == ["B-3"]
@@ -0,0 +1,63 @@
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+from backend.models.plan import Plan
+from backend.models.vulnerability import Vulnerability
+from backend.services.plan import PLANS_PAGE_MAX
+from database import SessionLocal
+
+APPLICATION = "Liste des plans"
+
+
+@pytest.fixture
+def client():
+    from backend.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def plans(client):
+    db = SessionLocal()
+    db.execute(insert(Plan), [
+        {"ref": f"LISTE_{i}", "application": APPLICATION, "type_application": "Web", "type_audit": "Pentest",
+         "date_realisation": date(2031, 1, 1), "niveau_securite": "Moyen"}
+        for i in range(PLANS_PAGE_MAX + 1)
+    ])
+    first_id = db.query(Plan.id).filter(Plan.application == APPLICATION).order_by(Plan.id).first()[0]
+    db.add(Vulnerability(plan_id=first_id, titre="XSS", criticite="critique", pourcentage_remediation=50.0,
+                         statut_remediation="En cours", actions="Corriger"))
+    db.commit()
+    yield first_id
+    db.query(Vulnerability).filter(Vulnerability.plan_id == first_id).delete()
+    db.query(Plan).filter(Plan.application == APPLICATION).delete()
+    db.commit()
+    db.close()
+
+
+def test_plan_list_is_paginated_by_default(client, plans):
+    response = client.get("/plan/plans/", params={"application": APPLICATION})
+
+    assert response.status_code == 200
+    assert len(response.json()) == PLANS_PAGE_MAX
+    assert response.headers["X-Next-Cursor"]
+
+    last_page = client.get("/plan/plans/", params={"application": APPLICATION,
+                                                   "cursor": response.headers["X-Next-Cursor"]})
+    assert len(last_page.json()) == 1
+    assert "X-Next-Cursor" not in last_page.headers
+
+
+def test_plan_list_omits_vulnerabilites_unless_included(client, plans):
+    params = {"application": APPLICATION, "limit": 1}
+
+    (plan,) = client.get("/plan/plans/", params=params).json()
+    assert plan["id"] == plans
+    assert [v["titre"] for v in plan["vulnerabilites"]] == ["XSS"]
+
+    (plan,) = client.get("/plan/plans/", params={**params, "include": ""}).json()
+    assert "vulnerabilites" not in plan
@@ -0,0 +1,32 @@
+import asyncio
+import io
+import os
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from backend.services import uploads
+
+
+def upload(name: str, data: bytes) -> UploadFile:
+    return UploadFile(file=io.BytesIO(data), filename=name)
+
+
+def stored_files() -> set:
+    os.makedirs(uploads.UPLOAD_DIR, exist_ok=True)
+    return set(os.listdir(uploads.UPLOAD_DIR))
+
+
+def test_request_over_the_limit_removes_the_files_it_wrote(monkeypatch):
+    monkeypatch.setattr(uploads, "UPLOAD_MAX_REQUEST_BYTES", 10)
+    existing = asyncio.run(uploads.store_uploads([upload("deja.txt", b"abc")]))[0]
+    before = stored_files()
+
+    files = [upload("deja.txt", b"abc"), upload("nouveau.txt", b"defg"), upload("trop.txt", b"x" * 8)]
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(uploads.store_uploads(files))
+
+    assert excinfo.value.status_code == 413
+    # Le fichier déjà présent reste en place, celui écrit par la requête refusée est supprimé
+    assert stored_files() == before
+    assert os.path.exists(existing["chemin"])